@@ -1,3 +1,19 @@
-from .ape_kritatools import APEKritaTools
+try:
+    from krita import Krita
+except ImportError:
+    # Running outside of Krita (headless tools, benchmarks)
+    Krita = None
 
-Krita.instance().addExtension(APEKritaTools(Krita.instance()))
\ No newline at end of file
+if Krita is not None:
+    from krita import DockWidgetFactory, DockWidgetFactoryBase
+    from .ape_kritatools import APEKritaTools
+    from .asset_browser import AssetBrowserDocker
+    from .timing_docker import TimingDocker
+
+    extension = APEKritaTools(Krita.instance())
+    Krita.instance().addExtension(extension)
+    Krita.instance().addDockWidgetFactory(
+        DockWidgetFactory("ape_timing_docker", DockWidgetFactoryBase.DockRight, TimingDocker))
+    # The browser imports through the extension
+    Krita.instance().addDockWidgetFactory(
+        DockWidgetFactory("ape_asset_browser", DockWidgetFactoryBase.DockLeft, lambda: AssetBrowserDocker(extension)))
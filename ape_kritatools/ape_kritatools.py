@@ -8,15 +8,24 @@
 # version: 1.1.1
 
 from krita import *
-import ctypes
 import os
-import sys
-
-# Get current path
-dir_path = os.path.dirname(os.path.abspath(__file__))
-sys.path.append(os.path.join(dir_path, "inc"))
-
-from pyape import ape
+import time
+
+from . import archives
+from .apecore import ENGINES, InstancePool, ape, default_engine, open_frame_source
+from .atlas import export_atlas
+from .batch import sheet_layout
+from .cache import FrameCache, owned_frame
+from . import decoder
+from . import encoder
+from . import instrument
+from .directions import DIRECTIONS, find_direction_set
+from .palettes import AssetIndex, index_cache_path, resolve_palette
+from .pixels import (KEY_COLOR, FrameArena, composite_over, crop, duplicate_map, frame_digest, native_view, paste,
+                     to_bgra, trim_bounds, trim_frame)
+from .probe import probe
+from .watch import WatchedGraphic
+from .workers import DebouncedValidator, DecodeWorker, FileWatcher, SetDecodeWorker
 # from ape_ui import ApeUi as ui
 
 VERSION = "1.1.1"
@@ -28,55 +37,177 @@ class APEKritaTools(Extension):
         self.file_path = None
         self.pal_path = None
         self.embedded_pal_path = None
-        self.ape_instance = None
+        self.ape_pool = None
         self.buffers = []
         self.frame_count = 0
         # flags
         self.graphic_error = False
         self.pal_error = False
         self.load_bg_frame_only = False
+        self.frame_range = None
         self.has_bg_frame = False
+        self.speed = 0
         self.import_with_alpha_bg = True
         self.bounding_box = {"w": 0, "h": 0}
         self.krita = None
         self.import_as_animation = True
+        self.keyframe_animation = True
+        self.keyframed = False
+        self.import_direction_set = False
+        self.frame_cache = None
+        self.asset_index = None
+        self.import_job = None
+        # Watch mode: the layers of the last single-graphic import and the watched files
+        self.import_order = None
+        self.imported_layers = None
+        self.watch_files = False
+        self.watch = None
+        self.batch_layers = True
+        self.trim_frames = True
+        self.dedupe_frames = True
+        self.engine = default_engine()
 
     def setup(self):
-        pass
+        # Batched layer building (single refresh/resize); set to "false" for the per-frame refresh path
+        self.batch_layers = Krita.instance().readSetting("ape_kritatools", "batch_layers", "true") == "true"
+        # Layers hold only each frame's opaque pixels; "false" keeps the full decoded frames
+        self.trim_frames = Krita.instance().readSetting("ape_kritatools", "trim_frames", "true") == "true"
+        # Repeated frames are converted once and become clone layers or held keyframes
+        self.dedupe_frames = Krita.instance().readSetting("ape_kritatools", "dedupe_frames", "true") == "true"
+        # Watch imported graphics and palettes for edits made in other programs
+        self.watch_files = Krita.instance().readSetting("ape_kritatools", "watch_files", "false") == "true"
+        # Animations are written straight onto a keyframed layer; "false" for the group-convert path
+        self.keyframe_animation = Krita.instance().readSetting("ape_kritatools", "keyframe_import", "true") == "true"
+        # Decoder engine: "native" (ApeCore) or "python"; falls back to python without ApeCore
+        engine = Krita.instance().readSetting("ape_kritatools", "decoder_engine", default_engine())
+        self.engine = engine if engine in ENGINES and (engine != "native" or ape is not None) else default_engine()
+        # Per-stage timings for the timing docker; off unless enabled there
+        if Krita.instance().readSetting("ape_kritatools", "instrumentation", "false") == "true":
+            trace_memory = Krita.instance().readSetting("ape_kritatools", "instrumentation_memory", "false") == "true"
+            instrument.recorder.enable(trace_memory)
+        # Game asset directory that embedded palette names are relative to
+        self.set_asset_root(Krita.instance().readSetting("ape_kritatools", "asset_root", ""))
+
+    def get_frame_cache(self):
+        """Create the decoded-frame cache from Krita settings on first use."""
+        if self.frame_cache is None:
+            app = Krita.instance()
+            max_mb = int(app.readSetting("ape_kritatools", "frame_cache_mb", "256"))
+            self.frame_cache = FrameCache(max_mb * 1024 * 1024)
+            if app.readSetting("ape_kritatools", "disk_cache", "false") == "true":
+                self.frame_cache.disk_dir = self.disk_cache_dir()
+        return self.frame_cache
+
+    def set_asset_root(self, root):
+        """Index palettes under root (scanned lazily on the first lookup); empty to use path guessing only."""
+        if root and os.path.isdir(root):
+            base = QStandardPaths.writableLocation(QStandardPaths.CacheLocation)
+            self.asset_index = AssetIndex(root, index_cache_path(root, os.path.join(base, "ape_kritatools")))
+        else:
+            self.asset_index = None
+
+    def disk_cache_dir(self):
+        """Directory of the on-disk frame cache."""
+        base = QStandardPaths.writableLocation(QStandardPaths.CacheLocation)
+        return os.path.join(base, "ape_kritatools", "frames")
 
     # ------------------------------------- APE Functions ------------------------------------- #
 
-    def load_frames(self, frame_buffer, frame_count, frames):
-        """Load frames from frame buffer."""
-        for i in range(0, frame_count):
+    def native_frames(self, frame_buffer, order):
+        """Return a function converting one native frame, sized for the frames in order."""
+        # Frames that need expanding to 4 channels are converted into a shared arena
+        arena_size = 0
+        for i in order:
+            frame = frame_buffer[i].contents
+            if frame.channels != 4 and frame.width > 0 and frame.height > 0:
+                arena_size += frame.width * frame.height * 4
+            instrument.count("native_bytes", max(frame.width * frame.height * frame.channels, 0))
+        arena = FrameArena(arena_size)
+        instrument.count("allocations")
+
+        def convert(i):
             frame = frame_buffer[i].contents
             width = frame.width
             height = frame.height
-            offsetX = frame.offsetX
-            offsetY = frame.offsetY
             channels = frame.channels
             pixel_stream = frame.pixels
 
             if not pixel_stream:
-                self.show_message("Error", "Error: Failed to get pixel stream.")
-                return
+                raise ValueError("Failed to get pixel stream.")
 
             if width <= 0 or height <= 0:
-                self.show_message("Error", "Error: Image buffer is empty.")
-                return
-
-            num_pixels = width * height * channels
+                raise ValueError("Image buffer is empty.")
 
-            # Convert C++ pixel stream to Python bytearray
-            pixel_data_ptr = ctypes.cast(pixel_stream, ctypes.POINTER(ctypes.c_uint8 * num_pixels))
-            pixel_array = bytearray(pixel_data_ptr.contents)
+            # View the C++ pixel stream directly (no copy); valid until ape_cleanup()
+            pixel_view = native_view(pixel_stream, width * height * channels)
 
+            # Swap to Krita's BGRA order: in place for RGBA, into the arena otherwise
             if channels == 4:
-                for p in range(0, num_pixels, 4):
-                    pixel_array[p], pixel_array[p + 2] = pixel_array[p + 2], pixel_array[p]
-
-            frames.append((width, height, offsetX, offsetY, channels, pixel_array))
-        
+                pixel_array = to_bgra(pixel_view, channels, pixel_view)
+            else:
+                pixel_array = to_bgra(pixel_view, channels, arena.take(width * height * 4))
+                instrument.count("bytes_copied", width * height * 4)
+
+            return (width, height, frame.offsetX, frame.offsetY, 4, pixel_array)
+
+        return convert
+
+    def load_frames(self, order, get_frame, kept=None, duplicates=None):
+        """Yield frames in layer order, converting each only when its layer is created.
+
+        Repeats of an earlier frame (positions in duplicates) are not converted;
+        None is yielded in their place.
+        """
+        for position, index in enumerate(order):
+            if duplicates and position in duplicates:
+                if kept is not None:
+                    kept[index] = kept[order[duplicates[position]]]
+                instrument.count("duplicate_frames")
+                yield None
+                continue
+            with instrument.span("convert"):
+                frame = get_frame(index)
+            instrument.count("frames")
+            if kept is not None:
+                kept[index] = owned_frame(frame)
+            yield self.trim_layer_frame(frame)
+
+    def trim_layer_frame(self, frame):
+        """Crop a frame to its opaque pixels before it becomes a layer (cached frames stay whole)."""
+        if not self.trim_frames:
+            return frame
+        with instrument.span("trim"):
+            trimmed = trim_frame(frame)
+        instrument.count("trimmed_bytes", (frame[0] * frame[1] - trimmed[0] * trimmed[1]) * 4)
+        return trimmed
+
+    def import_frames(self, headers, get_frame, cache_key=None, order=None, digest=None):
+        """Build the document from frame headers, decoding only the frames that become layers.
+
+        digest(index) hashes a frame's content; frames with equal hashes are
+        converted once.
+        """
+        if order is None:
+            order = self.layer_order(len(headers))
+        duplicates = duplicate_map(order, digest) if digest and self.dedupe_frames else {}
+        self.import_order = order
+
+        # Bounds come from the headers of the selected frames; no pixels needed
+        self.measure_frames([headers[i] for i in order])
+
+        # Only complete imports are cached
+        frame_cache = self.get_frame_cache()
+        kept = {} if cache_key and frame_cache.enabled and len(order) == len(headers) else None
+
+        self.build_document(self.load_frames(order, get_frame, kept, duplicates), len(order), duplicates,
+                            [headers[i] for i in order])
+
+        if kept is not None:
+            frames = [kept[i] for i in range(len(headers))]
+            frame_cache.put(cache_key, {"frames": frames, "has_bg_frame": self.has_bg_frame})
+
+    def measure_frames(self, frames):
+        """Update bounding box and frame count from a frame list."""
         # Find the true pivot (smallest x and y)
         pivot_x = min(frame[2] for frame in frames)  # Smallest offsetX
         pivot_y = min(frame[3] for frame in frames)  # Smallest offsetY
@@ -90,123 +221,299 @@ class APEKritaTools(Extension):
         self.bounding_box["h"] = bounding_box_height
 
         # update frame count
-        self.frame_count = frame_count
+        self.frame_count = len(frames)
 
 
 
-    def frames_to_layers(self, frames, doc):
-        """Convert frames to layers."""
-
-        # reverse frames to load in correct order
-        frames.reverse()
-
-        # if bg frame, move it to the front
-        if self.has_bg_frame:
-            # bg frame is last frame
-            bg_frame = frames[0]
-            frames = frames[1:]
-            frames.insert(0, bg_frame)
+    def layer_order(self, frame_count):
+        """Return frame indices in the order they become layers."""
+        # reverse frames to load in correct order (the bg frame, stored last, comes first)
+        order = list(range(frame_count - 1, -1, -1))
 
         # if bg frame only, only load the last frame
         if self.load_bg_frame_only and self.has_bg_frame:
-            frames = [frames[0]]
+            return order[:1]
         elif self.load_bg_frame_only and not self.has_bg_frame:
             self.show_message("Error", "Error: No background frame found. Loading all frames.")
 
-        # Remove default layer
+        if self.frame_range:
+            # Keep the bg frame plus the animation frames inside the range
+            first, last = self.frame_range
+            background = order[:1] if self.has_bg_frame else []
+            animation_count = frame_count - len(background)
+            selected = [i for i in order if first <= i <= last and i < animation_count]
+            if selected:
+                return background + selected
+            self.show_message("Error", f"Error: Frame range {first}-{last} is outside the {animation_count} frames. Loading all frames.")
+
+        return order
+
+    def frames_to_layers(self, frames, doc, layer_count, duplicates=None, headers=None):
+        """Convert frames (an iterable in layer order, None for repeats in duplicates) to layers."""
+        state = self.begin_layers(doc, layer_count, duplicates, headers)
+        for i, frame in enumerate(frames):
+            self.add_frame_layer(doc, state, i, frame)
+        self.finish_layers(doc, state)
+
+    def remove_default_layer(self, doc):
+        """Remove the empty layer Krita adds to new documents."""
         if doc.rootNode().childNodes():
             first_layer = doc.rootNode().childNodes()[0]
             if first_layer.name() == "Background" or first_layer.pixelData(0, 0, 1, 1) == b'\x00\x00\x00\x00':
                 doc.rootNode().removeChildNode(first_layer)
 
-        # create group for animations
-        group_layer = doc.createGroupLayer("Animation")
-        # doc.rootNode().addChildNode(group_layer, None)
-
-        # get document size
-        canvas_width = doc.width()
-        canvas_height = doc.height()
-
-        anchorX = None
-        anchorY = None
+    def begin_layers(self, doc, layer_count, duplicates=None, headers=None):
+        """Prepare a document for frame layers; returns the layer-building state.
 
-        for i, (width, height, offsetX, offsetY, channels, pixel_array) in enumerate(frames):
-            print(f"Processing frame {i}/{len(frames)-1}")  # Debugging
+        duplicates maps layer positions whose frame repeats an earlier position's
+        to that position (see pixels.duplicate_map). headers are the untrimmed
+        (width, height, offsetX, offsetY, ...) of the frames in layer order; with
+        them every frame is placed before any pixels arrive.
+        """
+        # Remove default layer
+        self.remove_default_layer(doc)
 
-            # Create and add the frame layer
-            frame_node = doc.createNode(f"Frame {i}", "paintlayer")
-            
-            if not self.import_with_alpha_bg:
-                # create background layer
-                bg_node = doc.createNode(f"Background {i}", "paintlayer")
+        # The bg frame (stored last, so first in layer order) is never animated
+        background = 1 if self.has_bg_frame else 0
+        animation_count = layer_count - background
+        keyframes = self.import_as_animation and self.keyframe_animation and animation_count > 0
 
-                # add background layer above frame
-                doc.rootNode().addChildNode(bg_node, None)
+        # create group for animations (keyframed imports use one animated layer instead)
+        group_layer = None if keyframes else doc.createGroupLayer("Animation")
 
-                # fill background with magenta to doc size
-                bg_color = bytearray([255, 0, 255, 255] * canvas_width * canvas_height)
-                bg_node.setPixelData(bg_color, 0, 0, canvas_width, canvas_height) 
-                # add frame to background
-                doc.rootNode().addChildNode(frame_node, bg_node)
+        # On the timeline a frame equal to the next one in layer order (the
+        # previous one in time) needs no keyframe: the earlier keyframe holds
+        duplicates = duplicates or {}
+        holds = set()
+        if keyframes:
+            for position in range(background, layer_count - 1):
+                if duplicates.get(position, position) == duplicates.get(position + 1, position + 1):
+                    holds.add(position)
 
-            else:
-                if i == 0:
-                    doc.rootNode().addChildNode(frame_node, None)
-                    doc.rootNode().addChildNode(group_layer, None)
-                else:
-                    group_layer.addChildNode(frame_node, None)
+        # get document size
+        state = {
+            "group_layer": group_layer,
+            "keyframes": keyframes,
+            "animation_layer": None,
+            "background": background,
+            "animation_count": animation_count,
+            "canvas_width": doc.width(),
+            "canvas_height": doc.height(),
+            "layer_count": layer_count,
+            "anchorX": None,
+            "anchorY": None,
+            "first_offsetX": None,
+            "first_offsetY": None,
+            # batched: no refresh per frame, bounds from the known frame rects
+            "batched": self.batch_layers,
+            "rects": [],
+            "refreshes": 0,
+            "duplicates": duplicates,
+            "holds": holds,
+            # Frames and nodes of the first occurrences of repeated frames
+            "sources": set(duplicates.values()),
+            "source_frames": {},
+            "source_nodes": {},
+            # Position -> (node, time or None) of every layer written with its own pixels
+            "targets": {},
+        }
+
+        if headers:
+            self.anchor_frames(state, *headers[0][:4])
+
+        if not self.import_with_alpha_bg:
+            # Opaque layers cover the canvas and every frame rect, so no frame is clipped
+            left, top, right, bottom = 0, 0, state["canvas_width"], state["canvas_height"]
+            for width, height, offsetX, offsetY in (header[:4] for header in headers or ()):
+                x = state["first_offsetX"] - offsetX
+                y = state["first_offsetY"] - offsetY
+                left, top = min(left, x), min(top, y)
+                right, bottom = max(right, x + width), max(bottom, y + height)
+            state["bg_rect"] = (left, top, right - left, bottom - top)
+            # fill the magenta background once; every frame is composited onto a reset copy
+            state["bg_template"] = KEY_COLOR * ((right - left) * (bottom - top))
+            state["bg_buffer"] = bytearray(state["bg_template"])
+
+        return state
+
+    def anchor_frames(self, state, width, height, offsetX, offsetY):
+        """Center the first frame on the canvas; every frame is placed relative to it."""
+        state["anchorX"] = (state["canvas_width"] // 2) - (width // 2)
+        state["anchorY"] = (state["canvas_height"] // 2) - (height // 2)
+        state["first_offsetX"] = offsetX + state["anchorX"]
+        state["first_offsetY"] = offsetY + state["anchorY"]
+
+    def add_frame_layer(self, doc, state, i, frame):
+        """Create the layer for the i-th frame in layer order (None for a repeat of an earlier frame)."""
+        if frame is None:
+            # Same pixels, size and offsets as the first occurrence, already converted
+            frame = state["source_frames"][state["duplicates"][i]]
+        elif i in state["sources"]:
+            state["source_frames"][i] = frame
+        width, height = frame[0], frame[1]
+        with instrument.span("layers"):
+            x, y = self.place_frame_layer(doc, state, i, frame)
+
+        # Remember where the layer's pixels went so bounds need no layer.bounds() walk
+        if self.import_with_alpha_bg:
+            state["rects"].append((x, y, width, height))
+        else:
+            state["rects"].append(state["bg_rect"])
 
-            # Set frame size
-            frame_node.setPixelData(pixel_array, 0, 0, width, height)
-            
-            # if bg frame or first frame, center it
+        if not state["batched"]:
+            # Refresh document
+            with instrument.span("refresh"):
+                doc.refreshProjection()
+            state["refreshes"] += 1
+
+    def place_frame_layer(self, doc, state, i, frame):
+        """Create, fill and position the layer of one frame; returns its (x, y)."""
+        width, height, offsetX, offsetY, channels, pixel_array = frame
+        group_layer = state["group_layer"]
+
+        # Without headers the first frame (the bg frame if any) is centered as it arrives
+        if state["first_offsetX"] is None:
+            self.anchor_frames(state, width, height, offsetX, offsetY)
+
+        # Apply offset relative to the first frame
+        x = state["first_offsetX"] - offsetX
+        y = state["first_offsetY"] - offsetY
+
+        # Create and add the frame layer
+        keyframe = state["keyframes"] and i >= state["background"]
+        source = state["duplicates"].get(i)
+        if keyframe:
+            if i in state["holds"]:
+                self.count_saved_upload(state, width, height)
+                return x, y
+            # Frames go straight onto one animated layer's timeline; layers
+            # come last frame first, so times count down from the end
+            frame_node = state["animation_layer"]
+            if frame_node is None:
+                frame_node = state["animation_layer"] = self.create_animated_layer(doc, "Animation")
+            time = state["animation_count"] - 1 - (i - state["background"])
+            self.select_keyframe(doc, frame_node, time)
+            state["targets"][i] = (frame_node, time)
+        elif source is not None:
+            # A clone layer shows the first occurrence's pixels without a copy of its own
+            frame_node = doc.createCloneLayer(f"Frame {i}", state["source_nodes"][source])
+            group_layer.addChildNode(frame_node, None)
+            self.count_saved_upload(state, width, height)
+            return x, y
+        else:
+            frame_node = doc.createNode("Background" if state["keyframes"] else f"Frame {i}", "paintlayer")
             if i == 0:
-                # Center first frame
-                anchorX = (canvas_width // 2) - (width // 2)
-                anchorY = (canvas_height // 2) - (height // 2)
-                
-                first_offsetX = offsetX + anchorX
-                first_offsetY = offsetY + anchorY
-
-                # Move first frame directly
-                frame_node.move(anchorX, anchorY)
+                doc.rootNode().addChildNode(frame_node, None)
+                if group_layer:
+                    doc.rootNode().addChildNode(group_layer, None)
             else:
-                # Reset origin frame
-                frame_node.move(anchorX, anchorY)
-                # Apply relative offset
-                frame_node.move(-(offsetX - first_offsetX), -(offsetY - first_offsetY))
+                group_layer.addChildNode(frame_node, None)
+            if i in state["sources"]:
+                state["source_nodes"][i] = frame_node
+            state["targets"][i] = (frame_node, None)
+
+        if self.import_with_alpha_bg:
+            if keyframe:
+                # Moving an animated layer would shift every keyframe, so write in place
+                frame_node.setPixelData(pixel_array, x, y, width, height)
+            else:
+                # Set frame size
+                frame_node.setPixelData(pixel_array, 0, 0, width, height)
+                frame_node.move(x, y)
+            instrument.count("bytes_copied", width * height * 4)
+        else:
+            # Composite the frame onto the magenta background in Python: one
+            # finished layer per frame, no background node or merge
+            left, top, bg_width, bg_height = state["bg_rect"]
+            bg_buffer = state["bg_buffer"]
+            bg_buffer[:] = state["bg_template"]
+            composite_over(bg_buffer, bg_width, bg_height, pixel_array, width, height, x - left, y - top)
+            frame_node.setPixelData(bg_buffer, left, top, bg_width, bg_height)
+            instrument.count("bytes_copied", bg_width * bg_height * 4)
+
+        return x, y
+
+    def count_saved_upload(self, state, width, height):
+        """Record a frame layer that needed no pixel upload."""
+        if not self.import_with_alpha_bg:
+            # Opaque imports upload composites covering the canvas and every frame
+            width, height = state["bg_rect"][2:]
+        instrument.count("uploads_saved")
+        instrument.count("upload_bytes_saved", width * height * 4)
+
+    def create_animated_layer(self, doc, name):
+        """Add an animated paint layer (with its first keyframe at time 0) to the document."""
+        node = doc.createNode(name, "paintlayer")
+        doc.rootNode().addChildNode(node, None)
+        node.enableAnimation()
+        return node
+
+    def select_keyframe(self, doc, node, time):
+        """Make time current with a keyframe on node there, so setPixelData writes that frame."""
+        doc.setCurrentTime(time)
+        if not node.hasKeyframeAtTime(time):
+            # Scripting cannot create keyframes; the timeline action works on the active node
+            doc.setActiveNode(node)
+            Krita.instance().action("add_blank_frame").trigger()
+            doc.waitForDone()
+
+    def finish_keyframes(self, doc, frame_count):
+        """Set up the timeline of a keyframed import from the header speed read at import."""
+        doc.setCurrentTime(0)
+        # Original speed is ms per frame
+        if self.speed:
+            doc.setFramesPerSecond(int(round(1000 / self.speed)))
+        doc.setFullClipRangeStartTime(0)
+        doc.setFullClipRangeEndTime(frame_count - 1)
+
+    def finish_layers(self, doc, state):
+        """Fit the canvas to the layers once all frames are in."""
+        # Initialize bounding box
+        with instrument.span("update_bounds"):
+            # layer.bounds() of an animated layer only covers its current frame
+            if state["batched"] or state["keyframes"]:
+                offset = self.update_bounds(doc, state["canvas_width"], state["canvas_height"], state["rects"])
+            else:
+                offset = self.update_bounds(doc, state["canvas_width"], state["canvas_height"])
 
-            if not self.import_with_alpha_bg:
-                # make frame the active node
-                doc.setActiveNode(frame_node)
+        # Every frame sits at pivot - offset; keep the pivot so exports can recover the offsets
+        if state["first_offsetX"] is not None:
+            pivot = f"{state['first_offsetX'] - offset[0]},{state['first_offsetY'] - offset[1]}"
+            doc.setAnnotation("ape_pivot", "APE frame pivot", QByteArray(pivot.encode()))
+        self.import_with_alpha_bg = True
 
-                # Merge down the frame to the background
-                frame_node.mergeDown()
+        self.keyframed = state["keyframes"]
+        if self.keyframed:
+            self.finish_keyframes(doc, state["animation_count"])
 
-                # make background the active node
-                doc.setActiveNode(bg_node)
+        # Kept for watch mode, which writes edited frames back into these layers
+        shared = state["sources"] | set(state["duplicates"])
+        self.imported_layers = {"doc": doc, "targets": state["targets"], "shared": shared,
+                                "opaque": "bg_template" in state}
 
-            # Refresh document
+        with instrument.span("refresh"):
             doc.refreshProjection()
+        state["refreshes"] += 1
 
-        # Initialize bounding box
-        self.update_bounds(doc, canvas_width, canvas_height)
-        self.import_with_alpha_bg = True
-        doc.refreshProjection()
+    def update_bounds(self, doc, canvas_width=1024, canvas_height=1024, rects=None):
+        """Resize the document to the layers' extent (from rects if given, else layer.bounds()).
 
-    def update_bounds(self, doc, canvas_width=1024, canvas_height=1024):
+        Returns the (x, y) of the new canvas origin in the old coordinates.
+        """
         # Initialize bounding box extremes
         min_x = float('inf')
         min_y = float('inf')
         max_x = float('-inf')
         max_y = float('-inf')
 
-        # Iterate over all layers to find the extreme positions
-        for layer in doc.rootNode().childNodes():
-            bounds = layer.bounds()
-            x, y = bounds.x(), bounds.y()
-            width, height = bounds.width(), bounds.height()
+        if rects is None:
+            # Iterate over all layers to find the extreme positions
+            rects = []
+            for layer in doc.rootNode().childNodes():
+                bounds = layer.bounds()
+                rects.append((bounds.x(), bounds.y(), bounds.width(), bounds.height()))
 
+        for x, y, width, height in rects:
             min_x = min(min_x, x)
             min_y = min(min_y, y)
             max_x = max(max_x, x + width)
@@ -225,66 +532,107 @@ class APEKritaTools(Extension):
         offsetY = (canvas_height // 2) - (new_height // 2)
 
         doc.resizeImage(offsetX, offsetY, self.bounding_box["w"], self.bounding_box["h"])
+        return offsetX, offsetY
 
     def ape_init(self): 
         """Initialize APE."""
-        # Load image from DLL
-        self.ape_instance = ape.create_ape_instance()
-        if not self.ape_instance:
+        if ape is None:
+            self.show_message("Error", "Error: ApeCore library could not be loaded.")
+            return 0
+
+        # One instance per concurrent decode, reused across imports; native
+        # buffers and cached frames share one memory ceiling
+        app = Krita.instance()
+        max_instances = int(app.readSetting("ape_kritatools", "ape_instances", str(os.cpu_count() or 1)))
+        memory_mb = int(app.readSetting("ape_kritatools", "memory_limit_mb", "512"))
+        pool = InstancePool(max_instances, memory_mb * 1024 * 1024)
+        pool.shared.append(self.get_frame_cache())
+
+        # Create the first instance now so a broken ApeCore is reported up front
+        try:
+            pool.release(pool.acquire())
+        except RuntimeError:
             self.show_message("Error", "Error: Failed to create ApeCore instance.")
             return 0
+        self.ape_pool = pool
         
         # Return success
         return 1
 
     def load_image_into_krita(self, graphic_path, pal_path, load_bg_frame_only=None, import_alpha=None):
-        """Load an RGBA pixel stream from pyape.dll and create a new Krita layer."""
+        """Import a graphic on the GUI thread, from the frame cache when possible."""
         self.krita = Krita.instance()
 
+        frame_cache = self.get_frame_cache()
+        cache_key = frame_cache.key(graphic_path, pal_path)
+        if self.load_cached(graphic_path, pal_path, cache_key):
+            return
+
         # Initialize APE
-        if not self.ape_instance:
+        if self.engine == "native" and not self.ape_pool:
             if self.ape_init() < 1:
                 return
 
-        # Load image
-        if not ape.load_image(self.ape_instance, graphic_path.encode(), 1, pal_path.encode()):
-            self.show_message("Error", "Error: Failed to load image.")
+        info = probe(graphic_path)
+        self.has_bg_frame = info.has_bg_frame
+        self.speed = info.speed
+        instance = self.ape_pool.acquire() if self.engine == "native" else None
+        source = None
+        try:
+            # Same sources as the DecodeWorker, so archive members resolve for either engine
+            source = open_frame_source(self.engine, graphic_path, pal_path, instance, self.ape_pool)
+            self.import_frames(source.headers, source.frame, cache_key, digest=source.digest)
+        except (OSError, RuntimeError, ValueError) as e:
+            self.show_message("Error", f"Error: Failed to load image. ({e})")
             return -1
-        
-        # Does the image have a background frame?
-        self.has_bg_frame = ape.has_background_frame(graphic_path.encode())
-        
-        # Get frame count
-        frame_count = ape.get_frame_count(self.ape_instance)
-
-        # Get frame data
-        frame_buffer = ape.get_frame_buffer(self.ape_instance)
-        frames = []
-
-        # Load frames
-        self.load_frames(frame_buffer, frame_count, frames)
+        finally:
+            # Layers hold their own copies, so the native buffers can go now
+            if source:
+                source.close()
+            if instance is not None:
+                self.ape_cleanup(instance)
+
+    def load_cached(self, graphic_path, pal_path, cache_key):
+        """Import from frames decoded by an earlier import; returns False if there are none."""
+        frame_cache = self.get_frame_cache()
+        cached = frame_cache.get(cache_key)
+        if cached:
+            self.has_bg_frame = cached["has_bg_frame"]
+            self.speed = probe(graphic_path).speed
+            frames = cached["frames"]
+            self.import_frames(frames, frames.__getitem__, digest=lambda i: frame_digest(frames[i]))
+            return True
+
+        # Same graphic with another palette: re-expand the cached index planes instead of decoding again
+        indexed = frame_cache.get_indexed(graphic_path)
+        if not indexed:
+            return False
+        try:
+            frames = decoder.recolor_frames(indexed["frames"], decoder.read_palette(pal_path))
+        except (OSError, ValueError):
+            # Decoding reports the palette error
+            return False
+        self.has_bg_frame = indexed["has_bg_frame"]
+        self.speed = probe(graphic_path).speed
+        self.import_frames(frames, frames.__getitem__, cache_key, digest=lambda i: frame_digest(frames[i]))
+        return True
 
-        # Find the largest size
-        # max_width = max(frame[0] for frame in frames)
-        # max_height = max(frame[1] for frame in frames)
-        
+    def build_document(self, frames, layer_count, duplicates=None, headers=None):
+        """Create a document sized to the bounding box and fill it with frame layers."""
         doc = self.krita.createDocument(self.bounding_box["w"], self.bounding_box["h"], "Untitled", "RGBA", "U8", "", 300.0)
         self.krita.activeWindow().addView(doc)
 
-        # # If no document is open, create one
-        # if not doc:
-        #     doc = krita_instance.createDocument(max_width, max_height, "APE Image", "RGBA", "U8", "", 300.0)
-        #     krita_instance.activeWindow().addView(doc)
+        # frames_to_layers refreshes the projection once it is done
+        try:
+            self.frames_to_layers(frames, doc, layer_count, duplicates, headers)
+        except (OSError, ValueError):
+            # A frame failed to decode part way through; drop the half-built document
+            doc.close()
+            raise
 
-        self.frames_to_layers(frames, doc)
-        app = Krita.instance()
-        doc = app.activeDocument()
-
-        # Refresh to apply changes
-        doc.refreshProjection()
-
-        # Clean up APE
-        # self.ape_cleanup()
+    def ape_cleanup(self, instance):
+        """Release the native pixel buffers of a loaded image and return its instance to the pool."""
+        self.ape_pool.release(instance)
 
     def show_message(self, title, text):
         """ Show a pop-up message box. """
@@ -294,6 +642,410 @@ class APEKritaTools(Extension):
         msg.setIcon(QMessageBox.Information)
         msg.exec_()
 
+    # ------------------------------------- Background Import ---------------------------------- #
+
+    def start_import(self, graphic_path, pal_path):
+        """Decode on a worker thread and create layers as converted frames arrive."""
+        self.krita = Krita.instance()
+
+        # Cached frames (or cached index planes, with another palette) need no decoding
+        frame_cache = self.get_frame_cache()
+        cache_key = frame_cache.key(graphic_path, pal_path)
+        if self.load_cached(graphic_path, pal_path, cache_key):
+            self.schedule_animation(graphic_path)
+            return
+
+        # Initialize APE
+        if self.engine == "native" and not self.ape_pool:
+            if self.ape_init() < 1:
+                return
+
+        info = probe(graphic_path)
+        self.has_bg_frame = info.has_bg_frame
+        self.speed = info.speed
+        order = self.layer_order(info.frame_count)
+
+        progress = QProgressDialog("Decoding...", "Cancel", 0, len(order), self.krita.activeWindow().qwindow())
+        progress.setWindowTitle("APE Krita Tools v" + VERSION)
+        progress.setWindowModality(Qt.WindowModal)
+        progress.setMinimumDuration(0)
+        progress.setValue(0)
+
+        worker = DecodeWorker(self.engine, self.ape_pool, graphic_path, pal_path, order, self.dedupe_frames)
+        thread = QThread()
+        worker.moveToThread(thread)
+
+        self.import_job = {
+            "graphic_path": graphic_path,
+            "cache_key": cache_key,
+            "order": order,
+            "frames": {},
+            "frame_count": 0,
+            "layers": 0,
+            "doc": None,
+            "state": None,
+            "error": None,
+            "progress": progress,
+            "worker": worker,
+            "thread": thread,
+            "start": time.perf_counter(),
+        }
+
+        thread.started.connect(worker.run)
+        worker.loaded.connect(self.on_frames_loaded)
+        worker.frame_ready.connect(self.on_frame_ready)
+        worker.failed.connect(self.on_import_failed)
+        worker.finished.connect(self.on_import_finished)
+        progress.canceled.connect(self.cancel_import)
+        thread.start()
+
+    @pyqtSlot()
+    def cancel_import(self):
+        """Stop the running import; the worker frees the native buffers."""
+        if self.import_job:
+            self.import_job["worker"].cancel()
+
+    @pyqtSlot(object, object)
+    def on_frames_loaded(self, headers, duplicates):
+        """Create the document as soon as frame sizes are known."""
+        job = self.import_job
+        job["frame_count"] = len(headers)
+        # The worker only sends frames that exist, so layer positions follow this order
+        job["order"] = [i for i in job["order"] if i < len(headers)]
+        self.import_order = job["order"]
+        self.measure_frames([headers[i] for i in job["order"]])
+
+        doc = self.krita.createDocument(self.bounding_box["w"], self.bounding_box["h"], "Untitled", "RGBA", "U8", "", 300.0)
+        self.krita.activeWindow().addView(doc)
+        job["doc"] = doc
+        job["state"] = self.begin_layers(doc, len(job["order"]), duplicates, [headers[i] for i in job["order"]])
+        job["progress"].setLabelText("Importing frames...")
+
+    @pyqtSlot(int, object)
+    def on_frame_ready(self, index, frame):
+        """Create the layer for a frame converted by the worker (None repeats an earlier frame)."""
+        job = self.import_job
+        if job["worker"].cancelled:
+            return
+
+        if frame is None:
+            self.add_frame_layer(job["doc"], job["state"], job["layers"], None)
+            source = job["state"]["duplicates"][job["layers"]]
+            job["frames"][index] = job["frames"][job["order"][source]]
+        else:
+            self.add_frame_layer(job["doc"], job["state"], job["layers"], self.trim_layer_frame(frame))
+            job["frames"][index] = frame
+        job["layers"] += 1
+
+        elapsed = time.perf_counter() - job["start"]
+        rate = job["layers"] / elapsed if elapsed > 0 else 0
+        job["progress"].setValue(job["layers"])
+        job["progress"].setLabelText(f"Frame {job['layers']}/{len(job['order'])} ({rate:.1f} frames/s)")
+
+    @pyqtSlot(str)
+    def on_import_failed(self, message):
+        self.import_job["error"] = message
+
+    @pyqtSlot(bool, float)
+    def on_import_finished(self, cancelled, seconds):
+        """Finish the document, or discard it if the import was cancelled or failed."""
+        job = self.import_job
+        self.import_job = None
+        job["thread"].quit()
+        job["thread"].wait()
+        job["progress"].canceled.disconnect(self.cancel_import)
+        job["progress"].close()
+
+        doc = job["doc"]
+        if cancelled or job["error"]:
+            if doc:
+                doc.close()
+            if job["error"]:
+                self.show_message("Error", "Error: " + job["error"])
+            return
+
+        self.finish_layers(doc, job["state"])
+        instrument.record("decode", seconds)
+        instrument.record("import", time.perf_counter() - job["start"])
+
+        # Only complete imports are cached
+        frames = job["frames"]
+        if len(frames) == job["frame_count"]:
+            entry = {"frames": [frames[i] for i in range(job["frame_count"])], "has_bg_frame": self.has_bg_frame}
+            self.get_frame_cache().put(job["cache_key"], entry)
+
+        self.schedule_animation(job["graphic_path"])
+
+    # ------------------------------------- Animation Sets ------------------------------------- #
+
+    def start_set_import(self, graphic_path, pal_path):
+        """Decode every facing next to the graphic concurrently and import them into one document."""
+        self.krita = Krita.instance()
+
+        items = find_direction_set(graphic_path)
+        if len(items) < 2:
+            self.show_message("Error", "Error: No other directions found next to this graphic. Importing it alone.")
+            self.start_import(graphic_path, pal_path)
+            return
+
+        if self.engine == "native" and not self.ape_pool:
+            if self.ape_init() < 1:
+                return
+
+        # Facings of one animation share its speed
+        self.speed = probe(graphic_path).speed
+
+        progress = QProgressDialog("Decoding directions...", "Cancel", 0, len(items), self.krita.activeWindow().qwindow())
+        progress.setWindowTitle("APE Krita Tools v" + VERSION)
+        progress.setWindowModality(Qt.WindowModal)
+        progress.setMinimumDuration(0)
+        progress.setValue(0)
+
+        worker = SetDecodeWorker(self.engine, self.ape_pool, items, pal_path, self.dedupe_frames)
+        thread = QThread()
+        worker.moveToThread(thread)
+
+        self.import_job = {
+            "graphic_path": graphic_path,
+            "items": items,
+            "results": {},
+            "error": None,
+            "progress": progress,
+            "worker": worker,
+            "thread": thread,
+            "start": time.perf_counter(),
+        }
+
+        thread.started.connect(worker.run)
+        worker.direction_ready.connect(self.on_direction_ready)
+        worker.failed.connect(self.on_import_failed)
+        worker.finished.connect(self.on_set_finished)
+        progress.canceled.connect(self.cancel_import)
+        thread.start()
+
+    @pyqtSlot(str, object)
+    def on_direction_ready(self, direction, frames):
+        """Keep a decoded facing until all of them are in."""
+        job = self.import_job
+        job["results"][direction] = frames
+        job["progress"].setValue(len(job["results"]))
+        job["progress"].setLabelText(f"Decoded {', '.join(d for d in DIRECTIONS if d in job['results'])}")
+
+    @pyqtSlot(bool, float)
+    def on_set_finished(self, cancelled, seconds):
+        """Build the set document, unless the import was cancelled or failed."""
+        job = self.import_job
+        self.import_job = None
+        job["thread"].quit()
+        job["thread"].wait()
+        job["progress"].canceled.disconnect(self.cancel_import)
+        job["progress"].close()
+
+        if cancelled:
+            return
+        if job["error"]:
+            self.show_message("Error", "Error: " + job["error"])
+            return
+
+        directions = self.build_direction_set(job["results"])
+        instrument.record("decode", seconds)
+        instrument.record("import", time.perf_counter() - job["start"])
+
+        self.has_bg_frame = False
+        self.schedule_animation(job["graphic_path"], directions)
+
+    def build_direction_set(self, results):
+        """Create one document with a group per facing, side by side; returns the group names."""
+        directions = [direction for direction in DIRECTIONS if results.get(direction)]
+        frames = [frame for direction in directions for frame in results[direction]]
+
+        # Every facing shares one pivot, so a cell fits the largest extent of any frame
+        cell_w, cell_h, _, _, placements = sheet_layout(frames)
+        doc = self.krita.createDocument(cell_w * len(directions), cell_h, "Untitled", "RGBA", "U8", "", 300.0)
+        self.krita.activeWindow().addView(doc)
+        self.remove_default_layer(doc)
+
+        base = 0
+        # One animated layer per facing, keyframed directly, unless importing still layers
+        self.keyframed = self.import_as_animation and self.keyframe_animation
+        with instrument.span("layers"):
+            for column, direction in enumerate(directions):
+                if self.keyframed:
+                    direction_layer = self.create_animated_layer(doc, direction)
+                else:
+                    direction_layer = doc.createGroupLayer(direction)
+                    doc.rootNode().addChildNode(direction_layer, None)
+                direction_frames = results[direction]
+                # decode_direction hands out one object for repeated frames
+                trims = {}
+                nodes = {}
+                # reverse frames to load in correct order (as frames_to_layers does)
+                for index in range(len(direction_frames) - 1, -1, -1):
+                    frame = direction_frames[index]
+                    trimmed = trims.get(id(frame))
+                    if trimmed is None:
+                        trimmed = trims[id(frame)] = self.trim_layer_frame(frame)
+                    width, height, _, _, _, pixel_array = trimmed
+                    # The cell position is the untrimmed frame's; trimming moved the pixels by the offset change
+                    x, y = placements[base + index]
+                    x += frame[2] - trimmed[2]
+                    y += frame[3] - trimmed[3]
+                    repeat = self.dedupe_frames and (
+                        index > 0 and frame is direction_frames[index - 1] if self.keyframed else id(frame) in nodes)
+                    if repeat:
+                        # The previous keyframe holds, or a clone shows the first layer made from this frame
+                        if not self.keyframed:
+                            frame_node = doc.createCloneLayer(f"{direction} {index}", nodes[id(frame)])
+                            direction_layer.addChildNode(frame_node, None)
+                        instrument.count("uploads_saved")
+                        instrument.count("upload_bytes_saved", width * height * 4)
+                    elif self.keyframed:
+                        self.select_keyframe(doc, direction_layer, index)
+                        direction_layer.setPixelData(pixel_array, column * cell_w + x, y, width, height)
+                    else:
+                        frame_node = doc.createNode(f"{direction} {index}", "paintlayer")
+                        direction_layer.addChildNode(frame_node, None)
+                        frame_node.setPixelData(pixel_array, 0, 0, width, height)
+                        frame_node.move(column * cell_w + x, y)
+                        nodes[id(frame)] = frame_node
+                    if not repeat:
+                        instrument.count("bytes_copied", width * height * 4)
+                base += len(direction_frames)
+
+        with instrument.span("refresh"):
+            doc.refreshProjection()
+        self.bounding_box["w"] = cell_w * len(directions)
+        self.bounding_box["h"] = cell_h
+        self.frame_count = max(len(results[direction]) for direction in directions)
+        if self.keyframed:
+            self.finish_keyframes(doc, self.frame_count)
+        return directions
+
+    # ------------------------------------- Watch Mode ----------------------------------------- #
+
+    def watch_triggered(self, enabled):
+        """Watch imports menu toggle."""
+        self.watch_files = enabled
+        Krita.instance().writeSetting("ape_kritatools", "watch_files", "true" if enabled else "false")
+        if not enabled:
+            self.stop_watch()
+
+    def start_watch(self, graphic_path, pal_path):
+        """Watch the files of the import just built; later edits are written into its layers."""
+        self.stop_watch()
+        layers = self.imported_layers
+        if layers is None or not self.import_order:
+            return
+
+        # The python engine's frames are already cached as index planes
+        cached = self.get_frame_cache().get_indexed(graphic_path)
+        try:
+            with instrument.span("watch"):
+                graphic = WatchedGraphic(graphic_path, pal_path, self.import_order, cached["frames"] if cached else None)
+        except (OSError, ValueError):
+            instrument.count("watch_read_errors")
+            return
+
+        # Converting frame groups to an animation replaces their layers, so edits import again
+        if self.import_as_animation and not self.keyframed:
+            targets = None
+        else:
+            targets = {self.import_order[i]: target for i, target in layers["targets"].items()}
+
+        watcher = FileWatcher([graphic_path, pal_path])
+        watcher.changed.connect(self.on_watched_changed)
+        self.watch = {
+            "graphic": graphic,
+            "watcher": watcher,
+            "doc": layers["doc"],
+            "targets": targets,
+            # Frames shown by clone layers or held keyframes as well as their own
+            "shared": {self.import_order[i] for i in layers["shared"]},
+            "opaque": layers["opaque"],
+        }
+
+    def stop_watch(self):
+        if self.watch:
+            self.watch["watcher"].stop()
+            self.watch = None
+
+    @pyqtSlot()
+    def on_watched_changed(self):
+        """Write the frames changed on disk into the watched document."""
+        watch = self.watch
+        doc = watch["doc"]
+        if not any(doc == open_doc for open_doc in Krita.instance().documents()):
+            self.stop_watch()
+            return
+        if self.import_job:
+            return
+
+        graphic = watch["graphic"]
+        try:
+            with instrument.span("reload"):
+                result = graphic.update()
+        except (OSError, ValueError):
+            # Most likely read half-way through a save; the rest of it triggers another try
+            instrument.count("watch_read_errors")
+            return
+
+        targets = watch["targets"]
+        if result is None or targets is None or any(i in watch["shared"] or i not in targets for i in result[1]):
+            # The layers no longer map one to one onto the frames
+            instrument.count("watch_reimports")
+            self.stop_watch()
+            self.begin_import(graphic.graphic_path, graphic.pal_path)
+            return
+
+        changed = result[0]
+        written = 0
+        current = doc.currentTime()
+        pivot = self.document_pivot(doc)
+        with instrument.span("reload"):
+            for index, frame in changed.items():
+                # Clone layers and held keyframes follow the frame they repeat
+                target = targets.get(index)
+                if target is not None:
+                    self.write_watched_frame(doc, target, frame, pivot, watch["opaque"])
+                    written += 1
+            doc.setCurrentTime(current)
+            doc.refreshProjection()
+        # The layers now show what was read, so later reads compare against it
+        graphic.commit()
+        if written:
+            instrument.count("watch_frames_updated", written)
+            # Let the timing docker show the update
+            instrument.recorder.finished(os.path.basename(graphic.graphic_path))
+
+    def write_watched_frame(self, doc, target, frame, pivot, opaque):
+        """Replace the pixels of one frame in the layer or keyframe it was imported into."""
+        node, frame_time = target
+        if frame_time is not None:
+            doc.setCurrentTime(frame_time)
+        width, height, offsetX, offsetY, _, pixel_array = self.trim_layer_frame(frame)
+        x = pivot[0] - offsetX
+        y = pivot[1] - offsetY
+
+        # The written region covers the old pixels too, so nothing of them is left behind
+        bounds = node.bounds()
+        if opaque:
+            # Opaque layers are the magenta canvas with the frame composited onto it
+            left, top, region_width, region_height = bounds.x(), bounds.y(), bounds.width(), bounds.height()
+            region = bytearray(KEY_COLOR * (region_width * region_height))
+            composite_over(region, region_width, region_height, pixel_array, width, height, x - left, y - top)
+        else:
+            left, top, right, bottom = x, y, x + width, y + height
+            if not bounds.isEmpty():
+                left = min(left, bounds.x())
+                top = min(top, bounds.y())
+                right = max(right, bounds.x() + bounds.width())
+                bottom = max(bottom, bounds.y() + bounds.height())
+            region_width, region_height = right - left, bottom - top
+            region = paste(bytearray(region_width * region_height * 4), region_width, region_height,
+                           pixel_array, width, height, x - left, y - top)
+        node.setPixelData(region, left, top, region_width, region_height)
+        instrument.count("bytes_copied", region_width * region_height * 4)
+
     # ------------------------------------- Dialog --------------------------------------------- #
     def open_dialog(self):
         """Open dialog."""
@@ -302,7 +1054,7 @@ class APEKritaTools(Extension):
         text_field_width = 460
         button_width = 100
         form_width = text_field_width + button_width + 10
-        form_height = 350
+        form_height = 485
 
         # Create pop-up dialog
         ape_win = QDialog()
@@ -379,11 +1131,13 @@ class APEKritaTools(Extension):
         open_pal_error.setVisible(False)
         open_pal_form.addWidget(open_pal_error)
 
-        # ------------- State checks
-        open_pal_text.textChanged.connect(lambda: self.validate_file(open_pal_text.text(), "palette", open_pal_error, None, import_button))
-        open_pal_text.textChanged.connect(lambda: self.update_import_button_state(import_button))
-        open_text.textChanged.connect(lambda: self.validate_file(open_text.text(), "graphic", open_error, open_pal_text, import_button))
-        open_text.textChanged.connect(lambda: self.update_import_button_state(import_button))
+        # ------------- State checks (debounced, validated on a worker thread)
+        pal_validator = DebouncedValidator(self.check_file, parent=ape_win)
+        pal_validator.validated.connect(lambda result: self.apply_validation(result, "palette", open_pal_error, None, import_button))
+        graphic_validator = DebouncedValidator(self.check_file, parent=ape_win)
+        graphic_validator.validated.connect(lambda result: self.apply_validation(result, "graphic", open_error, open_pal_text, import_button))
+        open_pal_text.textChanged.connect(lambda: pal_validator.request(open_pal_text.text(), "palette"))
+        open_text.textChanged.connect(lambda: graphic_validator.request(open_text.text(), "graphic"))
 
         # ------------------------------------- #
 
@@ -409,6 +1163,15 @@ class APEKritaTools(Extension):
         load_bg_checkbox = QCheckBox("Load only background frame")
         load_bg_checkbox.setChecked(False)
         settings_form.addWidget(load_bg_checkbox)
+        # ----- Frame range
+        frame_range_row = QHBoxLayout()
+        settings_form.addLayout(frame_range_row)
+        frame_range_row.addWidget(QLabel("Frames"))
+        frame_range_text = QLineEdit()
+        frame_range_text.setPlaceholderText("all (e.g. 10-40)")
+        frame_range_text.setMaximumSize(button_width * 2, widget_height)
+        frame_range_row.addWidget(frame_range_text)
+        frame_range_row.addStretch()
         # ----- Import with alpha checkbox
         import_alpha_checkbox = QCheckBox("Import with alpha background")
         import_alpha_checkbox.setChecked(True)
@@ -418,10 +1181,33 @@ class APEKritaTools(Extension):
         settings_form.addWidget(import_as_animation_checkbox)
         # ----- Add border to settings panel
         settings_form.addWidget(import_alpha_checkbox)
+        # ----- Direction set checkbox
+        direction_set_checkbox = QCheckBox("Import all directions (N, NE, E, ...) into one document")
+        direction_set_checkbox.setChecked(self.import_direction_set)
+        settings_form.addWidget(direction_set_checkbox)
+        # ----- Asset root
+        asset_root_row = QHBoxLayout()
+        settings_form.addLayout(asset_root_row)
+        asset_root_row.addWidget(QLabel("Asset root"))
+        asset_root_text = QLineEdit()
+        asset_root_text.setPlaceholderText("game data folder (optional, for palette lookup)")
+        asset_root_text.setText(self.asset_index.root if self.asset_index else "")
+        asset_root_text.setReadOnly(True)
+        asset_root_row.addWidget(asset_root_text)
+        asset_root_button = QPushButton("Browse")
+        asset_root_button.setMaximumSize(button_width, widget_height)
+        asset_root_row.addWidget(asset_root_button)
+        asset_root_button.clicked.connect(lambda: self.asset_root_triggered(asset_root_text, open_text))
+        # ----- Disk cache checkbox
+        disk_cache_checkbox = QCheckBox("Cache decoded frames on disk")
+        disk_cache_checkbox.setChecked(bool(self.get_frame_cache().disk_dir))
+        settings_form.addWidget(disk_cache_checkbox)
         # ----- Connect checkboxes to functions
         load_bg_checkbox.stateChanged.connect(lambda: self.bg_frame_only_triggered(load_bg_checkbox.checkState()))
         import_alpha_checkbox.stateChanged.connect(lambda: self.import_alpha_triggered(import_alpha_checkbox.checkState()))
         import_as_animation_checkbox.stateChanged.connect(lambda: self.import_as_animation_triggered(import_as_animation_checkbox.checkState()))
+        disk_cache_checkbox.stateChanged.connect(lambda: self.disk_cache_triggered(disk_cache_checkbox.isChecked()))
+        direction_set_checkbox.stateChanged.connect(lambda: self.direction_set_triggered(direction_set_checkbox.isChecked()))
         # ----- Spacer
         settings_form.addStretch()
 
@@ -437,7 +1223,7 @@ class APEKritaTools(Extension):
         import_button.setDisabled(True)
         import_form.addWidget(import_button)
         # ----- Connect button to function
-        import_button.clicked.connect(lambda: self.import_triggered(open_text.text(), open_pal_text.text(), load_bg_checkbox.isChecked(), import_alpha_checkbox.isChecked()))
+        import_button.clicked.connect(lambda: self.import_triggered(open_text.text(), open_pal_text.text(), load_bg_checkbox.isChecked(), import_alpha_checkbox.isChecked(), frame_range_text.text()))
         # ----- Cancel Button
         cancel_button = QPushButton("Cancel")
         cancel_button.setMinimumSize(button_width, widget_height)
@@ -474,93 +1260,97 @@ class APEKritaTools(Extension):
             button.setDisabled(False)
     
     def open_file(self, title, type_filter, text_field):
-        path = QFileDialog.getOpenFileName(None, title, "", type_filter)
-        if path[0]:
+        path = QFileDialog.getOpenFileName(None, title, "", type_filter + ";;ZT1 Archive (*.ztd)")
+        if path[0] and archives.is_archive(path[0]):
+            # Pick a graphic or palette inside the archive ("archive.ztd!/animals/...")
+            palettes = type_filter.endswith("(*.pal)")
+            text_field.setText(self.choose_archive_member(path[0], palettes) or "")
+        elif path[0]:
             text_field.setText(path[0])
         else:
             text_field.setText("")
 
-    def validate_file(self, file_path, file_type, widget, widget2=None, import_button=None):
-        """Validate file."""
-        if not os.path.isfile(file_path):
-            widget.setVisible(True)
-            return False
-        
-        if file_type == "graphic":
-            if not ape.validate_graphic_file(file_path.encode()):
-                self.graphic_error = True
-                widget.setVisible(True)
-                self.update_import_button_state(import_button)
-                return False
+    def choose_archive_member(self, archive_path, palettes=False):
+        """Ask for a member of a .ztd archive; returns its archive path or None."""
+        try:
+            if palettes:
+                archive = archives.archive_pool.get(archive_path)
+                members = sorted(archives.member_path(archive_path, info.filename) for key, info in archive.members.items()
+                                 if key.endswith(".pal"))
             else:
-                self.graphic_error = False
-                if widget2:
-                    header = ape.get_header(file_path.encode())
-                    if header:
-                        pal_path = header.palName
-                        widget2.setText(self.adjust_pal_directory(pal_path, file_path))
-                        self.embedded_pal_path = pal_path.decode()
+                members = archives.graphic_members(archive_path)
+        except OSError as e:
+            self.show_message("Error", f"Error: Could not read archive. ({e})")
+            return None
+        if not members:
+            self.show_message("Error", "Error: No matching files found in the archive.")
+            return None
+
+        names = [member.split(archives.ARCHIVE_SEPARATOR, 1)[1] for member in members]
+        name, ok = QInputDialog.getItem(None, "Open from Archive", os.path.basename(archive_path), names, 0, True)
+        if not ok or not name:
+            return None
+        return archives.find_member(archive_path, name)
+
+    def browse_directory(self, path):
+        """Directory to start a file dialog in: the archive's own folder for archive members."""
+        parts = archives.split_archive_path(path) if path else None
+        return os.path.dirname(parts[0]) if parts else path or ""
+
+    def check_file(self, file_path, file_type):
+        """Validate file. Runs on a worker thread, so it must not touch widgets."""
+        result = {"path": file_path, "type": file_type, "valid": False, "pal_path": None, "embedded_pal_path": None}
+
+        if file_type == "graphic":
+            # One header read covers validity, embedded palette, speed and background frame
+            info = probe(file_path)
+            if info.valid:
+                result["valid"] = True
+                result["embedded_pal_path"] = info.pal_name
+                result["pal_path"] = self.adjust_pal_directory(info.pal_name, file_path)
         elif file_type == "palette":
-            if not ape.validate_palette_file(file_path.encode()):
-                self.pal_error = True
-                widget.setVisible(True)
-                self.update_import_button_state(import_button)
-                return False
+            if self.engine == "native":
+                # ApeCore needs a real file, so archive members are extracted first
+                result["valid"] = archives.isfile(file_path) and bool(ape.validate_palette_file(archives.local_path(file_path).encode()))
             else:
-                self.pal_error = False
-        
-        widget.setVisible(False)
-        return True
+                result["valid"] = decoder.validate_palette(file_path)
+
+        return result
+
+    def apply_validation(self, result, file_type, widget, widget2=None, import_button=None):
+        """Show a validation result in the dialog (result may be an exception from the worker)."""
+        valid = isinstance(result, dict) and result["valid"]
+
+        if file_type == "graphic":
+            self.graphic_error = not valid
+            if valid and widget2:
+                widget2.setText(result["pal_path"])
+                self.embedded_pal_path = result["embedded_pal_path"]
+        elif file_type == "palette":
+            self.pal_error = not valid
+
+        widget.setVisible(not valid)
+        self.update_import_button_state(import_button)
+        return valid
 
     # ------------------------------------- Helpers --------------------------------------------- #
 
     def adjust_pal_directory(self, pal_path, graphic_path):
         """Adjust palette path by finding common path components and appending the palette file."""
-        # Decode bytes if necessary
-        if isinstance(pal_path, bytes):
-            pal_path = pal_path.decode("utf-8")
-        if isinstance(graphic_path, bytes):
-            graphic_path = graphic_path.decode("utf-8")
-        
-        # Normalize slashes and get directory parts
-        pal_parts = pal_path.replace("\\", "/").split("/")
-        graphic_path = graphic_path.replace("\\", "/")
-        graphic_parts = graphic_path.split("/")
-        # pal_filename = pal_parts[-1]
-        
-        # Find the last matching path component
-        last_match_index = -1
-        for pal_part in pal_parts[:-1]:  # Exclude pal filename
-            for i, graphic_part in enumerate(graphic_parts):
-                if pal_part.lower() == graphic_part.lower():
-                    last_match_index = i
-        
-        if last_match_index != -1:
-            # Take the graphic path up to the last matching component
-            base_path = "/".join(graphic_parts[:last_match_index + 1])
-            # Get the pal filename
-            pal_filename = pal_parts[-1]
-            # Join them together
-            return f"{base_path}/{pal_filename}"
-        else:
-            # If no common path components, just return the pal, return graphic path
-            # without filename and append pal filename
-            new_pal_path = "/".join(graphic_parts[:-1]) + "/" + "/".join(pal_parts)
-            return new_pal_path
-        
-        return pal_path    
-    
-    def import_triggered(self, graphic_path, pal_path, load_bg_frame_only, import_alpha):
+        # Exact through the asset index when the graphic lies under the asset root
+        return resolve_palette(pal_path, graphic_path, self.asset_index)
+
+    def import_triggered(self, graphic_path, pal_path, load_bg_frame_only, import_alpha, frame_range=""):
         """Import button triggered."""
         if not graphic_path or not pal_path:
             self.show_message("Error", "Error: Graphic or palette path is empty.")
             return
         
-        if not os.path.isfile(graphic_path):
+        if not archives.isfile(graphic_path):
             self.show_message("Error", "Error: Graphic file not found.")
             return
         
-        if not os.path.isfile(pal_path):
+        if not archives.isfile(pal_path):
             self.show_message("Error", "Error: Palette file not found.")
             return
         
@@ -568,15 +1358,81 @@ class APEKritaTools(Extension):
             self.show_message("Error", "Error: Invalid graphic or palette file.")
             return
         
-        # Load image into Krita
-        self.load_image_into_krita(graphic_path, pal_path, load_bg_frame_only, import_alpha)
-        
+        if self.import_job:
+            self.show_message("Error", "Error: An import is already running.")
+            return
+
+        try:
+            self.frame_range = self.parse_frame_range(frame_range)
+        except ValueError:
+            self.show_message("Error", "Error: Frame range must look like 10-40.")
+            return
 
         # Close dialog
         QApplication.activeWindow().close()
-        args = {"frame_count": self.frame_count, "graphic_path": graphic_path, "import_as_animation": self.import_as_animation, "has_bg_frame": self.has_bg_frame}
-        QTimer.singleShot(500, lambda: self.runAfterExit(args))
 
+        self.begin_import(graphic_path, pal_path)
+
+    def import_graphic(self, graphic_path):
+        """Import a graphic with its embedded palette and the last dialog options (asset browser)."""
+        info = probe(graphic_path)
+        if not info.valid:
+            self.show_message("Error", f"Error: Not a valid APE file. ({info.error})")
+            return
+
+        pal_path = self.adjust_pal_directory(info.pal_name, graphic_path)
+        if not archives.isfile(pal_path):
+            self.show_message("Error", f"Error: Palette file not found. ({pal_path})")
+            return
+
+        if self.import_job:
+            self.show_message("Error", "Error: An import is already running.")
+            return
+
+        self.embedded_pal_path = info.pal_name
+        self.frame_range = None
+        self.begin_import(graphic_path, pal_path)
+
+    def begin_import(self, graphic_path, pal_path):
+        """Start importing validated files."""
+        # Remember the files for the next dialog and for exports
+        self.file_path = graphic_path
+        self.pal_path = pal_path
+
+        # The timing report covers one import at a time
+        instrument.recorder.reset()
+
+        # Load image into Krita (decoded on a worker thread)
+        if self.import_direction_set:
+            self.start_set_import(graphic_path, pal_path)
+        else:
+            self.start_import(graphic_path, pal_path)
+
+    def parse_frame_range(self, text):
+        """Parse "first-last" (or a single frame) into an inclusive range; None for all frames."""
+        text = text.strip()
+        if not text:
+            return None
+        first, _, last = text.partition("-")
+        first = int(first)
+        last = int(last) if last.strip() else first
+        if first < 0 or last < first:
+            raise ValueError(text)
+        return (first, last)
+
+    def schedule_animation(self, graphic_path, groups=None):
+        """Convert the imported layers to an animation once Krita has settled."""
+        if self.watch_files and not groups:
+            self.start_watch(graphic_path, self.pal_path)
+        args = {"frame_count": self.frame_count, "graphic_path": graphic_path, "import_as_animation": self.import_as_animation,
+                "has_bg_frame": self.has_bg_frame, "speed": self.speed, "keyframed": self.keyframed}
+        if groups:
+            args["groups"] = groups
+        if self.keyframed:
+            # Frames already sit on the timeline; there is nothing to wait for
+            self.runAfterExit(args)
+        else:
+            QTimer.singleShot(500, lambda: self.runAfterExit(args))
 
     def bg_frame_only_triggered(self, state):
         """Background frame only checkbox triggered."""
@@ -590,10 +1446,42 @@ class APEKritaTools(Extension):
         """Import as animation checkbox triggered."""
         self.import_as_animation = state
 
+    def direction_set_triggered(self, enabled):
+        """Import all directions checkbox triggered."""
+        self.import_direction_set = enabled
+
+    def asset_root_triggered(self, text_field, graphic_field):
+        """Pick the asset root; the graphic is validated again so its palette resolves through the index."""
+        root = QFileDialog.getExistingDirectory(None, "Select Asset Root", text_field.text())
+        if not root:
+            return
+        Krita.instance().writeSetting("ape_kritatools", "asset_root", root)
+        self.set_asset_root(root)
+        text_field.setText(root)
+        graphic_field.textChanged.emit(graphic_field.text())
+
+    def disk_cache_triggered(self, enabled):
+        """Disk cache checkbox triggered."""
+        Krita.instance().writeSetting("ape_kritatools", "disk_cache", "true" if enabled else "false")
+        self.get_frame_cache().disk_dir = self.disk_cache_dir() if enabled else None
+
     def runAfterExit(self, args):
         """Convert group layer to timeline."""
+        with instrument.span("animation"):
+            self.convert_to_animation(args)
+        # The import is complete; let the timing docker show its report
+        instrument.recorder.finished(os.path.basename(args["graphic_path"]))
+
+    def convert_to_animation(self, args):
+        """Rename the background frame and turn the frame groups into animated layers."""
         doc = Krita.instance().activeDocument()
 
+        if args["keyframed"]:
+            # Layers, fps and clip range were set while the frames were written
+            if args["import_as_animation"]:
+                Krita.instance().action("toggle_playback").trigger()
+            return
+
         if args["has_bg_frame"]:
             # move bg frame to the back
             bg_frame = doc.nodeByName("Frame 0")
@@ -601,21 +1489,187 @@ class APEKritaTools(Extension):
             bg_frame.setName("Background")
 
         if args["import_as_animation"]:
-            group_layer = doc.nodeByName("Animation")
-            doc.setActiveNode(group_layer)
-            Krita.instance().action("convert_group_to_animated").trigger()
-
-            # Update fps
-            header = ape.get_header(args["graphic_path"].encode())
-            if header:
-                ms = header.speed
-            fps = 1000 / ms # original speed is ms per frame
-            doc.setFramesPerSecond(fps)
+            # One animated layer per group (a single "Animation" group unless importing a set)
+            for name in args.get("groups", ["Animation"]):
+                group_layer = doc.nodeByName(name)
+                doc.setActiveNode(group_layer)
+                Krita.instance().action("convert_group_to_animated").trigger()
+
+            # Update fps (original speed is ms per frame, read with the header at import)
+            if args["speed"]:
+                doc.setFramesPerSecond(int(round(1000 / args["speed"])))
             doc.setFullClipRangeEndTime(args["frame_count"] - 1)
 
             # Hit play
             Krita.instance().action("toggle_playback").trigger()
         
+    # ------------------------------------- Atlas Export ---------------------------------------- #
+
+    def export_atlas_triggered(self):
+        """Pack a graphic's frames (optionally all its directions) into an atlas PNG + JSON."""
+        graphic_path = QFileDialog.getOpenFileName(None, "Export APE Atlas", self.file_path or "", "APE Image (*);;ZT1 Archive (*.ztd)")[0]
+        if graphic_path and archives.is_archive(graphic_path):
+            graphic_path = self.choose_archive_member(graphic_path)
+        if not graphic_path:
+            return
+        info = probe(graphic_path)
+        if not info.valid:
+            self.show_message("Error", "Error: Not a valid APE file.")
+            return
+
+        # The palette chosen at import wins for the graphic that was imported
+        pal_path = self.pal_path if graphic_path == self.file_path else None
+        directions = QMessageBox.question(None, "Export APE Atlas", "Include all directions next to this graphic?",
+                                          QMessageBox.Yes | QMessageBox.No) == QMessageBox.Yes
+
+        parts = archives.split_archive_path(graphic_path)
+        out_dir = os.path.dirname(parts[0]) if parts else os.path.dirname(graphic_path)
+        default_out = os.path.join(out_dir, os.path.basename(graphic_path) + "_atlas.png")
+        out_path = QFileDialog.getSaveFileName(None, "Save Atlas", default_out, "PNG (*.png)")[0]
+        if not out_path:
+            return
+
+        if self.engine == "native" and not self.ape_pool:
+            if self.ape_init() < 1:
+                return
+
+        QApplication.setOverrideCursor(Qt.WaitCursor)
+        start = time.perf_counter()
+        try:
+            sidecar = export_atlas([graphic_path], out_path, pal_path, self.engine, directions, pool=self.ape_pool,
+                                   index=self.asset_index)
+        except (OSError, RuntimeError, ValueError) as e:
+            self.show_message("Error", f"Error: Atlas export failed. ({e})")
+            return
+        finally:
+            QApplication.restoreOverrideCursor()
+
+        self.show_message("APE Krita Tools v" + VERSION,
+                          f"Packed {len(sidecar['frames'])} frames into {sidecar['width']}x{sidecar['height']} "
+                          f"in {time.perf_counter() - start:.2f}s.")
+
+    # ------------------------------------- APE Export ----------------------------------------- #
+
+    def document_pivot(self, doc):
+        """The frame pivot stored at import, or the canvas center for other documents."""
+        data = doc.annotation("ape_pivot")
+        if data:
+            x, y = bytes(data).decode().split(",")
+            return int(x), int(y)
+        return doc.width() // 2, doc.height() // 2
+
+    def export_region(self, doc, nodes):
+        """The canvas rect grown to cover every node (layers can extend past the canvas)."""
+        left, top, right, bottom = 0, 0, doc.width(), doc.height()
+        for node in nodes:
+            bounds = node.bounds()
+            if bounds.isEmpty():
+                continue
+            left = min(left, bounds.x())
+            top = min(top, bounds.y())
+            right = max(right, bounds.x() + bounds.width())
+            bottom = max(bottom, bounds.y() + bounds.height())
+        return left, top, right - left, bottom - top
+
+    def collect_export_frames(self, doc):
+        """Read the frames of the active animation; returns (frames, has_bg_frame)."""
+        pivot_x, pivot_y = self.document_pivot(doc)
+
+        # The selected animated layer or group, else the imported "Animation" node
+        node = doc.activeNode()
+        if node is None or not (node.animated() or node.childNodes()):
+            node = doc.nodeByName("Animation")
+        if node is None:
+            return [], False
+        bg_node = doc.nodeByName("Background")
+        # Repeated frames are imported as clone layers of their first occurrence
+        children = [child for child in node.childNodes() if child.type() in ("paintlayer", "clonelayer")]
+        left, top, width, height = self.export_region(doc, [node] + children + ([bg_node] if bg_node else []))
+
+        images = []
+        if node.animated():
+            # Every time is a frame; a keyframe held over several times is read once
+            pixels = None
+            for t in range(doc.fullClipRangeStartTime(), doc.fullClipRangeEndTime() + 1):
+                if pixels is None or node.hasKeyframeAtTime(t):
+                    pixels = node.pixelDataAtTime(left, top, width, height, t)
+                images.append(pixels)
+        else:
+            # Not converted to an animation yet: one frame per child layer, bottom to top
+            images = [child.projectionPixelData(left, top, width, height) if child.type() == "clonelayer"
+                      else child.pixelData(left, top, width, height) for child in children]
+
+        has_bg_frame = bool(images) and bg_node is not None
+        if has_bg_frame:
+            images.append(bg_node.pixelData(left, top, width, height))
+
+        frames = []
+        for pixels in images:
+            # Store only the visible part of each frame, offset from the pivot
+            x, y, w, h = trim_bounds(width, height, pixels) or (0, 0, 1, 1)
+            frames.append((w, h, pivot_x - (left + x), pivot_y - (top + y), 4, crop(pixels, width, x, y, w, h)))
+        return frames, has_bg_frame
+
+    def export_ape_triggered(self):
+        """Write the active animation as a ZT1 graphic plus palette."""
+        doc = Krita.instance().activeDocument()
+        if doc is None:
+            self.show_message("Error", "Error: No document is open.")
+            return
+
+        frames, has_bg_frame = self.collect_export_frames(doc)
+        if not frames:
+            self.show_message("Error", "Error: Select an animated layer or a group of frame layers to export.")
+            return
+
+        graphic_path = QFileDialog.getSaveFileName(None, "Export APE Image", self.browse_directory(self.file_path), "APE Image (*)")[0]
+        if not graphic_path:
+            return
+        pal_path = QFileDialog.getSaveFileName(None, "Save APE Palette", os.path.splitext(graphic_path)[0] + ".pal",
+                                               "APE Palette (*.pal)")[0]
+        if not pal_path:
+            return
+
+        fps = doc.framesPerSecond()
+        speed = round(1000 / fps) if fps else 100
+
+        QApplication.setOverrideCursor(Qt.WaitCursor)
+        start = time.perf_counter()
+        try:
+            # Magenta is the key color of imports without an alpha background
+            quantizer = encoder.write_ape(graphic_path, pal_path, frames, speed, has_bg_frame,
+                                          self.export_palette_name(graphic_path, pal_path),
+                                          transparent_color=int.from_bytes(KEY_COLOR[:3], "little"))
+        except (OSError, ValueError) as e:
+            self.show_message("Error", f"Error: Export failed. ({e})")
+            return
+        finally:
+            QApplication.restoreOverrideCursor()
+
+        seconds = time.perf_counter() - start
+        palette = "exact" if quantizer.exact else "quantized"
+        self.show_message("APE Krita Tools v" + VERSION,
+                          f"Exported {len(frames)} frames with a {len(quantizer.palette)}-color {palette} palette "
+                          f"in {seconds:.2f}s ({seconds / len(frames) * 1000:.0f} ms per frame).")
+
+    def export_palette_name(self, graphic_path, pal_path):
+        """Palette name to embed in an exported graphic; the game resolves it from its root folder."""
+        pal_path = os.path.abspath(pal_path)
+        # Under the asset root the name is the path from there
+        if self.asset_index:
+            try:
+                relative = os.path.relpath(pal_path, self.asset_index.root)
+            except ValueError:
+                # On another drive
+                relative = None
+            if relative and not relative.startswith(os.pardir):
+                return relative.replace(os.sep, "/")
+        # Saved over the imported palette (or its copy in a mirrored tree): keep the imported name
+        embedded = (self.embedded_pal_path or "").replace("\\", "/").lower()
+        if embedded and pal_path.replace(os.sep, "/").lower().endswith("/" + embedded):
+            return self.embedded_pal_path
+        return encoder.palette_name(graphic_path, pal_path)
+
     # ------------------------------------- Krita Extension ------------------------------------- #
         
     def createActions(self, window):
@@ -625,6 +1679,18 @@ class APEKritaTools(Extension):
         # Open dialog
         action.triggered.connect(self.open_dialog)
 
+        export_action = window.createAction("ape_export_image", "Export APE Image", "tools/scripts")
+        export_action.triggered.connect(self.export_ape_triggered)
+
+        atlas_action = window.createAction("ape_export_atlas", "Export APE Sprite Atlas", "tools/scripts")
+        atlas_action.triggered.connect(self.export_atlas_triggered)
+
+        # Opt-in: the imported graphic and palette are watched and edits written into the document
+        watch_action = window.createAction("ape_watch_imports", "Watch APE Imports for Changes", "tools/scripts")
+        watch_action.setCheckable(True)
+        watch_action.setChecked(self.watch_files)
+        watch_action.toggled.connect(self.watch_triggered)
+
 # MIT License
 
 # Copyright (c) 2025 Eric Galvan (Goosifer.IO)
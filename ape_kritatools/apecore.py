@@ -0,0 +1,246 @@
+# APE.Krita Tools
+# by Eric Galvan (Goosifer.IO)
+# https://github.com/openztcc/APE.KritaTools
+# Licensed under MIT (see LICENSE)
+#
+# Access to the native ApeCore library without depending on Krita.
+
+import os
+import sys
+import threading
+from contextlib import contextmanager
+
+# Get current path
+dir_path = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(dir_path, "inc"))
+
+try:
+    from pyape import ape
+except ImportError:
+    # Headless tools report this when they first need the native library
+    ape = None
+
+from . import instrument
+from .archives import local_path
+from .pixels import digest_frame, native_view, to_bgra
+
+
+def require_ape():
+    """Return the ApeCore wrapper or raise if it could not be loaded."""
+    if ape is None:
+        raise RuntimeError("ApeCore (pyape) could not be loaded.")
+    return ape
+
+
+def load_native(instance, graphic_path, pal_path):
+    """Decode a graphic into an ApeCore instance; returns (frame_buffer, frame_count)."""
+    api = require_ape()
+    # ApeCore opens files itself, so archive members are extracted first
+    graphic_path = local_path(graphic_path)
+    pal_path = local_path(pal_path)
+    if not api.load_image(instance, graphic_path.encode(), 1, pal_path.encode()):
+        raise RuntimeError("Failed to load image.")
+    return api.get_frame_buffer(instance), api.get_frame_count(instance)
+
+
+def frame_headers(frame_buffer, frame_count):
+    """Return (width, height, offsetX, offsetY, channels) for each frame without touching pixels."""
+    headers = []
+    for i in range(0, frame_count):
+        frame = frame_buffer[i].contents
+        headers.append((frame.width, frame.height, frame.offsetX, frame.offsetY, frame.channels))
+    return headers
+
+
+def native_size(headers):
+    """Bytes of native pixel data described by frame headers."""
+    return sum(max(width * height * channels, 0) for width, height, _, _, channels in headers)
+
+
+def convert_frame(frame_buffer, index):
+    """Convert one native frame into an owned BGRA frame tuple."""
+    frame = frame_buffer[index].contents
+    if not frame.pixels or frame.width <= 0 or frame.height <= 0:
+        raise ValueError(f"Frame {index} has no pixel data.")
+    view = native_view(frame.pixels, frame.width * frame.height * frame.channels)
+    instrument.count("allocations")
+    instrument.count("bytes_copied", frame.width * frame.height * 4)
+    return (frame.width, frame.height, frame.offsetX, frame.offsetY, 4, to_bgra(view, frame.channels))
+
+
+def native_digest(frame_buffer, index):
+    """Content hash of a native frame's pixels, taken before any conversion."""
+    frame = frame_buffer[index].contents
+    size = max(frame.width * frame.height * frame.channels, 0)
+    pixels = native_view(frame.pixels, size) if frame.pixels and size else b""
+    return digest_frame(frame.width, frame.height, frame.offsetX, frame.offsetY, bytes([frame.channels]), pixels)
+
+
+def release_frames(frame_buffer, frame_count):
+    """Release the native pixel buffers of a loaded image."""
+    if not frame_buffer:
+        return
+
+    for i in range(0, frame_count):
+        frame = frame_buffer[i].contents
+        if frame.pixels:
+            ape.free_frame_buffer(frame.pixels)
+            # Null the pointer so ApeCore never frees it a second time
+            frame.pixels = None
+
+# ------------------------------------- Instance pool ------------------------------------- #
+
+
+class InstancePool:
+    """ApeCore instances for concurrent decodes, with a ceiling on retained native memory.
+
+    ApeCore cannot destroy instances safely, so they are created on demand (up
+    to max_instances) and reused; acquire() hands out an instance no other
+    thread holds. Native frame buffers loaded into an instance are tracked
+    until release() frees them. While they exceed memory_limit, new acquires
+    wait for running decodes to finish, and the shared holders (e.g. a
+    FrameCache) are asked to evict retained buffers to make room.
+    """
+
+    def __init__(self, max_instances=None, memory_limit=0):
+        self.max_instances = max_instances or os.cpu_count() or 1
+        self.memory_limit = memory_limit
+        self.idle = []
+        self.created = 0
+        self.in_use = 0
+        self.retained = {}  # id(instance) -> (frame_buffer, frame_count, bytes)
+        self.retained_bytes = 0
+        # Other holders of decoded buffers under the same ceiling: objects with used_bytes and evict(nbytes)
+        self.shared = []
+        self.condition = threading.Condition()
+
+    def over_limit(self):
+        return bool(self.memory_limit) and self.retained_bytes >= self.memory_limit
+
+    def acquire(self, timeout=None):
+        """Return an instance for one decode; blocks while all are busy or memory is over the ceiling."""
+        api = require_ape()
+        with self.condition:
+            while True:
+                # A decode can always start when nothing else is running
+                if not self.over_limit() or not self.in_use:
+                    if self.idle:
+                        instance = self.idle.pop()
+                        break
+                    if self.created < self.max_instances:
+                        instance = api.create_ape_instance()
+                        if not instance:
+                            raise RuntimeError("Failed to create ApeCore instance.")
+                        self.created += 1
+                        break
+                if not self.condition.wait(timeout):
+                    raise RuntimeError("Timed out waiting for an ApeCore instance.")
+            self.in_use += 1
+            return instance
+
+    def release(self, instance):
+        """Free the native buffers an instance still holds and return it to the pool."""
+        with self.condition:
+            entry = self.retained.pop(id(instance), None)
+            if entry:
+                release_frames(entry[0], entry[1])
+                self.retained_bytes -= entry[2]
+            self.idle.append(instance)
+            self.in_use -= 1
+            self.condition.notify_all()
+
+    @contextmanager
+    def session(self):
+        """Acquire an instance for the duration of a with block."""
+        instance = self.acquire()
+        try:
+            yield instance
+        finally:
+            self.release(instance)
+
+    def track(self, instance, frame_buffer, frame_count, nbytes):
+        """Record the native buffers loaded into an instance, evicting shared buffers above the ceiling."""
+        with self.condition:
+            self.retained[id(instance)] = (frame_buffer, frame_count, nbytes)
+            self.retained_bytes += nbytes
+            excess = self.retained_bytes + sum(holder.used_bytes for holder in self.shared) - self.memory_limit
+        if self.memory_limit and excess > 0:
+            for holder in self.shared:
+                excess -= holder.evict(excess)
+                if excess <= 0:
+                    break
+
+    def untrack(self, instance):
+        """Forget buffers that were released by their owner."""
+        with self.condition:
+            entry = self.retained.pop(id(instance), None)
+            if entry:
+                self.retained_bytes -= entry[2]
+                self.condition.notify_all()
+
+# ------------------------------------- Engines ------------------------------------------- #
+
+ENGINES = ("native", "python")
+
+
+def default_engine():
+    """ApeCore when its library loaded, otherwise the pure-Python decoder."""
+    return "native" if ape is not None else "python"
+
+
+class NativeFrameSource:
+    """Frames decoded by ApeCore; native pixels are released by close().
+
+    With a pool, the loaded buffers count towards its memory ceiling until then.
+    """
+
+    def __init__(self, instance, graphic_path, pal_path, pool=None):
+        self.instance = instance
+        self.pool = pool
+        self.frame_buffer, self.frame_count = load_native(instance, graphic_path, pal_path)
+        self.headers = frame_headers(self.frame_buffer, self.frame_count)
+        nbytes = native_size(self.headers)
+        instrument.count("native_bytes", nbytes)
+        if pool:
+            pool.track(instance, self.frame_buffer, self.frame_count, nbytes)
+
+    def convert(self, index):
+        return convert_frame(self.frame_buffer, index)
+
+    def digest(self, index):
+        return native_digest(self.frame_buffer, index)
+
+    # ApeCore only hands out expanded pixels, so there is no compact form
+    frame = convert
+
+    def close(self):
+        release_frames(self.frame_buffer, self.frame_count)
+        self.frame_buffer = None
+        if self.pool:
+            self.pool.untrack(self.instance)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def open_frame_source(engine, graphic_path, pal_path, instance=None, pool=None):
+    """Open a graphic with the chosen engine.
+
+    The result has headers, frame(i) (a frame tuple, possibly lazily expanded),
+    convert(i) (an owned BGRA frame tuple), digest(i) (a content hash for
+    finding repeated frames) and close(). Native sources need an
+    instance; pass the pool it came from to account its buffers there.
+    """
+    if engine == "python":
+        from .decoder import ZT1Graphic
+        with instrument.span("python_load"):
+            return ZT1Graphic(graphic_path, pal_path)
+    if engine != "native":
+        raise ValueError(f"Unknown decoder engine: {engine}")
+    if instance is None:
+        raise ValueError("The native engine needs an ApeCore instance.")
+    with instrument.span("native_load"):
+        return NativeFrameSource(instance, graphic_path, pal_path, pool)
@@ -0,0 +1,221 @@
+# APE.Krita Tools
+# by Eric Galvan (Goosifer.IO)
+# https://github.com/openztcc/APE.KritaTools
+# Licensed under MIT (see LICENSE)
+#
+# Reading graphics and palettes straight out of ZT1 .ztd archives (zip files).
+#
+# An archive member is addressed as "path/to/archive.ztd!/animals/lion/m/walk/N".
+# Archives stay open in a small pool shared by every import, each with a
+# case-insensitive member index built once. The Python decoder reads member
+# bytes directly; ApeCore needs real files, so local_path() extracts a member
+# to a per-process temp directory once.
+
+import atexit
+import os
+import shutil
+import tempfile
+import threading
+import zipfile
+from collections import OrderedDict
+
+ARCHIVE_EXTENSIONS = (".ztd", ".zip")
+ARCHIVE_SEPARATOR = "!/"
+
+
+def split_archive_path(path):
+    """Return (archive path, member name) for an archive member path, or None for a plain path."""
+    normalized = path.replace("\\", "/")
+    lower = normalized.lower()
+    for ext in ARCHIVE_EXTENSIONS:
+        marker = lower.find(ext + ARCHIVE_SEPARATOR)
+        if marker != -1:
+            end = marker + len(ext)
+            return path[:end], normalized[end + len(ARCHIVE_SEPARATOR):].strip("/")
+    return None
+
+
+def is_archive(path):
+    """True if path names a .ztd (or .zip) file itself."""
+    return path.lower().endswith(ARCHIVE_EXTENSIONS) and os.path.isfile(path)
+
+
+def member_path(archive_path, member):
+    """Build the "archive.ztd!/member" path of a member."""
+    return archive_path + ARCHIVE_SEPARATOR + member.replace("\\", "/").lstrip("/")
+
+
+class Archive:
+    """An open archive with a case-insensitive index of its members."""
+
+    def __init__(self, path):
+        self.path = path
+        stat = os.stat(path)
+        self.signature = (stat.st_mtime_ns, stat.st_size)
+        self.zip = zipfile.ZipFile(path)
+        self.members = {}
+        self.directories = {}  # lower-case directory -> [member names directly inside it]
+        for info in self.zip.infolist():
+            name = info.filename.replace("\\", "/").lstrip("/")
+            if info.is_dir() or not name:
+                continue
+            self.members[name.lower()] = info
+            directory, _, _ = name.rpartition("/")
+            self.directories.setdefault(directory.lower(), []).append(name)
+
+    def find(self, member):
+        """ZipInfo of a member (any case, either slash style), or None."""
+        return self.members.get(member.replace("\\", "/").strip("/").lower())
+
+    def read(self, member, size=None):
+        """Bytes of a member, or only its first size bytes."""
+        info = self.find(member)
+        if info is None:
+            raise FileNotFoundError(f"{member} not found in {self.path}")
+        with self.zip.open(info) as f:
+            return f.read() if size is None else f.read(size)
+
+    def listdir(self, directory):
+        """Names of the members directly inside a directory of the archive."""
+        names = self.directories.get(directory.replace("\\", "/").strip("/").lower(), [])
+        return [name.rpartition("/")[2] for name in names]
+
+    def close(self):
+        self.zip.close()
+
+
+class ArchivePool:
+    """Open archives shared across imports; reopened when the file changes on disk."""
+
+    def __init__(self, max_open=8):
+        self.max_open = max_open
+        self.archives = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, path):
+        """Return the open Archive for path; raises OSError if it cannot be read."""
+        key = os.path.normcase(os.path.abspath(path))
+        stat = os.stat(path)
+        with self.lock:
+            archive = self.archives.get(key)
+            if archive is not None and archive.signature == (stat.st_mtime_ns, stat.st_size):
+                self.archives.move_to_end(key)
+                return archive
+        try:
+            archive = Archive(path)
+        except zipfile.BadZipFile as e:
+            raise OSError(f"Not a readable archive: {path} ({e})")
+        with self.lock:
+            stale = self.archives.pop(key, None)
+            self.archives[key] = archive
+            while len(self.archives) > self.max_open:
+                _, evicted = self.archives.popitem(last=False)
+                evicted.close()
+        if stale is not None:
+            stale.close()
+        return archive
+
+    def clear(self):
+        with self.lock:
+            for archive in self.archives.values():
+                archive.close()
+            self.archives.clear()
+
+
+# Shared by every stage of an import
+archive_pool = ArchivePool()
+
+# ------------------------------------- File access ----------------------------------------- #
+
+
+def isfile(path):
+    """os.path.isfile that also accepts archive member paths."""
+    parts = split_archive_path(path)
+    if parts is None:
+        return os.path.isfile(path)
+    try:
+        return archive_pool.get(parts[0]).find(parts[1]) is not None
+    except OSError:
+        return False
+
+
+def read_file(path, size=None):
+    """Bytes of a file or archive member (only the first size bytes if given)."""
+    parts = split_archive_path(path)
+    if parts is None:
+        with open(path, "rb") as f:
+            return f.read() if size is None else f.read(size)
+    return archive_pool.get(parts[0]).read(parts[1], size)
+
+
+def signature(path):
+    """(mtime_ns, size) identifying the current contents of a file or archive member."""
+    parts = split_archive_path(path)
+    if parts is None:
+        stat = os.stat(path)
+        return stat.st_mtime_ns, stat.st_size
+    archive = archive_pool.get(parts[0])
+    info = archive.find(parts[1])
+    if info is None:
+        raise FileNotFoundError(f"{parts[1]} not found in {parts[0]}")
+    # Rewriting any member changes the archive's own mtime
+    return archive.signature[0], info.file_size
+
+
+def listdir(directory):
+    """os.listdir that also lists directories inside archives ("archive.ztd!/animals/lion")."""
+    parts = split_archive_path(directory if directory.endswith("/") else directory + "/")
+    if parts is None:
+        return os.listdir(directory)
+    return archive_pool.get(parts[0]).listdir(parts[1])
+
+
+def find_member(archive_path, member):
+    """Member path with the real case of a member, or None if the archive has no such member."""
+    try:
+        info = archive_pool.get(archive_path).find(member)
+    except OSError:
+        return None
+    return member_path(archive_path, info.filename) if info else None
+
+# ------------------------------------- Extraction ------------------------------------------ #
+
+_extract_lock = threading.Lock()
+_extract_dir = None
+_extracted = {}
+
+
+def local_path(path):
+    """A real file with the contents of path, for code that needs one (ApeCore).
+
+    Plain paths are returned as they are; archive members are extracted once
+    per process into a temp directory removed at exit.
+    """
+    global _extract_dir
+    parts = split_archive_path(path)
+    if parts is None:
+        return path
+
+    key = (os.path.normcase(os.path.abspath(parts[0])), parts[1].lower(), signature(path))
+    with _extract_lock:
+        extracted = _extracted.get(key)
+        if extracted and os.path.isfile(extracted):
+            return extracted
+        if _extract_dir is None:
+            _extract_dir = tempfile.mkdtemp(prefix="ape_ztd_")
+            atexit.register(shutil.rmtree, _extract_dir, True)
+        # One directory per extraction keeps the member's own file name
+        target_dir = tempfile.mkdtemp(dir=_extract_dir)
+    extracted = os.path.join(target_dir, os.path.basename(parts[1]))
+    with open(extracted, "wb") as f:
+        f.write(read_file(path))
+    with _extract_lock:
+        _extracted[key] = extracted
+    return extracted
+
+
+def graphic_members(archive_path):
+    """Member paths of an archive that may be graphics (ZT1 graphics have no extension), sorted."""
+    names = (info.filename.replace("\\", "/").lstrip("/") for info in archive_pool.get(archive_path).members.values())
+    return [member_path(archive_path, name) for name in sorted(names)
+            if not os.path.splitext(name)[1] and not os.path.basename(name).startswith(".")]
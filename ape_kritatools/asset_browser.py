@@ -0,0 +1,267 @@
+# APE.Krita Tools
+# by Eric Galvan (Goosifer.IO)
+# https://github.com/openztcc/APE.KritaTools
+# Licensed under MIT (see LICENSE)
+#
+# Docker browsing a ZT1 asset directory with first-frame thumbnails.
+#
+# Thumbnails are only requested for rows the view paints, rendered on a
+# dedicated thread pool (newest request first, so fast scrolling serves what
+# is on screen now) and kept on disk by ThumbnailCache.
+
+import os
+from collections import OrderedDict
+
+from krita import *
+
+from .apecore import ape
+from .batch import find_graphics
+from .thumbnails import THUMBNAIL_SIZE, ThumbnailCache, make_thumbnail
+from .workers import FunctionTask
+
+# Requests beyond this are dropped oldest first; they are requested again if painted again
+MAX_PENDING = 256
+
+# Decoded thumbnails kept in memory (the disk cache holds the rest)
+MAX_ICONS = 1024
+
+
+class ThumbnailLoader(QObject):
+    """Render thumbnails on a thread pool and hand them to the GUI thread as QImages."""
+
+    ready = pyqtSignal(str)
+
+    def __init__(self, cache, engine="python", threads=2, index=None, pool=None, parent=None):
+        super().__init__(parent)
+        self.cache = cache
+        self.engine = engine
+        self.index = index
+        # Native decodes use the extension's InstancePool, so thumbnails count against its memory limit
+        self.pool = pool
+        self.thread_pool = QThreadPool(self)
+        self.thread_pool.setMaxThreadCount(threads)
+        self.images = OrderedDict()  # graphic path -> QImage, least recently used first
+        self.failed = set()
+        self.pending = OrderedDict()
+        self.running = {}            # request id -> graphic path
+        self.request_id = 0
+
+    def image(self, path):
+        """QImage of a thumbnail already loaded, or None (queueing it unless it failed)."""
+        image = self.images.get(path)
+        if image is not None:
+            self.images.move_to_end(path)
+            return image
+        if path not in self.failed:
+            self.request(path)
+        return None
+
+    def request(self, path):
+        if path in self.running.values():
+            return
+        self.pending[path] = True
+        self.pending.move_to_end(path)
+        while len(self.pending) > MAX_PENDING:
+            self.pending.popitem(last=False)
+        self.dispatch()
+
+    def dispatch(self):
+        while self.pending and len(self.running) < self.thread_pool.maxThreadCount():
+            path, _ = self.pending.popitem(last=True)
+            self.request_id += 1
+            self.running[self.request_id] = path
+            task = FunctionTask(self.request_id, self.load, (path,))
+            task.signals.finished.connect(self.on_finished)
+            self.thread_pool.start(task)
+
+    def load(self, path):
+        """Runs on the thread pool: render or reuse the PNG and read it (QImage is thread-safe)."""
+        image = QImage(make_thumbnail(path, self.cache, self.engine, self.pool, self.index))
+        if image.isNull():
+            raise ValueError("Unreadable thumbnail.")
+        return image
+
+    @pyqtSlot(int, object)
+    def on_finished(self, request_id, result):
+        path = self.running.pop(request_id, None)
+        if path is not None:
+            if isinstance(result, Exception):
+                self.failed.add(path)
+            else:
+                self.images[path] = result
+                while len(self.images) > MAX_ICONS:
+                    self.images.popitem(last=False)
+            self.ready.emit(path)
+        self.dispatch()
+
+    def clear(self):
+        """Forget queued requests and failures (thumbnails already loaded stay)."""
+        self.pending.clear()
+        self.failed.clear()
+
+
+class AssetListModel(QAbstractListModel):
+    """Graphics under the browsed root; thumbnails are fetched as rows are painted."""
+
+    def __init__(self, loader, parent=None):
+        super().__init__(parent)
+        self.loader = loader
+        self.entries = []  # (path, relative path)
+        self.rows = {}
+        self.placeholder = QIcon.fromTheme("image-x-generic")
+        self.broken = QIcon.fromTheme("image-missing")
+        self.icons = OrderedDict()  # QPixmaps may only be made on the GUI thread, so here
+        loader.ready.connect(self.thumbnail_ready)
+
+    def set_entries(self, entries):
+        self.beginResetModel()
+        self.entries = entries
+        self.rows = {path: row for row, (path, _) in enumerate(entries)}
+        self.icons.clear()
+        self.endResetModel()
+
+    def rowCount(self, parent=None):
+        return 0 if parent is not None and parent.isValid() else len(self.entries)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        path, relative = self.entries[index.row()]
+        if role == Qt.DisplayRole:
+            # Facings share names ("N", "NE"), so show the animation they belong to
+            return "/".join(relative.split("/")[-3:])
+        if role == Qt.ToolTipRole:
+            return relative
+        if role == Qt.UserRole:
+            return path
+        if role == Qt.DecorationRole:
+            return self.icon(path)
+        return None
+
+    def icon(self, path):
+        icon = self.icons.get(path)
+        if icon is not None:
+            return icon
+        image = self.loader.image(path)
+        if image is None:
+            return self.broken if path in self.loader.failed else self.placeholder
+        icon = QIcon(QPixmap.fromImage(image))
+        self.icons[path] = icon
+        while len(self.icons) > MAX_ICONS:
+            self.icons.popitem(last=False)
+        return icon
+
+    @pyqtSlot(str)
+    def thumbnail_ready(self, path):
+        row = self.rows.get(path)
+        if row is not None:
+            index = self.index(row)
+            self.dataChanged.emit(index, index, [Qt.DecorationRole])
+
+
+class AssetBrowserDocker(DockWidget):
+
+    def __init__(self, extension):
+        super().__init__()
+        self.setWindowTitle("APE Asset Browser")
+        self.extension = extension
+        self.list_request = 0
+        app = Krita.instance()
+
+        widget = QWidget(self)
+        layout = QVBoxLayout(widget)
+
+        root_row = QHBoxLayout()
+        self.root_text = QLineEdit()
+        self.root_text.setReadOnly(True)
+        root_row.addWidget(self.root_text)
+        browse_button = QPushButton("Browse...")
+        browse_button.clicked.connect(self.browse_triggered)
+        root_row.addWidget(browse_button)
+        layout.addLayout(root_row)
+
+        self.filter_text = QLineEdit()
+        self.filter_text.setPlaceholderText("Filter (e.g. lion/m/walk)")
+        layout.addWidget(self.filter_text)
+
+        # Thumbnails of every browser session share one disk cache
+        base = QStandardPaths.writableLocation(QStandardPaths.CacheLocation)
+        size = int(app.readSetting("ape_kritatools", "thumbnail_size", str(THUMBNAIL_SIZE)))
+        cache = ThumbnailCache(os.path.join(base, "ape_kritatools", "thumbnails"), size)
+        # The Python decoder reads only the first frame; ApeCore decodes them all
+        engine = app.readSetting("ape_kritatools", "thumbnail_engine", "python")
+        if engine == "native" and (ape is None or not extension.ape_pool and extension.ape_init() < 1):
+            engine = "python"
+        threads = int(app.readSetting("ape_kritatools", "thumbnail_threads", str(max(1, min(4, (os.cpu_count() or 2) - 1)))))
+        self.loader = ThumbnailLoader(cache, engine, threads, extension.asset_index, extension.ape_pool, self)
+
+        self.model = AssetListModel(self.loader, self)
+        self.proxy = QSortFilterProxyModel(self)
+        self.proxy.setSourceModel(self.model)
+        self.proxy.setFilterRole(Qt.ToolTipRole)
+        self.proxy.setFilterCaseSensitivity(Qt.CaseInsensitive)
+        self.filter_text.textChanged.connect(self.proxy.setFilterFixedString)
+
+        self.view = QListView()
+        self.view.setViewMode(QListView.IconMode)
+        self.view.setResizeMode(QListView.Adjust)
+        self.view.setMovement(QListView.Static)
+        self.view.setIconSize(QSize(size, size))
+        self.view.setGridSize(QSize(size + 24, size + 36))
+        self.view.setWordWrap(True)
+        # Equal cells and batched layout keep thousands of rows cheap to lay out and scroll
+        self.view.setUniformItemSizes(True)
+        self.view.setLayoutMode(QListView.Batched)
+        self.view.setBatchSize(200)
+        self.view.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.view.setModel(self.proxy)
+        self.view.doubleClicked.connect(self.item_activated)
+        layout.addWidget(self.view)
+
+        self.status_label = QLabel("")
+        layout.addWidget(self.status_label)
+
+        self.setWidget(widget)
+        self.set_root(app.readSetting("ape_kritatools", "browser_root", "") or
+                      app.readSetting("ape_kritatools", "asset_root", ""))
+
+    def canvasChanged(self, canvas):
+        pass
+
+    def browse_triggered(self):
+        root = QFileDialog.getExistingDirectory(self, "Browse ZT1 Assets", self.root_text.text())
+        if not root:
+            return
+        Krita.instance().writeSetting("ape_kritatools", "browser_root", root)
+        self.set_root(root)
+
+    def set_root(self, root):
+        """List the graphics under root (including .ztd archives) on a worker thread."""
+        self.root_text.setText(root)
+        self.loader.clear()
+        self.loader.index = self.extension.asset_index
+        self.model.set_entries([])
+        if not root or not os.path.isdir(root):
+            self.status_label.setText("Choose a folder of ZT1 graphics.")
+            return
+
+        self.status_label.setText("Listing...")
+        self.list_request += 1
+        task = FunctionTask(self.list_request, lambda: list(find_graphics(root)), ())
+        task.signals.finished.connect(self.on_listed)
+        QThreadPool.globalInstance().start(task)
+
+    @pyqtSlot(int, object)
+    def on_listed(self, request_id, result):
+        # A newer root was chosen while this one was listed
+        if request_id != self.list_request:
+            return
+        if isinstance(result, Exception):
+            self.status_label.setText(f"Error: Could not list the folder. ({result})")
+            return
+        self.model.set_entries(result)
+        self.status_label.setText(f"{len(result)} graphics")
+
+    def item_activated(self, index):
+        """Double-click imports the graphic with its embedded palette."""
+        self.extension.import_graphic(index.data(Qt.UserRole))
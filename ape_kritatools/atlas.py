@@ -0,0 +1,256 @@
+# APE.Krita Tools
+# by Eric Galvan (Goosifer.IO)
+# https://github.com/openztcc/APE.KritaTools
+# Licensed under MIT (see LICENSE)
+#
+# Texture atlas export: trims every frame to its opaque pixels, packs them
+# with a skyline bottom-left bin packer and writes the atlas PNG plus a JSON
+# sidecar with frame rects, trimmed offsets and animation speed.
+#
+# Usage: python -m ape_kritatools.atlas GRAPHIC [GRAPHIC ...] -o atlas.png [--directions]
+
+import argparse
+import json
+import math
+import os
+import re
+import time
+from collections import Counter
+
+from .apecore import ENGINES, InstancePool, default_engine, require_ape
+from .directions import decode_set, find_direction_set
+from .pixels import crop, to_bgra, trim_bounds
+from .palettes import AssetIndex, index_cache_path
+from .png import write_png
+from .probe import probe
+
+# ------------------------------------- Packing --------------------------------------------- #
+
+
+def _skyline_fit(skyline, index, width, atlas_width):
+    """Lowest y at which a rect of the given width can sit starting at skyline segment index."""
+    x = skyline[index][0]
+    if x + width > atlas_width:
+        return None
+    y = 0
+    remaining = width
+    while remaining > 0:
+        y = max(y, skyline[index][1])
+        remaining -= skyline[index][2]
+        index += 1
+    return y
+
+
+def pack_skyline(sizes, atlas_width, padding=0):
+    """Place (w, h) rects with the skyline bottom-left heuristic.
+
+    Returns ([(x, y)] in input order, atlas height). Rects are placed tallest
+    first; padding is kept to the right of and below every rect.
+    """
+    positions = [None] * len(sizes)
+    skyline = [[0, 0, atlas_width]]  # segments of [x, y, width]
+    height = 0
+
+    for i in sorted(range(len(sizes)), key=lambda i: (-sizes[i][1], -sizes[i][0])):
+        w = sizes[i][0] + padding
+        h = sizes[i][1] + padding
+        if w > atlas_width:
+            raise ValueError(f"Frame of width {sizes[i][0]} does not fit an atlas {atlas_width} wide.")
+
+        best = None
+        for index in range(len(skyline)):
+            y = _skyline_fit(skyline, index, w, atlas_width)
+            if y is not None and (best is None or (y + h, skyline[index][0]) < best[:2]):
+                best = (y + h, skyline[index][0], index, y)
+        _, x, index, y = best
+        positions[i] = (x, y)
+        height = max(height, y + h)
+
+        # Raise the skyline under the new rect
+        skyline.insert(index, [x, y + h, w])
+        following = index + 1
+        while following < len(skyline):
+            segment = skyline[following]
+            overlap = x + w - segment[0]
+            if overlap <= 0:
+                break
+            if overlap < segment[2]:
+                segment[0] += overlap
+                segment[2] -= overlap
+                break
+            del skyline[following]
+
+        # Merge neighbours of equal height
+        merged = [skyline[0]]
+        for segment in skyline[1:]:
+            if segment[1] == merged[-1][1]:
+                merged[-1][2] += segment[2]
+            else:
+                merged.append(segment)
+        skyline = merged
+
+    return positions, height
+
+
+def atlas_width_for(sizes, padding=0, max_width=None):
+    """Pick an atlas width: roughly square, at least as wide as the widest rect."""
+    widest = max((w + padding for w, _ in sizes), default=1)
+    area = sum((w + padding) * (h + padding) for w, h in sizes)
+    width = max(widest, int(math.ceil(math.sqrt(area * 1.1))))
+    if max_width:
+        width = max(widest, min(width, max_width))
+    return width
+
+# ------------------------------------- Atlas ----------------------------------------------- #
+
+
+def build_atlas(animations, padding=1, trim=True, max_width=None):
+    """Pack frames of several animations into one RGBA atlas.
+
+    animations is a list of (name, frames) with BGRA frame tuples or
+    IndexedFrames. Returns (width, height, rgba, entries) where entries are the
+    sidecar dicts for every frame, in input order.
+    """
+    entries = []
+    images = []
+    for name, frames in animations:
+        for index, frame in enumerate(frames):
+            width, height, offsetX, offsetY, _, pixels = frame
+            bounds = trim_bounds(width, height, pixels) if trim else (0, 0, width, height)
+            if bounds is None:
+                # Fully transparent frames still get an entry, with an empty rect
+                bounds = (0, 0, 0, 0)
+            x, y, w, h = bounds
+            entries.append({
+                "animation": name,
+                "index": index,
+                "w": w,
+                "h": h,
+                # ZT1 places a frame at pivot - offset, so trimming shifts the offset
+                "offsetX": offsetX - x,
+                "offsetY": offsetY - y,
+                "trimX": x,
+                "trimY": y,
+                "sourceW": width,
+                "sourceH": height,
+            })
+            images.append(crop(pixels, width, x, y, w, h) if w and h else b"")
+
+    # Empty frames take no space in the atlas
+    packed = [i for i, entry in enumerate(entries) if entry["w"] and entry["h"]]
+    sizes = [(entries[i]["w"], entries[i]["h"]) for i in packed]
+    atlas_width = atlas_width_for(sizes, padding, max_width)
+    placed, atlas_height = pack_skyline(sizes, atlas_width, padding)
+    atlas_height = max(atlas_height, 1)
+    positions = [(0, 0)] * len(entries)
+    for i, position in zip(packed, placed):
+        positions[i] = position
+
+    atlas = bytearray(atlas_width * atlas_height * 4)
+    for entry, image, (x, y) in zip(entries, images, positions):
+        entry["x"] = x
+        entry["y"] = y
+        row_bytes = entry["w"] * 4
+        for row in range(entry["h"]):
+            start = ((y + row) * atlas_width + x) * 4
+            atlas[start:start + row_bytes] = image[row * row_bytes:(row + 1) * row_bytes]
+
+    # Frames are BGRA; swap the whole atlas to RGBA once
+    to_bgra(atlas, 4, atlas)
+    return atlas_width, atlas_height, atlas, entries
+
+
+def write_atlas(path, animations, speeds=None, padding=1, trim=True, max_width=None):
+    """Write an atlas PNG and its JSON sidecar (same name, .json); returns the sidecar dict."""
+    width, height, rgba, entries = build_atlas(animations, padding, trim, max_width)
+    write_png(path, width, height, rgba)
+
+    speeds = speeds or {}
+    sidecar = {
+        "image": os.path.basename(path),
+        "width": width,
+        "height": height,
+        "animations": {
+            name: {
+                "speed": speeds.get(name, 0),
+                "fps": 1000 / speeds[name] if speeds.get(name) else 0,
+                "frames": len(frames),
+            }
+            for name, frames in animations
+        },
+        "frames": entries,
+    }
+    with open(os.path.splitext(path)[0] + ".json", "w", encoding="utf-8") as f:
+        json.dump(sidecar, f, indent=1)
+    return sidecar
+
+
+def animation_names(paths):
+    """Name each graphic "<directory>/<file>" (e.g. "walk/NE"), adding parent directories until names are unique."""
+    parts = {path: [part for part in re.split(r"[\\/]", os.path.abspath(path)) if part] for path in paths}
+    depth = dict.fromkeys(paths, 2)
+    while True:
+        names = {path: "/".join(parts[path][-depth[path]:]) for path in paths}
+        counts = Counter(names.values())
+        clashing = [path for path in paths if counts[names[path]] > 1 and depth[path] < len(parts[path])]
+        if not clashing:
+            return names
+        for path in clashing:
+            depth[path] += 1
+
+
+def export_atlas(graphic_paths, out_path, pal_path=None, engine=None, directions=False, padding=1,
+                 trim=True, max_width=None, pool=None, index=None):
+    """Decode graphics (optionally every facing next to each) and write one atlas; returns the sidecar."""
+    engine = engine or default_engine()
+
+    paths = []
+    for graphic_path in graphic_paths:
+        found = find_direction_set(graphic_path) if directions else []
+        for path in [path for _, path in found] or [graphic_path]:
+            if path not in paths:
+                paths.append(path)
+
+    if engine == "native" and pool is None:
+        require_ape()
+        pool = InstancePool(min(len(paths), os.cpu_count() or 1))
+
+    # Decoded facings are keyed by path; names only label them in the sidecar
+    decoded = dict(decode_set(engine, [(path, path) for path in paths], pal_path, pool, index=index))
+    names = animation_names(paths)
+    animations = [(names[path], decoded[path]) for path in paths]
+    speeds = {names[path]: probe(path).speed for path in paths}
+    return write_atlas(out_path, animations, speeds, padding, trim, max_width)
+
+# ------------------------------------- Entry point ----------------------------------------- #
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m ape_kritatools.atlas",
+                                     description="Pack the frames of ZT1 graphics into a texture atlas.")
+    parser.add_argument("graphics", nargs="+", help="ZT1 graphics to include")
+    parser.add_argument("-o", "--output", required=True, help="atlas PNG to write (the sidecar gets a .json extension)")
+    parser.add_argument("--palette", help="palette to use instead of each graphic's embedded palette")
+    parser.add_argument("--asset-root", help="game asset directory that embedded palette names are relative to")
+    parser.add_argument("--directions", action="store_true", help="include every facing next to each graphic")
+    parser.add_argument("--padding", type=int, default=1, help="transparent pixels between frames")
+    parser.add_argument("--max-width", type=int, help="widest atlas allowed")
+    parser.add_argument("--no-trim", action="store_true", help="keep the full frame rects")
+    parser.add_argument("--engine", choices=ENGINES, help="decoder to use (default: native if ApeCore loads, else python)")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    index = AssetIndex(args.asset_root, index_cache_path(args.asset_root)) if args.asset_root else None
+    try:
+        sidecar = export_atlas(args.graphics, args.output, args.palette, args.engine, args.directions,
+                               args.padding, not args.no_trim, args.max_width, index=index)
+    except (OSError, RuntimeError, ValueError) as e:
+        print(f"error: {e}")
+        return 1
+    print(f"Packed {len(sidecar['frames'])} frames from {len(sidecar['animations'])} animations into "
+          f"{sidecar['width']}x{sidecar['height']} in {time.perf_counter() - start:.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,258 @@
+# APE.Krita Tools
+# by Eric Galvan (Goosifer.IO)
+# https://github.com/openztcc/APE.KritaTools
+# Licensed under MIT (see LICENSE)
+#
+# Headless batch converter: ZT1 graphics to PNG frames or sprite sheets.
+#
+# Usage: python -m ape_kritatools.batch SOURCE_DIR OUTPUT_DIR [--mode frames|sheet]
+
+import argparse
+import json
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from .apecore import ENGINES, default_engine, open_frame_source, require_ape
+from .archives import ARCHIVE_EXTENSIONS, ARCHIVE_SEPARATOR, graphic_members, isfile, signature
+from .palettes import AssetIndex, index_cache_path, resolve_palette
+from .pixels import to_bgra
+from .png import write_png
+from .probe import probe_graphic
+
+PROGRESS_FILE = ".ape_batch_progress.jsonl"
+
+# ZT1 graphics have no extension; these are the other files found next to them
+SKIP_EXTENSIONS = {".pal", ".ani", ".cfg", ".uca", ".ucs", ".ucb", ".ai", ".scn", ".txt", ".png", ".bmp", ".wav", ".lle"}
+
+# Per-process ApeCore instance and asset index (created by the pool initializer)
+_instance = None
+_index = None
+
+# ------------------------------------- Discovery ------------------------------------------- #
+
+
+def find_graphics(root, all_files=False):
+    """Yield (path, relative path) for every candidate graphic under root, including inside .ztd archives."""
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            ext = os.path.splitext(filename)[1].lower()
+            if ext in ARCHIVE_EXTENSIONS:
+                # Members are converted to "<archive name>/<member path>"
+                archive = os.path.join(dirpath, filename)
+                prefix = os.path.relpath(archive, root).replace("\\", "/")
+                try:
+                    members = graphic_members(archive)
+                except OSError as e:
+                    print(f"error: {prefix}: {e}")
+                    continue
+                for path in members:
+                    yield path, prefix + "/" + path.split(ARCHIVE_SEPARATOR, 1)[1]
+                continue
+            if not all_files and (ext or filename.startswith(".")):
+                continue
+            if ext in SKIP_EXTENSIONS:
+                continue
+            path = os.path.join(dirpath, filename)
+            yield path, os.path.relpath(path, root).replace("\\", "/")
+
+
+def load_progress(out_dir, config=None):
+    """Return {relative path: [mtime, size]} for files converted by a previous run with the same config."""
+    done = {}
+    path = os.path.join(out_dir, PROGRESS_FILE)
+    if not os.path.isfile(path):
+        return done
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                # Partially written line from an interrupted run
+                continue
+            # Output written with another mode, palette or sheet layout does not count
+            if entry.get("config") != config:
+                continue
+            done[entry["path"]] = [entry["mtime"], entry["size"]]
+    return done
+
+# ------------------------------------- Conversion ------------------------------------------ #
+
+
+def sheet_layout(frames, columns=None):
+    """Return (cell width, cell height, columns, rows, [(x, y) in cell]) for a frame list."""
+    max_offset_x = max(frame[2] for frame in frames)
+    max_offset_y = max(frame[3] for frame in frames)
+    placements = [(max_offset_x - frame[2], max_offset_y - frame[3]) for frame in frames]
+    cell_w = max(x + frame[0] for (x, _), frame in zip(placements, frames))
+    cell_h = max(y + frame[1] for (_, y), frame in zip(placements, frames))
+    columns = columns or math.ceil(math.sqrt(len(frames)))
+    rows = math.ceil(len(frames) / columns)
+    return cell_w, cell_h, columns, rows, placements
+
+
+def write_sheet(path, frames, columns=None):
+    """Compose RGBA frames into a grid and write it as one PNG."""
+    cell_w, cell_h, columns, rows, placements = sheet_layout(frames, columns)
+    sheet_w = cell_w * columns
+    sheet = bytearray(sheet_w * cell_h * rows * 4)
+    for i, ((width, height, _, _, _, rgba), (x, y)) in enumerate(zip(frames, placements)):
+        left = (i % columns) * cell_w + x
+        top = (i // columns) * cell_h + y
+        row_bytes = width * 4
+        for row in range(height):
+            dst = ((top + row) * sheet_w + left) * 4
+            sheet[dst:dst + row_bytes] = rgba[row * row_bytes:(row + 1) * row_bytes]
+    write_png(path, sheet_w, cell_h * rows, sheet)
+
+
+def _init_worker(engine, asset_root=None):
+    """Create the ApeCore instance and load the asset index used by this worker process."""
+    global _instance, _index
+    if engine == "native":
+        _instance = require_ape().create_ape_instance()
+    if asset_root:
+        # run() refreshed and saved the index, so this is a file read
+        _index = AssetIndex(asset_root, index_cache_path(asset_root))
+        _index.ensure()
+
+
+def convert_file(job):
+    """Convert one graphic; runs inside a worker process."""
+    path, rel, out_dir, mode, palette, columns, engine = job
+    mtime, size = signature(path)
+    result = {"path": rel, "mtime": mtime, "size": size, "frames": 0}
+
+    info = probe_graphic(path)
+    if not info.valid:
+        result["status"] = "skipped"
+        return result
+
+    if not palette:
+        palette = resolve_palette(info.pal_name, path, _index)
+    if not isfile(palette):
+        result["status"] = "error"
+        result["error"] = f"palette not found: {palette}"
+        return result
+
+    target = os.path.join(out_dir, rel)
+    try:
+        with open_frame_source(engine, path, palette, _instance) as source:
+            frame_count = len(source.headers)
+            if mode == "frames":
+                os.makedirs(target, exist_ok=True)
+            else:
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+
+            if mode == "frames" and engine == "native":
+                # ApeCore writes the PNGs itself
+                ape = require_ape()
+                for i in range(frame_count):
+                    name = "background.png" if info.has_bg_frame and i == frame_count - 1 else f"{i:03d}.png"
+                    ape.frame_to_png(_instance, os.path.join(target, name).encode(), i)
+            else:
+                frames = []
+                for i in range(frame_count):
+                    width, height, offsetX, offsetY, channels, bgra = source.convert(i)
+                    # PNG wants RGBA; swap the owned BGRA buffer back in place
+                    frames.append((width, height, offsetX, offsetY, channels, to_bgra(bgra, 4, bgra)))
+                bg_frame = frames.pop() if info.has_bg_frame else None
+
+                if mode == "frames":
+                    for i, frame in enumerate(frames):
+                        write_png(os.path.join(target, f"{i:03d}.png"), frame[0], frame[1], frame[5])
+                    if bg_frame:
+                        write_png(os.path.join(target, "background.png"), bg_frame[0], bg_frame[1], bg_frame[5])
+                else:
+                    if bg_frame:
+                        write_png(target + "_background.png", bg_frame[0], bg_frame[1], bg_frame[5])
+                    if frames:
+                        write_sheet(target + ".png", frames, columns)
+    except (OSError, RuntimeError, ValueError) as e:
+        result["status"] = "error"
+        result["error"] = str(e)
+        return result
+
+    result["status"] = "ok"
+    result["frames"] = frame_count
+    return result
+
+# ------------------------------------- Entry point ----------------------------------------- #
+
+
+def run(source, out_dir, mode="frames", palette=None, columns=None, workers=None, force=False, all_files=False, engine=None,
+        asset_root=None):
+    """Convert every graphic under source and return a summary dict."""
+    engine = engine or default_engine()
+    if engine == "native":
+        # Fail early rather than in every worker
+        require_ape()
+    if asset_root and not palette:
+        # Scan (or update) the index once here; workers load the saved copy
+        AssetIndex(asset_root, index_cache_path(asset_root)).refresh()
+    else:
+        asset_root = None
+    os.makedirs(out_dir, exist_ok=True)
+    # Everything that changes what a conversion writes
+    config = {"mode": mode, "palette": os.path.abspath(palette) if palette else None, "columns": columns}
+    done = {} if force else load_progress(out_dir, config)
+
+    jobs = []
+    resumed = 0
+    for path, rel in find_graphics(source, all_files):
+        if done.get(rel) == list(signature(path)):
+            resumed += 1
+            continue
+        jobs.append((path, rel, out_dir, mode, palette, columns, engine))
+
+    summary = {"converted": 0, "frames": 0, "skipped": 0, "failed": 0, "resumed": resumed}
+    start = time.perf_counter()
+    with open(os.path.join(out_dir, PROGRESS_FILE), "a", encoding="utf-8") as progress, \
+            ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(engine, asset_root)) as pool:
+        futures = [pool.submit(convert_file, job) for job in jobs]
+        for future in as_completed(futures):
+            result = future.result()
+            if result["status"] == "ok":
+                summary["converted"] += 1
+                summary["frames"] += result["frames"]
+                result["config"] = config
+                progress.write(json.dumps(result) + "\n")
+                progress.flush()
+            elif result["status"] == "skipped":
+                summary["skipped"] += 1
+            else:
+                summary["failed"] += 1
+                print(f"error: {result['path']}: {result['error']}")
+
+    summary["seconds"] = time.perf_counter() - start
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m ape_kritatools.batch",
+                                     description="Convert a tree of ZT1 graphics to PNG frames or sprite sheets.")
+    parser.add_argument("source", help="directory containing ZT1 graphics")
+    parser.add_argument("output", help="directory to write PNGs to (mirrors the source tree)")
+    parser.add_argument("--mode", choices=("frames", "sheet"), default="frames", help="one PNG per frame, or one sheet per animation")
+    parser.add_argument("--palette", help="palette to use instead of each graphic's embedded palette")
+    parser.add_argument("--asset-root", help="game asset directory that embedded palette names are relative to")
+    parser.add_argument("--columns", type=int, help="sheet columns (default: square grid)")
+    parser.add_argument("--workers", type=int, help="worker processes (default: CPU count)")
+    parser.add_argument("--engine", choices=ENGINES, help="decoder to use (default: native if ApeCore loads, else python)")
+    parser.add_argument("--force", action="store_true", help="ignore progress from previous runs")
+    parser.add_argument("--all-files", action="store_true", help="also try files that have an extension")
+    args = parser.parse_args(argv)
+
+    summary = run(args.source, args.output, args.mode, args.palette, args.columns, args.workers, args.force, args.all_files, args.engine,
+                  args.asset_root)
+    seconds = summary["seconds"] or 1e-9
+    print(f"Converted {summary['converted']} files ({summary['frames']} frames) in {summary['seconds']:.2f}s: "
+          f"{summary['converted'] / seconds:.1f} files/s, {summary['frames'] / seconds:.1f} frames/s")
+    print(f"Resumed {summary['resumed']}, skipped {summary['skipped']}, failed {summary['failed']}")
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
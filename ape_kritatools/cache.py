@@ -0,0 +1,235 @@
+# APE.Krita Tools
+# by Eric Galvan (Goosifer.IO)
+# https://github.com/openztcc/APE.KritaTools
+# Licensed under MIT (see LICENSE)
+#
+# Decoded-frame cache: an in-memory LRU with an optional on-disk tier.
+
+import hashlib
+import os
+import struct
+import threading
+from collections import OrderedDict
+
+from . import instrument
+from .archives import signature
+
+DISK_MAGIC = b"APEC"
+DISK_VERSION = 1
+FRAME_HEADER = struct.Struct("<iiiiiI")
+
+
+def file_signature(path):
+    """Return (absolute path, mtime_ns, size) for a file or archive member, or None if it does not exist."""
+    try:
+        mtime, size = signature(path)
+    except OSError:
+        return None
+    return (os.path.normcase(os.path.abspath(path)), mtime, size)
+
+
+def frame_size(frame):
+    """Bytes of pixel data held by a frame tuple or IndexedFrame."""
+    nbytes = getattr(frame, "nbytes", None)
+    return nbytes if nbytes is not None else len(frame[5])
+
+
+def owned_frame(frame):
+    """A cacheable copy of a frame: IndexedFrames as they are, tuples with immutable pixels."""
+    if hasattr(frame, "nbytes"):
+        return frame
+    instrument.count("allocations")
+    instrument.count("bytes_copied", len(frame[5]))
+    return frame[:5] + (bytes(frame[5]),)
+
+
+def entry_size(entry):
+    """Bytes of pixel data held by a cache entry."""
+    return sum(frame_size(frame) for frame in entry["frames"])
+
+
+class FrameCache:
+    """LRU cache of converted frames keyed by graphic/palette path and file stats."""
+
+    def __init__(self, max_bytes=256 * 1024 * 1024, disk_dir=None, max_disk_bytes=1024 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.max_disk_bytes = max_disk_bytes
+        self.entries = OrderedDict()
+        self.used_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        # Decode threads may evict under memory pressure while the GUI thread reads
+        self.lock = threading.RLock()
+
+    @property
+    def enabled(self):
+        return self.max_bytes > 0 or bool(self.disk_dir)
+
+    def key(self, graphic_path, pal_path):
+        """Build a cache key; None if either file is missing."""
+        graphic = file_signature(graphic_path)
+        palette = file_signature(pal_path)
+        if graphic is None or palette is None:
+            return None
+        return graphic + palette
+
+    def get(self, key):
+        """Return a cached entry ({"frames": [...], "has_bg_frame": bool}) or None."""
+        if key is None:
+            return None
+
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry
+
+        entry = self.read_disk(key)
+        if entry is not None:
+            self.hits += 1
+            self.put_memory(key, entry)
+            return entry
+
+        self.misses += 1
+        return None
+
+    def get_indexed(self, graphic_path):
+        """Return IndexedFrames of a graphic cached with any palette, or None."""
+        graphic = file_signature(graphic_path)
+        if graphic is None:
+            return None
+        with self.lock:
+            items = list(self.entries.items())
+        for key, entry in reversed(items):
+            frames = entry["frames"]
+            if key[:3] == graphic and frames and hasattr(frames[0], "recolor"):
+                return entry
+        return None
+
+    def put(self, key, entry):
+        """Store an entry. Frame pixel data must be immutable bytes (or IndexedFrames)."""
+        if key is None:
+            return
+        self.put_memory(key, entry)
+        self.write_disk(key, entry)
+
+    def put_memory(self, key, entry):
+        """Insert into the memory tier and evict least recently used entries."""
+        size = entry_size(entry)
+        if size > self.max_bytes:
+            return
+        with self.lock:
+            if key in self.entries:
+                self.used_bytes -= entry_size(self.entries.pop(key))
+            self.entries[key] = entry
+            self.used_bytes += size
+            while self.used_bytes > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.used_bytes -= entry_size(evicted)
+
+    def evict(self, nbytes):
+        """Drop least recently used entries until nbytes are freed; returns the bytes freed."""
+        freed = 0
+        with self.lock:
+            while freed < nbytes and self.entries:
+                _, evicted = self.entries.popitem(last=False)
+                size = entry_size(evicted)
+                self.used_bytes -= size
+                freed += size
+        return freed
+
+    def clear(self):
+        """Drop the memory tier."""
+        with self.lock:
+            self.entries.clear()
+            self.used_bytes = 0
+
+    # ------------------------------------- Disk tier --------------------------------------- #
+
+    def disk_path(self, key):
+        digest = hashlib.sha1(repr(key).encode("utf-8")).hexdigest()
+        return os.path.join(self.disk_dir, digest + ".apecache")
+
+    def read_disk(self, key):
+        """Load an entry from the disk tier, or None."""
+        if not self.disk_dir:
+            return None
+        path = self.disk_path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+
+        entry = self.parse_disk(data)
+        try:
+            if entry is None:
+                # Truncated, corrupt or from another version: a miss, and rewritten after the import
+                os.remove(path)
+            else:
+                # Mark as recently used for disk eviction
+                os.utime(path, None)
+        except OSError:
+            pass
+        return entry
+
+    @staticmethod
+    def parse_disk(data):
+        """Decode the contents of a cache file, or None if it is not a complete one of this version."""
+        if data[:4] != DISK_MAGIC:
+            return None
+        try:
+            version, has_bg_frame, count = struct.unpack_from("<HBI", data, 4)
+            if version != DISK_VERSION:
+                return None
+            pos = 11
+            frames = []
+            for _ in range(count):
+                width, height, offsetX, offsetY, channels, length = FRAME_HEADER.unpack_from(data, pos)
+                pos += FRAME_HEADER.size
+                frames.append((width, height, offsetX, offsetY, channels, data[pos:pos + length]))
+                pos += length
+        except struct.error:
+            return None
+        if pos != len(data):
+            return None
+        return {"frames": frames, "has_bg_frame": bool(has_bg_frame)}
+
+    def write_disk(self, key, entry):
+        """Write an entry to the disk tier and trim the tier to its budget."""
+        if not self.disk_dir:
+            return
+        try:
+            os.makedirs(self.disk_dir, exist_ok=True)
+            path = self.disk_path(key)
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(DISK_MAGIC + struct.pack("<HBI", DISK_VERSION, int(entry["has_bg_frame"]), len(entry["frames"])))
+                # IndexedFrames are expanded here; the disk tier always holds BGRA
+                for width, height, offsetX, offsetY, channels, pixels in entry["frames"]:
+                    f.write(FRAME_HEADER.pack(width, height, offsetX, offsetY, channels, len(pixels)))
+                    f.write(pixels)
+            os.replace(tmp_path, path)
+            self.trim_disk()
+        except OSError:
+            # The disk tier is best effort
+            pass
+
+    def trim_disk(self):
+        """Delete the least recently used cache files over the disk budget."""
+        files = []
+        total = 0
+        for name in os.listdir(self.disk_dir):
+            if not name.endswith(".apecache"):
+                continue
+            path = os.path.join(self.disk_dir, name)
+            stat = os.stat(path)
+            files.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+        for _, size, path in sorted(files):
+            if total <= self.max_disk_bytes:
+                break
+            os.remove(path)
+            total -= size
@@ -0,0 +1,245 @@
+# APE.Krita Tools
+# by Eric Galvan (Goosifer.IO)
+# https://github.com/openztcc/APE.KritaTools
+# Licensed under MIT (see LICENSE)
+#
+# Pure-Python reference decoder for ZT1 graphics, used when ApeCore is
+# unavailable or selected explicitly. Produces the same frames as the native
+# engine (see apecore.open_frame_source).
+#
+# Frame layout (little endian), following the graphic header (see probe.py):
+#   uint32 frame size (bytes after this field)
+#   uint16 height, uint16 width
+#   int16 offsetY, int16 offsetX
+#   uint16 unknown
+#   per row: uint8 instruction count, then per instruction:
+#       uint8 transparent pixels to skip, uint8 pixel count, pixel count palette indices
+#
+# Palette layout: uint16 color count, 2 reserved bytes, then count * (R, G, B, A).
+#
+# Decoded frames are kept as IndexedFrame (index + alpha plane, 2 bytes per
+# pixel, sharing one Palette per animation) and only expanded to BGRA when a
+# layer is written.
+
+import mmap
+import struct
+
+from . import instrument
+from .archives import read_file, split_archive_path
+from .pixels import digest_frame, expand_indexed
+from .probe import GraphicInfo, parse_header
+
+FRAME_HEADER = struct.Struct("<IHHhhH")
+PALETTE_HEADER = struct.Struct("<HH")
+MAX_COLORS = 256
+
+# Source for alpha runs (instruction pixel counts are at most 255)
+OPAQUE = b"\xff" * 256
+
+
+class Palette:
+    """A ZT1 palette as a 256-entry BGRA lookup table."""
+
+    def __init__(self, path, colors):
+        self.path = path
+        self.count = len(colors) // 4
+        # Pad to 256 entries so any index byte can be looked up
+        rgba = bytes(colors) + bytes(MAX_COLORS * 4 - len(colors))
+        bgra = bytearray(rgba)
+        bgra[0::4] = rgba[2::4]
+        bgra[2::4] = rgba[0::4]
+        bgra[3::4] = OPAQUE
+        self.bgra = bytes(bgra)
+
+
+class IndexedFrame:
+    """A decoded frame as palette indices; behaves like a (w, h, x, y, channels, BGRA) tuple.
+
+    Unpacking or indexing element 5 expands the pixels through the palette, so
+    frames stay compact until a layer or file is actually written.
+    """
+
+    __slots__ = ("width", "height", "offsetX", "offsetY", "indices", "alpha", "palette")
+
+    def __init__(self, width, height, offsetX, offsetY, indices, alpha, palette):
+        self.width = width
+        self.height = height
+        self.offsetX = offsetX
+        self.offsetY = offsetY
+        self.indices = bytes(indices)
+        self.alpha = bytes(alpha)
+        self.palette = palette
+
+    @property
+    def nbytes(self):
+        """Bytes held by this frame (the palette is shared and not counted)."""
+        return len(self.indices) + len(self.alpha)
+
+    def bgra(self, out=None):
+        """Expand to a BGRA bytearray."""
+        if out is None:
+            instrument.count("allocations")
+        instrument.count("bytes_copied", self.width * self.height * 4)
+        return expand_indexed(self.indices, self.alpha, self.palette.bgra, out)
+
+    def digest(self):
+        """Content hash of the index and alpha planes (see pixels.frame_digest)."""
+        return digest_frame(self.width, self.height, self.offsetX, self.offsetY, self.indices, self.alpha)
+
+    def recolor(self, palette):
+        """The same frame drawn with another palette; the planes are shared, not copied."""
+        return IndexedFrame(self.width, self.height, self.offsetX, self.offsetY, self.indices, self.alpha, palette)
+
+    def __len__(self):
+        return 6
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return tuple(self[i] for i in range(*index.indices(6)))
+        if index < 0:
+            index += 6
+        if index == 5:
+            return self.bgra()
+        return (self.width, self.height, self.offsetX, self.offsetY, 4)[index]
+
+    def __iter__(self):
+        yield self.width
+        yield self.height
+        yield self.offsetX
+        yield self.offsetY
+        yield 4
+        yield self.bgra()
+
+
+def read_palette(path):
+    """Read a .pal file (or archive member); raises ValueError if it is not a ZT1 palette."""
+    data = read_file(path)
+    if len(data) < PALETTE_HEADER.size:
+        raise ValueError("Palette file is too short.")
+    count, _ = PALETTE_HEADER.unpack_from(data, 0)
+    end = PALETTE_HEADER.size + count * 4
+    if count == 0 or count > MAX_COLORS or len(data) < end:
+        raise ValueError("Invalid palette color count.")
+    return Palette(path, data[PALETTE_HEADER.size:end])
+
+
+def validate_palette(path):
+    """True if path is a readable ZT1 palette."""
+    try:
+        read_palette(path)
+    except (OSError, ValueError):
+        return False
+    return True
+
+
+class ZT1Graphic:
+    """A memory-mapped ZT1 graphic (or one read from a .ztd archive); frames are decoded on demand."""
+
+    def __init__(self, graphic_path, pal_path=None, palette=None):
+        self.path = graphic_path
+        self.palette = palette or (read_palette(pal_path) if pal_path else None)
+        if split_archive_path(graphic_path):
+            # Members of .ztd archives are read from the pooled archive handle
+            self.data = read_file(graphic_path)
+        else:
+            with open(graphic_path, "rb") as f:
+                try:
+                    self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                except ValueError:
+                    # Empty files cannot be mapped
+                    self.data = b""
+
+        self.info = parse_header(self.data, GraphicInfo(graphic_path))
+        if not self.info.valid:
+            self.close()
+            raise ValueError(f"Not a ZT1 graphic: {self.info.error}")
+
+        self.frame_index = self.index_frames()
+        self.headers = [(w, h, x, y, 4) for (w, h, x, y, _, _) in self.frame_index]
+        self.frame_count = len(self.frame_index)
+
+    def index_frames(self):
+        """Locate every frame's header and RLE data without decoding pixels."""
+        data = self.data
+        pos = self.info.header_size
+        index = []
+        for _ in range(self.info.frame_count):
+            if pos + FRAME_HEADER.size > len(data):
+                raise ValueError("Truncated frame header.")
+            size, height, width, offsetY, offsetX, _ = FRAME_HEADER.unpack_from(data, pos)
+            start = pos + FRAME_HEADER.size
+            end = pos + 4 + size
+            if end > len(data) or end < start:
+                raise ValueError("Truncated frame data.")
+            index.append((width, height, offsetX, offsetY, start, end))
+            pos = end
+        return index
+
+    def decode_indices(self, index):
+        """Decode one frame into (index plane, alpha plane), each width * height bytes."""
+        width, height, _, _, pos, end = self.frame_index[index]
+        data = self.data
+        indices = bytearray(width * height)
+        alpha = bytearray(width * height)
+
+        for row in range(height):
+            if pos >= end:
+                raise ValueError(f"Frame {index} ends early.")
+            x = row * width
+            row_end = x + width
+            instructions = data[pos]
+            pos += 1
+            for _ in range(instructions):
+                x += data[pos]
+                count = data[pos + 1]
+                pos += 2
+                if x + count > row_end or pos + count > end:
+                    raise ValueError(f"Frame {index} has an invalid pixel run.")
+                indices[x:x + count] = data[pos:pos + count]
+                alpha[x:x + count] = OPAQUE[:count]
+                x += count
+                pos += count
+
+        return indices, alpha
+
+    def digest(self, index):
+        """Content hash of a frame's RLE data; identical frames are found without decoding them."""
+        width, height, offsetX, offsetY, start, end = self.frame_index[index]
+        # A released view, so an mmap can still be closed
+        with memoryview(self.data)[start:end] as data:
+            return digest_frame(width, height, offsetX, offsetY, data)
+
+    def frame(self, index):
+        """Decode one frame into an IndexedFrame (expanded lazily)."""
+        if self.palette is None:
+            raise ValueError("No palette loaded.")
+        width, height, offsetX, offsetY, _, _ = self.frame_index[index]
+        indices, alpha = self.decode_indices(index)
+        return IndexedFrame(width, height, offsetX, offsetY, indices, alpha, self.palette)
+
+    def convert(self, index):
+        """Decode one frame into a BGRA frame tuple (same layout as the native engine)."""
+        return tuple(self.frame(index))
+
+    def close(self):
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+        self.data = b""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def load_frames(graphic_path, pal_path):
+    """Decode every frame of a graphic into IndexedFrames; returns (frames, has_bg_frame)."""
+    with ZT1Graphic(graphic_path, pal_path) as graphic:
+        frames = [graphic.frame(i) for i in range(graphic.frame_count)]
+        return frames, graphic.info.has_bg_frame
+
+
+def recolor_frames(frames, palette):
+    """Swap the palette of IndexedFrames without decoding again."""
+    return [frame.recolor(palette) for frame in frames]
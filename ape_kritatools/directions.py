@@ -0,0 +1,103 @@
+# APE.Krita Tools
+# by Eric Galvan (Goosifer.IO)
+# https://github.com/openztcc/APE.KritaTools
+# Licensed under MIT (see LICENSE)
+#
+# Animation sets: the per-facing graphics (N, NE, E, ...) that sit next to
+# each other in one ZT1 animation directory, decoded concurrently.
+
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from . import instrument
+from .apecore import InstancePool, open_frame_source
+from .archives import listdir, split_archive_path
+from .palettes import embedded_palette
+from .probe import probe
+
+# Compass order, as the facings appear in the game
+DIRECTIONS = ("N", "NE", "E", "SE", "S", "SW", "W", "NW")
+
+
+def find_direction_set(graphic_path):
+    """Return [(direction, path)] for the valid facings next to a graphic, in compass order."""
+    in_archive = split_archive_path(graphic_path) is not None
+    if in_archive:
+        # Inside a .ztd archive member paths always use forward slashes
+        directory = graphic_path.replace("\\", "/").rpartition("/")[0]
+    else:
+        directory = os.path.dirname(os.path.abspath(graphic_path))
+    try:
+        names = {name.upper(): name for name in listdir(directory)}
+    except OSError:
+        return []
+
+    found = []
+    for direction in DIRECTIONS:
+        name = names.get(direction)
+        if name is None:
+            continue
+        path = directory + "/" + name if in_archive else os.path.join(directory, name)
+        if probe(path).valid:
+            found.append((direction, path))
+    return found
+
+
+def decode_direction(engine, graphic_path, pal_path, instance=None, cancelled=None, pool=None, index=None,
+                     dedupe=True):
+    """Decode the animation frames of one facing (the background frame is dropped).
+
+    Returns a list of owned frames, or None if cancelled part way through.
+    With dedupe, repeated frames are converted once and appear as the same
+    object. Without a palette path the graphic's embedded palette is used (resolved
+    through the AssetIndex when one is given).
+    """
+    pal_path = pal_path or embedded_palette(graphic_path, index)
+    if not pal_path:
+        raise ValueError(f"Not a ZT1 graphic: {graphic_path}")
+    has_bg_frame = probe(graphic_path).has_bg_frame
+    with open_frame_source(engine, graphic_path, pal_path, instance, pool) as source:
+        count = len(source.headers) - (1 if has_bg_frame else 0)
+        frames = []
+        seen = {}
+        for i in range(count):
+            if cancelled and cancelled():
+                return None
+            if not dedupe:
+                with instrument.span("convert"):
+                    frames.append(source.frame(i))
+                continue
+            digest = source.digest(i)
+            frame = seen.get(digest)
+            if frame is not None:
+                instrument.count("duplicate_frames")
+            else:
+                with instrument.span("convert"):
+                    frame = seen[digest] = source.frame(i)
+            frames.append(frame)
+        return frames
+
+
+def decode_set(engine, items, pal_path, pool=None, workers=None, cancelled=None, index=None, dedupe=True):
+    """Decode several facings concurrently; yields (direction, frames) as each one finishes.
+
+    The native engine needs one ApeCore instance per concurrent decode; each
+    decode takes its own from the InstancePool (a new one is made if none is
+    given) and releases it as soon as its frames are converted. Errors are
+    raised from the generator when their facing comes up.
+    """
+    workers = workers or min(len(items), os.cpu_count() or 1)
+    if engine == "native":
+        pool = pool or InstancePool(workers)
+        workers = min(workers, pool.max_instances)
+
+    def run(direction, path):
+        if engine != "native":
+            return direction, decode_direction(engine, path, pal_path, None, cancelled, index=index, dedupe=dedupe)
+        with pool.session() as instance:
+            return direction, decode_direction(engine, path, pal_path, instance, cancelled, pool, index, dedupe)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(run, direction, path) for direction, path in items]
+        for future in as_completed(futures):
+            yield future.result()
@@ -0,0 +1,306 @@
+# APE.Krita Tools
+# by Eric Galvan (Goosifer.IO)
+# https://github.com/openztcc/APE.KritaTools
+# Licensed under MIT (see LICENSE)
+#
+# ZT1 writer: quantizes BGRA frames to a palette and encodes them with the
+# row RLE described in decoder.py.
+#
+# Quantizing avoids per-pixel Python: pixels are read as uint32 colors, the
+# distinct colors are counted with Counter, and every distinct color is mapped
+# to a palette index once (exactly when the image has few enough colors,
+# otherwise to its median-cut box, refined through a 32x32x32 nearest-color
+# cube when NumPy is available). Index
+# planes are then produced with a single map() over the pixels, or with NumPy
+# when it is available.
+
+import os
+import re
+import struct
+from collections import Counter
+from itertools import repeat
+from operator import itemgetter
+
+from .decoder import FRAME_HEADER, MAX_COLORS, PALETTE_HEADER
+from .probe import FATZ_MAGIC
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+ALPHA_THRESHOLD = 128
+
+# Pixels at or above the threshold are opaque (255 in the mask), the rest are skipped
+ALPHA_MASK = bytes(255 if a >= ALPHA_THRESHOLD else 0 for a in range(256))
+
+OPAQUE_RUN = re.compile(b"\xff+")
+
+# ------------------------------------- Colors ---------------------------------------------- #
+
+
+def _and(a, b):
+    """Bytewise AND of two equal-length buffers (one big-int operation)."""
+    return (int.from_bytes(a, "little") & int.from_bytes(b, "little")).to_bytes(len(a), "little")
+
+
+def opaque_colors(width, height, bgra, transparent_color=None):
+    """Return (colors, mask) for a BGRA frame.
+
+    colors is a sequence of 0xRRGGBB ints, one per pixel, with transparent
+    pixels set to 0; mask has 255 for opaque pixels and 0 otherwise. Pixels
+    of transparent_color (a 0xRRGGBB int, e.g. a key color) are transparent too.
+    """
+    num_pixels = width * height
+    mask = bytes(bgra[3::4]).translate(ALPHA_MASK)
+
+    if transparent_color is not None:
+        rgb = bytearray(bgra)
+        rgb[3::4] = bytes(num_pixels)
+        key = {transparent_color: 0}
+        mask = _and(mask, bytes(map(key.get, memoryview(rgb).cast("I"), repeat(255))))
+
+    # Zero the alpha byte and every transparent pixel in one pass
+    mask4 = bytearray(num_pixels * 4)
+    mask4[0::4] = mask
+    mask4[1::4] = mask
+    mask4[2::4] = mask
+    colors = memoryview(_and(bgra, mask4)).cast("I")
+    return colors, mask
+
+
+def count_colors(frames):
+    """Count opaque colors over (colors, mask) pairs; returns a Counter of 0xRRGGBB ints."""
+    counts = Counter()
+    for colors, mask in frames:
+        counts.update(colors)
+        # Transparent pixels were counted as black
+        transparent = mask.count(0)
+        if transparent:
+            counts[0] -= transparent
+            if counts[0] <= 0:
+                del counts[0]
+    return counts
+
+
+def _box(entries):
+    """A median-cut box: (score, channel to split, entries); score is 0 if it cannot split."""
+    if len(entries) < 2:
+        return (0, 0, entries)
+    # One pass per channel through the builtins rather than a generator per channel
+    channels = list(zip(*entries))
+    spreads = [max(values) - min(values) for values in channels[:3]]
+    channel = spreads.index(max(spreads))
+    return (spreads[channel] * sum(channels[3]), channel, entries)
+
+
+def median_cut_boxes(counts, max_colors):
+    """Split weighted colors into at most max_colors boxes of (r, g, b, count) entries."""
+    boxes = [_box([(color >> 16 & 255, color >> 8 & 255, color & 255, count) for color, count in counts.items()])]
+    while len(boxes) < max_colors:
+        # Split the box with the widest channel range, weighted by pixel count
+        i = max(range(len(boxes)), key=lambda i: boxes[i][0])
+        score, channel, entries = boxes[i]
+        if not score:
+            break
+        del boxes[i]
+        # One sort per split, on the widest channel only
+        entries = sorted(entries, key=itemgetter(channel))
+        half = sum(map(itemgetter(3), entries)) / 2
+        running = 0
+        for split, entry in enumerate(entries):
+            running += entry[3]
+            if running >= half:
+                break
+        split = min(split + 1, len(entries) - 1)
+        boxes.append(_box(entries[:split]))
+        boxes.append(_box(entries[split:]))
+    return [entries for _, _, entries in boxes]
+
+
+def box_color(entries):
+    """Count-weighted mean color of a box as 0xRRGGBB."""
+    total = sum(entry[3] for entry in entries)
+    r = round(sum(entry[0] * entry[3] for entry in entries) / total)
+    g = round(sum(entry[1] * entry[3] for entry in entries) / total)
+    b = round(sum(entry[2] * entry[3] for entry in entries) / total)
+    return r << 16 | g << 8 | b
+
+
+class ColorCube:
+    """Nearest palette index for every 5-bit-per-channel RGB cell.
+
+    With NumPy the whole cube is computed up front; without it cells are
+    filled on first use, so only colors that actually occur cost anything.
+    """
+
+    def __init__(self, palette):
+        self.palette = [(color >> 16 & 255, color >> 8 & 255, color & 255) for color in palette]
+        self.cells = {}
+        self.table = None
+        if np is not None:
+            self.table = self.build_table()
+
+    @staticmethod
+    def cell(color):
+        return (color >> 19 & 31) << 10 | (color >> 11 & 31) << 5 | (color >> 3 & 31)
+
+    def build_table(self):
+        """Nearest index for all 32768 cells, measured from each cell's center."""
+        levels = np.arange(32, dtype=np.int32) * 8 + 4
+        r, g, b = np.meshgrid(levels, levels, levels, indexing="ij")
+        centers = np.stack([r.ravel(), g.ravel(), b.ravel()], axis=1)
+        palette = np.array(self.palette, dtype=np.int32)
+        table = np.empty(len(centers), dtype=np.uint8)
+        # In chunks to bound memory (cells x palette x 3)
+        for start in range(0, len(centers), 4096):
+            chunk = centers[start:start + 4096, None, :] - palette[None, :, :]
+            table[start:start + 4096] = np.argmin((chunk * chunk).sum(axis=2), axis=1)
+        return table
+
+    def nearest(self, color):
+        """Palette index closest to a 0xRRGGBB color."""
+        cell = self.cell(color)
+        if self.table is not None:
+            return int(self.table[cell])
+        index = self.cells.get(cell)
+        if index is None:
+            r = (cell >> 10) * 8 + 4
+            g = (cell >> 5 & 31) * 8 + 4
+            b = (cell & 31) * 8 + 4
+            index = min(range(len(self.palette)),
+                        key=lambda i: (self.palette[i][0] - r) ** 2 + (self.palette[i][1] - g) ** 2 + (self.palette[i][2] - b) ** 2)
+            self.cells[cell] = index
+        return index
+
+
+class Quantizer:
+    """Maps 0xRRGGBB colors to palette indices for a set of frames."""
+
+    def __init__(self, counts, max_colors=MAX_COLORS):
+        if len(counts) <= max_colors:
+            # Few enough colors: exact palette, most used first
+            self.palette = [color for color, _ in counts.most_common()] or [0]
+            self.lookup = {color: i for i, color in enumerate(self.palette)}
+            self.exact = True
+        else:
+            boxes = median_cut_boxes(counts, max_colors)
+            self.palette = [box_color(entries) for entries in boxes]
+            if np is not None:
+                # The whole nearest-color cube costs a few NumPy passes
+                cube = ColorCube(self.palette)
+                self.lookup = {color: cube.nearest(color) for color in counts}
+            else:
+                # Each color maps to the box it was averaged into: one dict entry
+                # per color instead of a palette search per cube cell
+                self.lookup = {r << 16 | g << 8 | b: i for i, entries in enumerate(boxes) for r, g, b, _ in entries}
+            self.exact = False
+        # Transparent pixels (0 in colors) map to index 0; the mask hides them
+        self.lookup.setdefault(0, 0)
+
+    def indices(self, colors):
+        """Index plane for one frame's colors."""
+        if np is not None:
+            values = np.frombuffer(colors, dtype=np.uint32)
+            keys = np.fromiter(self.lookup.keys(), dtype=np.uint32, count=len(self.lookup))
+            table = np.fromiter(self.lookup.values(), dtype=np.uint8, count=len(self.lookup))
+            order = np.argsort(keys)
+            return table[order][np.searchsorted(keys[order], values)].tobytes()
+        return bytes(map(self.lookup.__getitem__, colors))
+
+    def palette_rgba(self):
+        """The palette as R, G, B, A bytes."""
+        return b"".join(bytes((color >> 16 & 255, color >> 8 & 255, color & 255, 255)) for color in self.palette)
+
+# ------------------------------------- RLE ------------------------------------------------- #
+
+
+def encode_row(indices, mask, start, width):
+    """Encode one row: instruction count, then (skip, count, indices) per opaque run."""
+    out = bytearray(1)
+    instructions = 0
+    x = 0
+    for run in OPAQUE_RUN.finditer(mask, start, start + width):
+        run_start = run.start() - start
+        run_end = run.end() - start
+        skip = run_start - x
+        # Fields are single bytes: split long gaps and runs
+        while skip > 255:
+            out += b"\xff\x00"
+            instructions += 1
+            skip -= 255
+        while run_start < run_end:
+            count = min(run_end - run_start, 255)
+            out += bytes((skip, count))
+            out += indices[start + run_start:start + run_start + count]
+            instructions += 1
+            skip = 0
+            run_start += count
+        x = run_end
+    if instructions > 255:
+        raise ValueError("Row has more than 255 runs.")
+    out[0] = instructions
+    return out
+
+
+def encode_frame(width, height, offsetX, offsetY, indices, mask):
+    """Encode one frame (header and rows)."""
+    body = b"".join(encode_row(indices, mask, row * width, width) for row in range(height))
+    header = FRAME_HEADER.pack(FRAME_HEADER.size - 4 + len(body), height, width, offsetY, offsetX, 0)
+    return header + body
+
+
+def encode_graphic(frames, pal_name, speed, has_bg_frame=False):
+    """Encode a graphic from (width, height, offsetX, offsetY, indices, mask) frames.
+
+    With has_bg_frame the last frame is written as the background frame.
+    """
+    name = pal_name.replace("\\", "/").encode("utf-8") + b"\x00"
+    out = bytearray()
+    if has_bg_frame:
+        out += FATZ_MAGIC + bytes(4) + b"\x01"
+    out += struct.pack("<II", int(speed), len(name)) + name
+    out += struct.pack("<I", len(frames) - (1 if has_bg_frame else 0))
+    for frame in frames:
+        out += encode_frame(*frame)
+    return bytes(out)
+
+
+def encode_palette(rgba):
+    """Encode a .pal file from R, G, B, A bytes."""
+    return PALETTE_HEADER.pack(len(rgba) // 4, 0) + rgba
+
+
+def palette_name(graphic_path, pal_path):
+    """Palette name to embed: relative to the closest common directory, prefixed by its name.
+
+    adjust_pal_directory resolves such a name back to pal_path.
+    """
+    common = os.path.commonpath([os.path.abspath(os.path.dirname(graphic_path)), os.path.abspath(pal_path)])
+    relative = os.path.relpath(os.path.abspath(pal_path), common)
+    return os.path.basename(common) + "/" + relative.replace(os.sep, "/")
+
+# ------------------------------------- Writer ---------------------------------------------- #
+
+
+def write_ape(graphic_path, pal_path, frames, speed, has_bg_frame=False, pal_name=None,
+              transparent_color=None, max_colors=MAX_COLORS):
+    """Quantize BGRA frame tuples and write a ZT1 graphic plus palette.
+
+    frames use the loader's layout, (width, height, offsetX, offsetY, channels,
+    BGRA pixels); with has_bg_frame the last one is the background frame.
+    Returns the Quantizer used.
+    """
+    planes = [opaque_colors(frame[0], frame[1], frame[5], transparent_color) for frame in frames]
+    quantizer = Quantizer(count_colors(planes), max_colors)
+
+    encoded = []
+    for (width, height, offsetX, offsetY, _, _), (colors, mask) in zip(frames, planes):
+        encoded.append((width, height, offsetX, offsetY, quantizer.indices(colors), mask))
+
+    graphic = encode_graphic(encoded, pal_name or palette_name(graphic_path, pal_path), speed, has_bg_frame)
+    with open(pal_path, "wb") as f:
+        f.write(encode_palette(quantizer.palette_rgba()))
+    with open(graphic_path, "wb") as f:
+        f.write(graphic)
+    return quantizer
@@ -0,0 +1,186 @@
+# APE.Krita Tools
+# by Eric Galvan (Goosifer.IO)
+# https://github.com/openztcc/APE.KritaTools
+# Licensed under MIT (see LICENSE)
+#
+# Lightweight import instrumentation: named spans (wall time and peak Python
+# memory per stage) and counters. Disabled by default; while disabled span()
+# returns a shared no-op context manager and count() returns immediately.
+#
+#   with instrument.span("convert"):
+#       ...
+#   instrument.count("bytes_copied", len(pixels))
+#
+# Peak memory comes from tracemalloc, so it covers Python allocations only;
+# native ApeCore buffers are reported through the "native_bytes" counter.
+# tracemalloc has one peak for the whole process, so spans running at the
+# same time on other threads (the decode worker) are charged each other's
+# allocations while they overlap.
+
+import json
+import threading
+import time
+import tracemalloc
+from collections import Counter, OrderedDict
+
+
+class _NullSpan:
+    """Context manager that does nothing (used while instrumentation is off)."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_SPAN = _NullSpan()
+
+
+class Span:
+    """Times one stage and records it on exit."""
+
+    __slots__ = ("recorder", "name", "start", "memory")
+
+    def __init__(self, recorder, name):
+        self.recorder = recorder
+        self.name = name
+
+    def __enter__(self):
+        self.memory = self.recorder.enter_memory()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        seconds = time.perf_counter() - self.start
+        self.recorder.record(self.name, seconds, self.recorder.exit_memory(self.memory))
+        return False
+
+
+class Recorder:
+    """Collects span timings and counters for the stages of an import."""
+
+    def __init__(self):
+        self.enabled = False
+        self.trace_memory = False
+        self.lock = threading.Lock()
+        self.open_memory = []  # [level at entry, peak so far] of every open span, on any thread
+        self.listeners = []
+        self.reset()
+
+    def enable(self, trace_memory=True):
+        self.trace_memory = trace_memory
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+        if self.trace_memory and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self.trace_memory = False
+
+    def reset(self):
+        with self.lock:
+            self.stages = OrderedDict()
+            self.counters = Counter()
+            self.started = time.time()
+
+    def span(self, name):
+        if not self.enabled:
+            return NULL_SPAN
+        return Span(self, name)
+
+    def count(self, name, amount=1):
+        if not self.enabled:
+            return
+        with self.lock:
+            self.counters[name] += amount
+
+    # ------------------------------------- Memory ------------------------------------------ #
+
+    def enter_memory(self):
+        """Start a memory measurement; returns the token exit_memory needs."""
+        if not self.trace_memory:
+            return None
+        with self.lock:
+            current = self._fold_peak()
+            # Every open span has been credited with the peak so far, so it can start over
+            tracemalloc.reset_peak()
+            entry = [current, current]
+            self.open_memory.append(entry)
+        return entry
+
+    def exit_memory(self, entry):
+        """Peak bytes allocated above the level at span entry."""
+        if entry is None:
+            return 0
+        with self.lock:
+            self._fold_peak()
+            # By identity: another open span's entry may hold equal values
+            for i, open_entry in enumerate(self.open_memory):
+                if open_entry is entry:
+                    del self.open_memory[i]
+                    break
+        return entry[1] - entry[0]
+
+    def _fold_peak(self):
+        """Credit the peak since the last reset to every open span; returns the current level (lock held)."""
+        current, peak = tracemalloc.get_traced_memory()
+        for entry in self.open_memory:
+            entry[1] = max(entry[1], peak)
+        return current
+
+    # ------------------------------------- Report ------------------------------------------ #
+
+    def record(self, name, seconds, peak_bytes):
+        with self.lock:
+            stage = self.stages.get(name)
+            if stage is None:
+                stage = self.stages[name] = {"calls": 0, "seconds": 0.0, "peak_bytes": 0}
+            stage["calls"] += 1
+            stage["seconds"] += seconds
+            stage["peak_bytes"] = max(stage["peak_bytes"], peak_bytes)
+
+    def report(self):
+        """Snapshot of all stages and counters."""
+        with self.lock:
+            return {
+                "started": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started)),
+                "stages": {name: dict(stage) for name, stage in self.stages.items()},
+                "counters": dict(self.counters),
+            }
+
+    def export_json(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.report(), f, indent=1)
+
+    def finished(self, label):
+        """Mark the end of an import; notifies listeners (e.g. the timing docker)."""
+        if not self.enabled:
+            return
+        for listener in list(self.listeners):
+            listener(label)
+
+
+# Shared by every module of the plugin
+recorder = Recorder()
+
+
+def span(name):
+    """Context manager timing one stage (no-op while disabled)."""
+    if not recorder.enabled:
+        return NULL_SPAN
+    return Span(recorder, name)
+
+
+def count(name, amount=1):
+    """Add to a counter (no-op while disabled)."""
+    if recorder.enabled:
+        recorder.count(name, amount)
+
+
+def record(name, seconds):
+    """Add a stage timed elsewhere, e.g. by a worker thread (no-op while disabled)."""
+    if recorder.enabled:
+        recorder.record(name, seconds, 0)
@@ -0,0 +1,250 @@
+# APE.Krita Tools
+# by Eric Galvan (Goosifer.IO)
+# https://github.com/openztcc/APE.KritaTools
+# Licensed under MIT (see LICENSE)
+#
+# Palette path resolution for ZT1 graphics.
+#
+# Embedded palette names are relative to the game's asset root
+# ("animals/lion/lion.pal"). With an AssetIndex of that root they resolve
+# exactly and case-insensitively; adjust_pal_directory's guess from the
+# graphic's own path is the fallback.
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+from .archives import find_member, split_archive_path
+from .probe import probe
+
+INDEX_VERSION = 1
+
+# A lookup miss rescans changed directories at most this often (seconds)
+MISS_REFRESH_INTERVAL = 10
+
+
+def adjust_pal_directory(pal_path, graphic_path):
+    """Adjust palette path by finding common path components and appending the palette file."""
+    # Decode bytes if necessary
+    if isinstance(pal_path, bytes):
+        pal_path = pal_path.decode("utf-8")
+    if isinstance(graphic_path, bytes):
+        graphic_path = graphic_path.decode("utf-8")
+
+    # Normalize slashes and get directory parts
+    pal_parts = pal_path.replace("\\", "/").split("/")
+    graphic_path = graphic_path.replace("\\", "/")
+    graphic_parts = graphic_path.split("/")
+
+    # Find the last matching path component
+    last_match_index = -1
+    for pal_part in pal_parts[:-1]:  # Exclude pal filename
+        for i, graphic_part in enumerate(graphic_parts):
+            if pal_part.lower() == graphic_part.lower():
+                last_match_index = i
+
+    if last_match_index != -1:
+        # Take the graphic path up to the last matching component
+        base_path = "/".join(graphic_parts[:last_match_index + 1])
+        # Get the pal filename
+        pal_filename = pal_parts[-1]
+        # Join them together
+        return f"{base_path}/{pal_filename}"
+
+    # If no common path components, return graphic path
+    # without filename and append pal filename
+    return "/".join(graphic_parts[:-1]) + "/" + "/".join(pal_parts)
+
+
+def _parts(path):
+    """Lower-cased components of a relative path with either slash style."""
+    return [part for part in path.replace("\\", "/").lower().split("/") if part and part != "."]
+
+
+def _suffix_length(a, b):
+    """Number of trailing components two component lists share."""
+    n = 0
+    while n < len(a) and n < len(b) and a[-1 - n] == b[-1 - n]:
+        n += 1
+    return n
+
+
+def index_cache_path(root, cache_dir=None):
+    """Default file for an asset root's saved index (in the user's cache directory)."""
+    if cache_dir is None:
+        base = os.environ.get("LOCALAPPDATA") or os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+        cache_dir = os.path.join(base, "ape_kritatools")
+    digest = hashlib.sha1(os.path.normcase(os.path.abspath(root)).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(cache_dir, f"assets-{digest}.json")
+
+
+class AssetIndex:
+    """Case-insensitive index of every file under an asset root.
+
+    Built by one directory scan and saved to cache_path. refresh() only lists
+    directories whose mtime changed since the last scan (adding, removing or
+    renaming a file changes its directory's mtime), so keeping a large tree
+    current costs one stat per directory.
+    """
+
+    def __init__(self, root, cache_path=None):
+        self.root = os.path.abspath(root)
+        self.cache_path = cache_path
+        self.dirs = {}   # relative directory -> [mtime_ns, [files], [subdirectories]]
+        self.names = {}  # lower-case file name -> [relative paths]
+        self.scanned = False
+        self.refreshed_at = 0.0
+        self.lock = threading.Lock()
+
+    def load(self):
+        """Read the saved index; returns False if there is none for this root."""
+        if not self.cache_path:
+            return False
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if data.get("version") != INDEX_VERSION or data.get("root") != self.root:
+            return False
+        self.dirs = data["dirs"]
+        self.build_names()
+        return True
+
+    def save(self):
+        if not self.cache_path:
+            return
+        os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+        temp_path = self.cache_path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": INDEX_VERSION, "root": self.root, "dirs": self.dirs}, f)
+        os.replace(temp_path, self.cache_path)
+
+    def refresh(self):
+        """Re-list directories that changed since the last scan; returns True if anything did."""
+        with self.lock:
+            changed = False
+            seen = {}
+            pending = [""]
+            while pending:
+                rel = pending.pop()
+                path = os.path.join(self.root, rel)
+                try:
+                    mtime = os.stat(path).st_mtime_ns
+                except OSError:
+                    changed = True
+                    continue
+                entry = self.dirs.get(rel)
+                if entry is None or entry[0] != mtime:
+                    entry = self.list_directory(path, mtime)
+                    changed = True
+                seen[rel] = entry
+                pending.extend(os.path.join(rel, name) for name in entry[2])
+
+            if changed or len(seen) != len(self.dirs):
+                self.dirs = seen
+                self.build_names()
+                try:
+                    self.save()
+                except OSError:
+                    # The index still works from memory
+                    pass
+                changed = True
+            self.scanned = True
+            self.refreshed_at = time.monotonic()
+            return changed
+
+    @staticmethod
+    def list_directory(path, mtime):
+        files = []
+        subdirs = []
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.name)
+                    else:
+                        files.append(entry.name)
+        except OSError:
+            pass
+        return [mtime, sorted(files), sorted(subdirs)]
+
+    def build_names(self):
+        names = {}
+        for rel, (_, files, _) in self.dirs.items():
+            for name in files:
+                names.setdefault(name.lower(), []).append(os.path.join(rel, name))
+        self.names = names
+
+    def ensure(self):
+        """On first use, load the saved index and re-list the directories changed since it was saved."""
+        if not self.scanned:
+            self.load()
+            self.refresh()
+
+    def find(self, relative_path, near=None):
+        """Real path of a root-relative file name (any case/slashes), or None.
+
+        The root may also sit inside the directory the name is relative to
+        (e.g. an extracted "animals" folder). Ties go to the candidate sharing
+        the most directories with near.
+        """
+        self.ensure()
+        parts = _parts(relative_path)
+        if not parts:
+            return None
+        near_parts = _parts(os.path.relpath(os.path.abspath(near), self.root)) if near and self.contains(near) else []
+
+        best = None
+        for rel in self.names.get(parts[-1], ()):
+            rel_parts = _parts(rel)
+            matched = _suffix_length(rel_parts, parts)
+            # Every component must match, except leading ones that lie above the root
+            if matched != len(parts) and matched != len(rel_parts):
+                continue
+            shared = 0
+            while shared < len(near_parts) and shared < len(rel_parts) and near_parts[shared] == rel_parts[shared]:
+                shared += 1
+            score = (matched, shared)
+            if best is None or score > best[0]:
+                best = (score, rel)
+        return os.path.join(self.root, best[1]) if best else None
+
+    def contains(self, path):
+        """True if path lies under the root."""
+        path = os.path.abspath(path)
+        return os.path.normcase(path).startswith(os.path.normcase(self.root) + os.sep)
+
+
+def resolve_palette(pal_name, graphic_path, index=None):
+    """Path of a graphic's palette: exact from the asset index when possible, else guessed."""
+    if isinstance(pal_name, bytes):
+        pal_name = pal_name.decode("utf-8")
+    archive = split_archive_path(graphic_path)
+    if archive:
+        # Palette names are relative to the archive root; its member index is case-insensitive
+        found = find_member(archive[0], pal_name)
+        if found:
+            return found
+    if index is not None and index.contains(graphic_path):
+        found = index.find(pal_name, graphic_path)
+        if found is not None and not os.path.isfile(found):
+            # Removed or renamed since the last scan
+            index.refresh()
+            found = index.find(pal_name, graphic_path)
+        elif found is None and time.monotonic() - index.refreshed_at > MISS_REFRESH_INTERVAL and index.refresh():
+            # Files may have been added since the last scan
+            found = index.find(pal_name, graphic_path)
+        if found:
+            return found
+    return adjust_pal_directory(pal_name, graphic_path)
+
+
+def embedded_palette(graphic_path, index=None):
+    """Path of the palette named in a graphic's header, or None if the header is invalid."""
+    info = probe(graphic_path)
+    if not info.valid:
+        return None
+    return resolve_palette(info.pal_name, graphic_path, index)
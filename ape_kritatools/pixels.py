@@ -0,0 +1,386 @@
+# APE.Krita Tools
+# by Eric Galvan (Goosifer.IO)
+# https://github.com/openztcc/APE.KritaTools
+# Licensed under MIT (see LICENSE)
+#
+# Pixel conversion stage: turns ApeCore pixel streams into the BGRA byte
+# order Krita expects for RGBA/U8 documents.
+
+import ctypes
+import hashlib
+import struct
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+SUPPORTED_CHANNELS = (1, 3, 4)
+
+
+def _check(src, channels):
+    """Validate a source buffer and return its pixel count."""
+    if channels not in SUPPORTED_CHANNELS:
+        raise ValueError(f"Unsupported channel count: {channels}")
+    if len(src) % channels:
+        raise ValueError("Pixel buffer length is not a multiple of the channel count.")
+    return len(src) // channels
+
+
+def _output(out, num_pixels):
+    """Allocate the BGRA output buffer unless one was provided."""
+    if out is None:
+        return bytearray(num_pixels * 4)
+    if len(out) != num_pixels * 4:
+        raise ValueError("Output buffer has the wrong size.")
+    return out
+
+# ------------------------------------- Buffers -------------------------------------------- #
+
+
+def native_view(pointer, size):
+    """Expose a native uint8 buffer as a writable memoryview without copying."""
+    array = ctypes.cast(pointer, ctypes.POINTER(ctypes.c_uint8 * size)).contents
+    return memoryview(array).cast("B")
+
+
+class FrameArena:
+    """A single preallocated buffer carved into per-frame BGRA slices."""
+
+    def __init__(self, size):
+        self.buffer = bytearray(size)
+        self.view = memoryview(self.buffer)
+        self.used = 0
+
+    def take(self, size):
+        """Reserve the next size bytes of the arena."""
+        if self.used + size > len(self.buffer):
+            raise MemoryError("Frame arena is exhausted.")
+        start = self.used
+        self.used += size
+        return self.view[start:self.used]
+
+# ------------------------------------- Converters ----------------------------------------- #
+
+
+def swizzle_loop(src, channels, out=None):
+    """Reference per-pixel converter (the original load_frames loop)."""
+    num_pixels = _check(src, channels)
+    out = _output(out, num_pixels)
+    for p in range(num_pixels):
+        s = p * channels
+        d = p * 4
+        if channels == 1:
+            out[d] = out[d + 1] = out[d + 2] = src[s]
+            out[d + 3] = 255
+        else:
+            r, g, b = src[s], src[s + 1], src[s + 2]
+            a = src[s + 3] if channels == 4 else 255
+            out[d], out[d + 1], out[d + 2], out[d + 3] = b, g, r, a
+    return out
+
+
+def swizzle_slice(src, channels, out=None):
+    """Convert with strided slice assignment on bytearray/memoryview buffers."""
+    num_pixels = _check(src, channels)
+
+    # In-place swap of R and B when converting a 4-channel buffer onto itself
+    # (memoryview slices are views, so red is copied out before overwriting)
+    if channels == 4 and out is src:
+        red = bytes(out[0::4])
+        out[0::4] = out[2::4]
+        out[2::4] = red
+        return out
+
+    out = _output(out, num_pixels)
+    if channels == 1:
+        out[0::4] = src
+        out[1::4] = src
+        out[2::4] = src
+    else:
+        out[0::4] = src[2::channels]
+        out[1::4] = src[1::channels]
+        out[2::4] = src[0::channels]
+
+    if channels == 4:
+        out[3::4] = src[3::4]
+    else:
+        out[3::4] = b"\xff" * num_pixels
+    return out
+
+
+def swizzle_numpy(src, channels, out=None):
+    """Convert with NumPy fancy indexing (requires NumPy)."""
+    if np is None:
+        raise RuntimeError("NumPy is not available.")
+    num_pixels = _check(src, channels)
+    in_place = channels == 4 and out is src
+    out = _output(out, num_pixels)
+
+    pixels_in = np.frombuffer(src, dtype=np.uint8).reshape(num_pixels, channels)
+    pixels_out = np.frombuffer(out, dtype=np.uint8).reshape(num_pixels, 4)
+    if in_place:
+        pixels_out[:, [0, 2]] = pixels_out[:, [2, 0]]
+    elif channels == 1:
+        pixels_out[:, :3] = pixels_in
+        pixels_out[:, 3] = 255
+    else:
+        pixels_out[:, :3] = pixels_in[:, 2::-1]
+        pixels_out[:, 3] = pixels_in[:, 3] if channels == 4 else 255
+    return out
+
+
+CONVERTERS = {
+    "loop": swizzle_loop,
+    "slice": swizzle_slice,
+    "numpy": swizzle_numpy,
+}
+
+
+def get_converter(name=None):
+    """Return a converter by name; the default is slice, faster than NumPy for every channel count in bench_pixels."""
+    if name is None:
+        name = "slice"
+    if name == "numpy" and np is None:
+        name = "slice"
+    if name not in CONVERTERS:
+        raise ValueError(f"Unknown pixel converter: {name}")
+    return CONVERTERS[name]
+
+
+def to_bgra(src, channels, out=None, converter=None):
+    """Convert an RGB/RGBA/gray pixel stream into a BGRA bytearray."""
+    return get_converter(converter)(src, channels, out)
+
+# ------------------------------------- Palettes ------------------------------------------- #
+
+
+def expand_slice(indices, alpha, palette_bgra, out=None):
+    """Expand an 8-bit index plane through a 256-entry BGRA palette (bytes.translate per channel)."""
+    num_pixels = len(indices)
+    out = _output(out, num_pixels)
+    indices = bytes(indices)
+    out[0::4] = indices.translate(palette_bgra[0::4])
+    out[1::4] = indices.translate(palette_bgra[1::4])
+    out[2::4] = indices.translate(palette_bgra[2::4])
+    out[3::4] = alpha
+    return out
+
+
+def expand_numpy(indices, alpha, palette_bgra, out=None):
+    """Expand an 8-bit index plane through a 256-entry BGRA palette (requires NumPy)."""
+    if np is None:
+        raise RuntimeError("NumPy is not available.")
+    num_pixels = len(indices)
+    out = _output(out, num_pixels)
+    lut = np.frombuffer(palette_bgra, dtype=np.uint8).reshape(256, 4)
+    pixels_out = np.frombuffer(out, dtype=np.uint8).reshape(num_pixels, 4)
+    pixels_out[:] = lut[np.frombuffer(indices, dtype=np.uint8)]
+    pixels_out[:, 3] = np.frombuffer(alpha, dtype=np.uint8)
+    return out
+
+
+def expand_indexed(indices, alpha, palette_bgra, out=None):
+    """Expand index + alpha planes to BGRA, using NumPy if available."""
+    expand = expand_numpy if np is not None else expand_slice
+    return expand(indices, alpha, palette_bgra, out)
+
+# ------------------------------------- Compositing ---------------------------------------- #
+
+# Magenta key colour used for opaque imports (BGRA, symmetric in R and B)
+KEY_COLOR = bytes([255, 0, 255, 255])
+
+
+def _clip(canvas_width, canvas_height, width, height, x, y):
+    """Clip a frame rect to the canvas; returns (src_x, src_y, dst_x, dst_y, w, h) or None."""
+    src_x = max(0, -x)
+    src_y = max(0, -y)
+    dst_x = max(0, x)
+    dst_y = max(0, y)
+    w = min(width - src_x, canvas_width - dst_x)
+    h = min(height - src_y, canvas_height - dst_y)
+    if w <= 0 or h <= 0:
+        return None
+    return src_x, src_y, dst_x, dst_y, w, h
+
+
+def composite_slice(canvas, canvas_width, canvas_height, frame, width, height, x, y):
+    """Alpha-blend a BGRA frame over an opaque BGRA canvas in place (pure Python)."""
+    clip = _clip(canvas_width, canvas_height, width, height, x, y)
+    if clip is None:
+        return canvas
+    src_x, src_y, dst_x, dst_y, w, h = clip
+    frame = memoryview(frame)
+
+    for row in range(h):
+        src = ((src_y + row) * width + src_x) * 4
+        dst = ((dst_y + row) * canvas_width + dst_x) * 4
+        alpha = bytes(frame[src + 3:src + w * 4:4])
+
+        # ZT1 pixels are either transparent or opaque: copy opaque runs, skip the rest
+        p = 0
+        while p < w:
+            start = p
+            while p < w and alpha[p]:
+                p += 1
+            if p > start:
+                run = alpha[start:p]
+                if run.count(255) == len(run):
+                    canvas[dst + start * 4:dst + p * 4] = frame[src + start * 4:src + p * 4]
+                else:
+                    # Partial alpha: blend pixel by pixel
+                    for q in range(start, p):
+                        a = alpha[q]
+                        s = src + q * 4
+                        d = dst + q * 4
+                        for c in range(3):
+                            canvas[d + c] = (frame[s + c] * a + canvas[d + c] * (255 - a) + 127) // 255
+            while p < w and not alpha[p]:
+                p += 1
+    return canvas
+
+
+def composite_numpy(canvas, canvas_width, canvas_height, frame, width, height, x, y):
+    """Alpha-blend a BGRA frame over an opaque BGRA canvas in place (requires NumPy)."""
+    if np is None:
+        raise RuntimeError("NumPy is not available.")
+    clip = _clip(canvas_width, canvas_height, width, height, x, y)
+    if clip is None:
+        return canvas
+    src_x, src_y, dst_x, dst_y, w, h = clip
+
+    dst = np.frombuffer(canvas, dtype=np.uint8).reshape(canvas_height, canvas_width, 4)[dst_y:dst_y + h, dst_x:dst_x + w]
+    src = np.frombuffer(frame, dtype=np.uint8).reshape(height, width, 4)[src_y:src_y + h, src_x:src_x + w]
+    alpha = src[:, :, 3:4].astype(np.uint16)
+    blended = (src[:, :, :3] * alpha + dst[:, :, :3] * (255 - alpha) + 127) // 255
+    dst[:, :, :3] = blended.astype(np.uint8)
+    return canvas
+
+
+def composite_over(canvas, canvas_width, canvas_height, frame, width, height, x, y):
+    """Alpha-blend a BGRA frame at (x, y) over an opaque canvas, using NumPy if available."""
+    composite = composite_numpy if np is not None else composite_slice
+    return composite(canvas, canvas_width, canvas_height, frame, width, height, x, y)
+
+
+def paste(canvas, canvas_width, canvas_height, frame, width, height, x, y):
+    """Copy a 4-channel frame into a canvas at (x, y) in place, transparent pixels included."""
+    clip = _clip(canvas_width, canvas_height, width, height, x, y)
+    if clip is None:
+        return canvas
+    src_x, src_y, dst_x, dst_y, w, h = clip
+    frame = memoryview(frame)
+    for row in range(h):
+        src = ((src_y + row) * width + src_x) * 4
+        dst = ((dst_y + row) * canvas_width + dst_x) * 4
+        canvas[dst:dst + w * 4] = frame[src:src + w * 4]
+    return canvas
+
+# ------------------------------------- Trimming ------------------------------------------- #
+
+
+def trim_bounds_slice(width, height, pixels):
+    """Return (x, y, w, h) of the non-transparent pixels of a 4-channel frame, or None if empty."""
+    alpha = bytes(pixels[3:width * height * 4:4])
+    stripped = alpha.lstrip(b"\x00")
+    if not stripped:
+        return None
+    # Transparent rows above and below need no per-row scan
+    top = (len(alpha) - len(stripped)) // width
+    bottom = (len(alpha.rstrip(b"\x00")) - 1) // width + 1
+    left = width
+    right = 0
+    for row in range(top, bottom):
+        line = alpha[row * width:(row + 1) * width]
+        stripped = line.lstrip(b"\x00")
+        if not stripped:
+            continue
+        left = min(left, width - len(stripped))
+        right = max(right, len(line.rstrip(b"\x00")))
+    return left, top, right - left, bottom - top
+
+
+def trim_bounds_numpy(width, height, pixels):
+    """Return (x, y, w, h) of the non-transparent pixels of a 4-channel frame, or None (requires NumPy)."""
+    if np is None:
+        raise RuntimeError("NumPy is not available.")
+    alpha = np.frombuffer(pixels, dtype=np.uint8, count=width * height * 4).reshape(height, width, 4)[:, :, 3]
+    rows = np.flatnonzero(alpha.any(axis=1))
+    if not rows.size:
+        return None
+    columns = np.flatnonzero(alpha.any(axis=0))
+    return int(columns[0]), int(rows[0]), int(columns[-1] - columns[0] + 1), int(rows[-1] - rows[0] + 1)
+
+
+def trim_bounds(width, height, pixels):
+    """Opaque bounding rect of a 4-channel frame (None if fully transparent), using NumPy if available."""
+    bounds = trim_bounds_numpy if np is not None else trim_bounds_slice
+    return bounds(width, height, pixels)
+
+
+def crop(pixels, width, x, y, w, h):
+    """Copy a w x h rect of a 4-channel frame into a new buffer."""
+    if (x, y, w) == (0, 0, width):
+        return bytes(pixels[:w * h * 4])
+    out = bytearray(w * h * 4)
+    row_bytes = w * 4
+    for row in range(h):
+        start = ((y + row) * width + x) * 4
+        out[row * row_bytes:(row + 1) * row_bytes] = pixels[start:start + row_bytes]
+    return out
+
+
+def trim_frame(frame):
+    """Crop a 4-channel frame to its opaque pixels, moving offsetX/offsetY with them.
+
+    Offsets point from a frame's top-left corner to the pivot, so trimming x
+    columns on the left lowers offsetX by x. Frames with nothing to trim come
+    back as a tuple of the pixels unpacked here, so an IndexedFrame is only
+    expanded once; fully transparent ones become a single clear pixel.
+    """
+    width, height, offsetX, offsetY, channels, pixels = frame
+    bounds = trim_bounds(width, height, pixels)
+    if bounds is None:
+        return (1, 1, offsetX, offsetY, 4, bytearray(4))
+    x, y, w, h = bounds
+    if w == width and h == height:
+        return (width, height, offsetX, offsetY, channels, pixels)
+    return (w, h, offsetX - x, offsetY - y, 4, crop(pixels, width, x, y, w, h))
+
+# ------------------------------------- Duplicates ----------------------------------------- #
+
+# Frames only repeat in place if their size and offsets match as well
+DIGEST_HEADER = struct.Struct("<iiii")
+
+
+def digest_frame(width, height, offsetX, offsetY, *buffers):
+    """16-byte content hash of a frame's header fields and data buffers."""
+    h = hashlib.blake2b(DIGEST_HEADER.pack(width, height, offsetX, offsetY), digest_size=16)
+    for buffer in buffers:
+        h.update(buffer)
+    return h.digest()
+
+
+def frame_digest(frame):
+    """Content hash of a frame tuple or IndexedFrame (IndexedFrames hash their compact planes)."""
+    digest = getattr(frame, "digest", None)
+    if digest is not None:
+        return digest()
+    return digest_frame(frame[0], frame[1], frame[2], frame[3], frame[5])
+
+
+def duplicate_map(order, digest):
+    """Map each position in order whose frame repeats an earlier position's to that earlier position.
+
+    digest(index) returns a content hash; only frames with equal hashes are
+    treated as repeats, so any hash scheme works as long as one is used per call.
+    """
+    first = {}
+    duplicates = {}
+    for position, index in enumerate(order):
+        key = digest(index)
+        if key in first:
+            duplicates[position] = first[key]
+        else:
+            first[key] = position
+    return duplicates
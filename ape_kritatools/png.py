@@ -0,0 +1,40 @@
+# APE.Krita Tools
+# by Eric Galvan (Goosifer.IO)
+# https://github.com/openztcc/APE.KritaTools
+# Licensed under MIT (see LICENSE)
+#
+# Minimal RGBA PNG writer for headless exports (no Qt/PIL needed).
+
+import struct
+import zlib
+
+
+def _chunk(tag, data):
+    """Build one PNG chunk."""
+    return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF)
+
+
+def encode_png(width, height, rgba, level=6):
+    """Encode an 8-bit RGBA buffer as PNG bytes."""
+    stride = width * 4
+    if len(rgba) != stride * height:
+        raise ValueError("RGBA buffer does not match the image size.")
+
+    # Filter type 0 (none) on every row
+    view = memoryview(rgba)
+    raw = bytearray((stride + 1) * height)
+    for y in range(height):
+        start = y * (stride + 1) + 1
+        raw[start:start + stride] = view[y * stride:(y + 1) * stride]
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0)
+    return (b"\x89PNG\r\n\x1a\n"
+            + _chunk(b"IHDR", header)
+            + _chunk(b"IDAT", zlib.compress(bytes(raw), level))
+            + _chunk(b"IEND", b""))
+
+
+def write_png(path, width, height, rgba, level=6):
+    """Write an 8-bit RGBA buffer to a PNG file."""
+    with open(path, "wb") as f:
+        f.write(encode_png(width, height, rgba, level))
@@ -0,0 +1,168 @@
+# APE.Krita Tools
+# by Eric Galvan (Goosifer.IO)
+# https://github.com/openztcc/APE.KritaTools
+# Licensed under MIT (see LICENSE)
+#
+# Single-pass ZT1 header probe shared by validation, import and animation setup.
+#
+# Graphic header layout (little endian):
+#   [optional] "FATZ" + 4 reserved bytes + 1 byte background-frame flag
+#   uint32 speed (ms per frame)
+#   uint32 palette name length (including the terminating NUL)
+#   palette name
+#   uint32 frame count (not counting the background frame)
+
+import os
+import struct
+import threading
+from collections import OrderedDict
+
+from .archives import read_file, signature, split_archive_path
+
+FATZ_MAGIC = b"FATZ"
+FATZ_HEADER_SIZE = 9
+MAX_PAL_NAME = 1024
+MAX_FRAMES = 65535
+
+# Enough for any real header; one read covers magic, palette name and frame count
+PROBE_READ_SIZE = 4096
+
+
+class GraphicInfo:
+    """Metadata read from a ZT1 graphic header."""
+
+    def __init__(self, path):
+        self.path = path
+        self.exists = False
+        self.valid = False
+        self.error = None
+        self.has_magic = False
+        self.has_bg_frame = False
+        self.speed = 0
+        self.pal_name = ""
+        self.frame_count = 0
+        self.header_size = 0
+        self.mtime = 0
+        self.size = 0
+
+    @property
+    def fps(self):
+        """Frames per second (speed is ms per frame)."""
+        return 1000 / self.speed if self.speed else 0
+
+    def __repr__(self):
+        return (f"GraphicInfo({self.path!r}, valid={self.valid}, pal_name={self.pal_name!r}, "
+                f"speed={self.speed}, frame_count={self.frame_count}, has_bg_frame={self.has_bg_frame})")
+
+
+def parse_header(data, info):
+    """Fill info from the first bytes of a graphic; returns info."""
+    pos = 0
+    if data[:4] == FATZ_MAGIC:
+        if len(data) < FATZ_HEADER_SIZE:
+            info.error = "Truncated FATZ header."
+            return info
+        info.has_magic = True
+        info.has_bg_frame = data[8] != 0
+        pos = FATZ_HEADER_SIZE
+
+    if len(data) < pos + 8:
+        info.error = "Truncated header."
+        return info
+    info.speed, name_length = struct.unpack_from("<II", data, pos)
+    pos += 8
+
+    if name_length == 0 or name_length > MAX_PAL_NAME or len(data) < pos + name_length + 4:
+        info.error = "Invalid palette name length."
+        return info
+    pal_name = bytes(data[pos:pos + name_length]).split(b"\x00", 1)[0]
+    pos += name_length
+
+    try:
+        info.pal_name = pal_name.decode("utf-8")
+    except UnicodeDecodeError:
+        info.pal_name = pal_name.decode("latin-1")
+    if not info.pal_name.lower().endswith(".pal"):
+        info.error = "Embedded palette name is not a .pal file."
+        return info
+
+    (frame_count,) = struct.unpack_from("<I", data, pos)
+    pos += 4
+    if frame_count == 0 or frame_count > MAX_FRAMES:
+        info.error = "Invalid frame count."
+        return info
+
+    # ApeCore reports the background frame as an extra, last frame
+    info.frame_count = frame_count + (1 if info.has_bg_frame else 0)
+    info.header_size = pos
+    info.valid = True
+    return info
+
+
+def probe_graphic(path):
+    """Read a graphic header with a single stat and read."""
+    info = GraphicInfo(path)
+    try:
+        if split_archive_path(path):
+            # Member of a .ztd archive
+            info.mtime, info.size = signature(path)
+            data = read_file(path, PROBE_READ_SIZE)
+        else:
+            with open(path, "rb") as f:
+                stat = os.fstat(f.fileno())
+                data = f.read(PROBE_READ_SIZE)
+            info.mtime = stat.st_mtime_ns
+            info.size = stat.st_size
+    except OSError as e:
+        info.error = str(e)
+        return info
+
+    info.exists = True
+    return parse_header(data, info)
+
+
+class ProbeCache:
+    """Small LRU of GraphicInfo, re-probed only when a file's mtime or size changes."""
+
+    def __init__(self, max_entries=512):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        # Probes run on the GUI thread and on validation workers
+        self.lock = threading.Lock()
+
+    def get(self, path):
+        """Return GraphicInfo for path, reading the header only if needed."""
+        key = os.path.normcase(os.path.abspath(path))
+        with self.lock:
+            info = self.entries.get(key)
+        if info is not None:
+            try:
+                current = signature(path)
+            except OSError:
+                current = None
+            if current == (info.mtime, info.size):
+                with self.lock:
+                    if key in self.entries:
+                        self.entries.move_to_end(key)
+                return info
+
+        info = probe_graphic(path)
+        with self.lock:
+            self.entries[key] = info
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return info
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+# Shared by every stage of an import
+probe_cache = ProbeCache()
+
+
+def probe(path):
+    """Return cached GraphicInfo for a graphic path."""
+    return probe_cache.get(path)
@@ -0,0 +1,143 @@
+# APE.Krita Tools
+# by Eric Galvan (Goosifer.IO)
+# https://github.com/openztcc/APE.KritaTools
+# Licensed under MIT (see LICENSE)
+#
+# First-frame thumbnails of ZT1 graphics for the asset browser, kept as small
+# PNGs in an on-disk cache keyed by the graphic's and palette's mtime and size.
+# Everything here runs without Krita, so thumbnails render on worker threads.
+
+import hashlib
+import os
+import threading
+from array import array
+
+from .apecore import open_frame_source
+from .cache import file_signature
+from .palettes import resolve_palette
+from .pixels import crop, to_bgra, trim_bounds
+from .png import write_png
+from .probe import probe
+
+THUMBNAIL_SIZE = 96
+
+# The disk budget is enforced every this many writes rather than on each one
+TRIM_INTERVAL = 64
+
+
+def scale_nearest(pixels, width, height, size):
+    """Scale a 4-channel frame down to fit size x size; returns (width, height, pixels)."""
+    scale = min(size / width, size / height)
+    if scale >= 1:
+        return width, height, bytes(pixels)
+    out_width = max(1, int(width * scale))
+    out_height = max(1, int(height * scale))
+
+    # Whole pixels as 32-bit words, so each output pixel is one lookup
+    src = memoryview(bytes(pixels)).cast("I")
+    columns = [x * width // out_width for x in range(out_width)]
+    out = array("I")
+    for y in range(out_height):
+        row = src[(y * height // out_height) * width:]
+        out.extend([row[x] for x in columns])
+    return out_width, out_height, out.tobytes()
+
+
+def render_thumbnail(graphic_path, pal_path, size=THUMBNAIL_SIZE, engine="python", instance=None, pool=None):
+    """First frame of a graphic trimmed to its opaque pixels and scaled to fit; returns (width, height, RGBA)."""
+    with open_frame_source(engine, graphic_path, pal_path, instance, pool) as source:
+        width, height, _, _, _, pixels = source.convert(0)
+
+    bounds = trim_bounds(width, height, pixels)
+    if bounds is None:
+        # Fully transparent frame
+        return 1, 1, bytes(4)
+    x, y, w, h = bounds
+    width, height, pixels = scale_nearest(crop(pixels, width, x, y, w, h), w, h, size)
+    # Frames are BGRA; PNG wants RGBA (the swap is its own inverse)
+    rgba = bytearray(pixels)
+    return width, height, to_bgra(rgba, 4, rgba)
+
+
+class ThumbnailCache:
+    """Thumbnail PNGs on disk, one per graphic/palette/size and file stats."""
+
+    def __init__(self, cache_dir, size=THUMBNAIL_SIZE, max_bytes=128 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.size = size
+        self.max_bytes = max_bytes
+        self.writes = 0
+        self.lock = threading.Lock()
+
+    def key(self, graphic_path, pal_path):
+        """Build a cache key; None if either file is missing."""
+        graphic = file_signature(graphic_path)
+        palette = file_signature(pal_path)
+        if graphic is None or palette is None:
+            return None
+        return graphic + palette + (self.size,)
+
+    def path(self, key):
+        digest = hashlib.sha1(repr(key).encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, digest + ".png")
+
+    def get(self, key):
+        """Path of a cached thumbnail, or None."""
+        path = self.path(key)
+        return path if os.path.isfile(path) else None
+
+    def put(self, key, width, height, rgba):
+        """Write a thumbnail and return its path."""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self.path(key)
+        # Unique per thread; a concurrent render of the same graphic writes identical bytes
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        write_png(tmp_path, width, height, rgba)
+        os.replace(tmp_path, path)
+        with self.lock:
+            self.writes += 1
+            trim = self.writes % TRIM_INTERVAL == 0
+        if trim:
+            self.trim()
+        return path
+
+    def trim(self):
+        """Delete the oldest thumbnails over the disk budget (entries of edited files age out here)."""
+        files = []
+        total = 0
+        for entry in os.scandir(self.cache_dir):
+            if not entry.name.endswith(".png"):
+                continue
+            stat = entry.stat()
+            files.append((stat.st_mtime, stat.st_size, entry.path))
+            total += stat.st_size
+        for _, size, path in sorted(files):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+
+
+def make_thumbnail(graphic_path, cache, engine="python", pool=None, index=None):
+    """Return the cached thumbnail PNG of a graphic, rendering it first if needed."""
+    info = probe(graphic_path)
+    if not info.valid:
+        raise ValueError(info.error or "Not a ZT1 graphic.")
+    pal_path = resolve_palette(info.pal_name, graphic_path, index)
+    key = cache.key(graphic_path, pal_path)
+    if key is None:
+        raise FileNotFoundError(f"Palette not found: {pal_path}")
+    path = cache.get(key)
+    if path:
+        return path
+
+    instance = pool.acquire() if engine == "native" else None
+    try:
+        width, height, rgba = render_thumbnail(graphic_path, pal_path, cache.size, engine, instance, pool)
+    finally:
+        if instance is not None:
+            pool.release(instance)
+    return cache.put(key, width, height, rgba)
@@ -0,0 +1,121 @@
+# APE.Krita Tools
+# by Eric Galvan (Goosifer.IO)
+# https://github.com/openztcc/APE.KritaTools
+# Licensed under MIT (see LICENSE)
+#
+# Docker showing the per-stage timing report of the last import.
+
+from krita import *
+
+from . import instrument
+
+STAGE_COLUMNS = ("Stage", "Calls", "Time (ms)", "Peak memory (KB)")
+
+
+class TimingDocker(DockWidget):
+
+    def __init__(self):
+        super().__init__()
+        self.setWindowTitle("APE Import Timings")
+        self.recorder = instrument.recorder
+
+        widget = QWidget(self)
+        layout = QVBoxLayout(widget)
+
+        self.record_checkbox = QCheckBox("Record import timings")
+        self.record_checkbox.setChecked(self.recorder.enabled)
+        self.record_checkbox.toggled.connect(self.record_triggered)
+        layout.addWidget(self.record_checkbox)
+
+        # tracemalloc slows Python decoding considerably, so memory is opt-in
+        self.memory_checkbox = QCheckBox("Track peak memory (slows imports)")
+        self.memory_checkbox.setChecked(self.recorder.trace_memory)
+        self.memory_checkbox.toggled.connect(self.record_triggered)
+        layout.addWidget(self.memory_checkbox)
+
+        self.title_label = QLabel("No import recorded yet.")
+        layout.addWidget(self.title_label)
+
+        self.stage_table = QTableWidget(0, len(STAGE_COLUMNS))
+        self.stage_table.setHorizontalHeaderLabels(STAGE_COLUMNS)
+        self.stage_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.stage_table.verticalHeader().setVisible(False)
+        self.stage_table.horizontalHeader().setStretchLastSection(True)
+        layout.addWidget(self.stage_table)
+
+        self.counter_table = QTableWidget(0, 2)
+        self.counter_table.setHorizontalHeaderLabels(("Counter", "Value"))
+        self.counter_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.counter_table.verticalHeader().setVisible(False)
+        self.counter_table.horizontalHeader().setStretchLastSection(True)
+        layout.addWidget(self.counter_table)
+
+        buttons = QHBoxLayout()
+        refresh_button = QPushButton("Refresh")
+        refresh_button.clicked.connect(self.refresh)
+        buttons.addWidget(refresh_button)
+        reset_button = QPushButton("Reset")
+        reset_button.clicked.connect(self.reset_triggered)
+        buttons.addWidget(reset_button)
+        export_button = QPushButton("Export JSON...")
+        export_button.clicked.connect(self.export_triggered)
+        buttons.addWidget(export_button)
+        layout.addLayout(buttons)
+
+        self.setWidget(widget)
+        self.recorder.listeners.append(self.import_finished)
+        self.refresh()
+
+    def canvasChanged(self, canvas):
+        pass
+
+    def record_triggered(self, _=None):
+        """Apply both checkboxes to the recorder and remember them."""
+        enabled = self.record_checkbox.isChecked()
+        trace_memory = self.memory_checkbox.isChecked()
+        self.recorder.disable()
+        if enabled:
+            self.recorder.enable(trace_memory)
+        app = Krita.instance()
+        app.writeSetting("ape_kritatools", "instrumentation", "true" if enabled else "false")
+        app.writeSetting("ape_kritatools", "instrumentation_memory", "true" if trace_memory else "false")
+        self.refresh()
+
+    def import_finished(self, label):
+        self.title_label.setText(f"Last import: {label}")
+        self.refresh()
+
+    def reset_triggered(self):
+        self.recorder.reset()
+        self.title_label.setText("No import recorded yet.")
+        self.refresh()
+
+    def refresh(self):
+        """Fill the tables from the recorder's current report."""
+        report = self.recorder.report()
+
+        stages = report["stages"]
+        self.stage_table.setRowCount(len(stages))
+        for row, (name, stage) in enumerate(stages.items()):
+            values = (name, str(stage["calls"]), f"{stage['seconds'] * 1000:.1f}", f"{stage['peak_bytes'] / 1024:.0f}")
+            for column, value in enumerate(values):
+                self.stage_table.setItem(row, column, QTableWidgetItem(value))
+
+        counters = sorted(report["counters"].items())
+        self.counter_table.setRowCount(len(counters))
+        for row, (name, value) in enumerate(counters):
+            self.counter_table.setItem(row, 0, QTableWidgetItem(name))
+            self.counter_table.setItem(row, 1, QTableWidgetItem(f"{value:,}"))
+
+        if not self.recorder.enabled:
+            self.title_label.setText("Recording is off.")
+
+    def export_triggered(self):
+        """Save the current report as JSON."""
+        path = QFileDialog.getSaveFileName(self, "Export Timing Report", "ape_timings.json", "JSON (*.json)")[0]
+        if not path:
+            return
+        try:
+            self.recorder.export_json(path)
+        except OSError as e:
+            QMessageBox.warning(self, "APE Import Timings", f"Error: Could not write the report. ({e})")
@@ -0,0 +1,83 @@
+# APE.Krita Tools
+# by Eric Galvan (Goosifer.IO)
+# https://github.com/openztcc/APE.KritaTools
+# Licensed under MIT (see LICENSE)
+#
+# Watch mode: the frames of an imported graphic, kept palette-indexed so that
+# edits made in another program can be diffed against them. Only frames whose
+# RLE data changed are decoded again; a new palette re-expands the kept index
+# planes without reading the graphic.
+
+from .cache import file_signature
+from .decoder import ZT1Graphic, read_palette
+
+
+class WatchedGraphic:
+    """The layer frames of an imported graphic and the state of its files."""
+
+    def __init__(self, graphic_path, pal_path, indices, frames=None):
+        """indices are the frames that became layers; frames may be cached IndexedFrames of the whole graphic."""
+        self.graphic_path = graphic_path
+        self.pal_path = pal_path
+        self.palette = read_palette(pal_path)
+        self.pal_signature = file_signature(pal_path)
+        self.signature = file_signature(graphic_path)
+        with ZT1Graphic(graphic_path, palette=self.palette) as graphic:
+            self.frame_count = graphic.frame_count
+            self.has_bg_frame = graphic.info.has_bg_frame
+            # Digests of the RLE data, so a later read finds edits without decoding
+            self.digests = {i: graphic.digest(i) for i in indices}
+            if frames is not None and len(frames) == graphic.frame_count:
+                self.frames = {i: frames[i].recolor(self.palette) for i in indices}
+            else:
+                self.frames = {i: graphic.frame(i) for i in indices}
+        self.pending = None
+
+    def update(self):
+        """Re-read whichever file changed on disk.
+
+        Returns ({index: IndexedFrame} of frames whose pixels changed, set of
+        indices whose frame data was edited), or None if frames were added,
+        removed or the background frame came or went. Nothing is kept until
+        commit(), so a read that fails part way through, or frames that never
+        reach their layers, are found again by the next update.
+        """
+        changed = {}
+        edited = set()
+        palette = self.palette
+        frames = dict(self.frames)
+        digests = dict(self.digests)
+
+        pal_signature = file_signature(self.pal_path)
+        if pal_signature is not None and pal_signature != self.pal_signature:
+            new_palette = read_palette(self.pal_path)
+            if new_palette.bgra != palette.bgra:
+                # The index planes are shared by the recoloured frames, not copied
+                palette = new_palette
+                frames = {i: frame.recolor(palette) for i, frame in frames.items()}
+                changed.update(frames)
+        else:
+            pal_signature = self.pal_signature
+
+        signature = file_signature(self.graphic_path)
+        if signature is not None and signature != self.signature:
+            with ZT1Graphic(self.graphic_path, palette=palette) as graphic:
+                if graphic.frame_count != self.frame_count or graphic.info.has_bg_frame != self.has_bg_frame:
+                    return None
+                for i, digest in self.digests.items():
+                    new_digest = graphic.digest(i)
+                    if new_digest != digest:
+                        frames[i] = changed[i] = graphic.frame(i)
+                        digests[i] = new_digest
+                        edited.add(i)
+        else:
+            signature = self.signature
+
+        self.pending = (pal_signature, palette, signature, frames, digests)
+        return changed, edited
+
+    def commit(self):
+        """Keep the state read by the last update() once its frames have been written."""
+        if self.pending is not None:
+            self.pal_signature, self.palette, self.signature, self.frames, self.digests = self.pending
+            self.pending = None
@@ -0,0 +1,225 @@
+# APE.Krita Tools
+# by Eric Galvan (Goosifer.IO)
+# https://github.com/openztcc/APE.KritaTools
+# Licensed under MIT (see LICENSE)
+#
+# Qt helpers for running file I/O and decoding off the GUI thread.
+
+import os
+import time
+
+from PyQt5.QtCore import QFileSystemWatcher, QObject, QRunnable, QThreadPool, QTimer, pyqtSignal, pyqtSlot
+
+from . import instrument
+from .apecore import open_frame_source
+from .archives import split_archive_path
+from .directions import decode_set
+from .pixels import duplicate_map
+
+
+class TaskSignals(QObject):
+    """Signals emitted by a FunctionTask (QRunnable cannot emit on its own)."""
+    finished = pyqtSignal(int, object)
+
+
+class FunctionTask(QRunnable):
+    """Run a callable on a QThreadPool and report its result with a request id."""
+
+    def __init__(self, request_id, fn, args, is_current=None):
+        super().__init__()
+        self.request_id = request_id
+        self.fn = fn
+        self.args = args
+        self.is_current = is_current
+        self.signals = TaskSignals()
+
+    def run(self):
+        # Skip the work entirely if a newer request superseded this one while queued
+        if self.is_current and not self.is_current(self.request_id):
+            return
+        try:
+            result = self.fn(*self.args)
+        except Exception as e:
+            result = e
+        self.signals.finished.emit(self.request_id, result)
+
+
+class DebouncedValidator(QObject):
+    """Debounce repeated requests and run only the latest one on the global thread pool."""
+
+    validated = pyqtSignal(object)
+
+    def __init__(self, check, delay=250, parent=None):
+        super().__init__(parent)
+        self.check = check
+        self.pending = None
+        self.request_id = 0
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(delay)
+        self.timer.timeout.connect(self.start_check)
+
+    def request(self, *args):
+        """Queue a check; restarts the debounce delay and invalidates running checks."""
+        self.pending = args
+        self.request_id += 1
+        self.timer.start()
+
+    def is_current(self, request_id):
+        return request_id == self.request_id
+
+    def start_check(self):
+        task = FunctionTask(self.request_id, self.check, self.pending, self.is_current)
+        task.signals.finished.connect(self.on_finished)
+        QThreadPool.globalInstance().start(task)
+
+    @pyqtSlot(int, object)
+    def on_finished(self, request_id, result):
+        # Drop stale results from checks that were superseded while running
+        if self.is_current(request_id):
+            self.validated.emit(result)
+
+
+class FileWatcher(QObject):
+    """Report changes to a set of files once they have settled.
+
+    Editors often save in several writes, or by replacing the file (which drops
+    it from QFileSystemWatcher), so changes are collected until none arrive for
+    the delay and replaced files are watched again. Archive members are watched
+    through their archive.
+    """
+
+    changed = pyqtSignal()
+
+    def __init__(self, paths, delay=200, parent=None):
+        super().__init__(parent)
+        self.paths = sorted({(split_archive_path(path) or (path,))[0] for path in paths})
+        self.watcher = QFileSystemWatcher(self)
+        self.watcher.fileChanged.connect(self.on_file_changed)
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(delay)
+        self.timer.timeout.connect(self.settle)
+        self.watch_missing()
+
+    def watch_missing(self):
+        """Watch every file that exists again; returns whether all of them do."""
+        watched = set(self.watcher.files())
+        found = True
+        for path in self.paths:
+            if path in watched:
+                continue
+            if os.path.isfile(path):
+                self.watcher.addPath(path)
+            else:
+                found = False
+        return found
+
+    @pyqtSlot(str)
+    def on_file_changed(self, path):
+        self.timer.start()
+
+    def settle(self):
+        # A file being replaced is briefly missing; wait for it to come back
+        if not self.watch_missing():
+            self.timer.start()
+            return
+        self.changed.emit()
+
+    def stop(self):
+        self.timer.stop()
+        files = self.watcher.files()
+        if files:
+            self.watcher.removePaths(files)
+
+
+class DecodeWorker(QObject):
+    """Decode and convert frames on a QThread, streaming them to the GUI thread."""
+
+    loaded = pyqtSignal(object, object)    # frame headers and repeated positions, before any pixels are converted
+    frame_ready = pyqtSignal(int, object)  # frame index, frame tuple (or IndexedFrame; None for a repeat)
+    failed = pyqtSignal(str)
+    finished = pyqtSignal(bool, float)     # cancelled, seconds
+
+    def __init__(self, engine, pool, graphic_path, pal_path, order, dedupe=True):
+        super().__init__()
+        self.engine = engine
+        self.pool = pool
+        self.graphic_path = graphic_path
+        self.pal_path = pal_path
+        self.order = order
+        self.dedupe = dedupe
+        self.cancelled = False
+
+    def cancel(self):
+        """Request cancellation; checked between frames."""
+        self.cancelled = True
+
+    @pyqtSlot()
+    def run(self):
+        start = time.perf_counter()
+        source = None
+        instance = None
+        try:
+            if self.engine == "native":
+                instance = self.pool.acquire()
+            source = open_frame_source(self.engine, self.graphic_path, self.pal_path, instance, self.pool)
+            order = [index for index in self.order if index < len(source.headers)]
+            # Repeated frames are found by hashing their data and never converted
+            duplicates = duplicate_map(order, source.digest) if self.dedupe else {}
+            self.loaded.emit(source.headers, duplicates)
+            for position, index in enumerate(order):
+                if self.cancelled:
+                    break
+                if position in duplicates:
+                    instrument.count("duplicate_frames")
+                    self.frame_ready.emit(index, None)
+                    continue
+                with instrument.span("convert"):
+                    frame = source.frame(index)
+                self.frame_ready.emit(index, frame)
+        except (OSError, RuntimeError, ValueError) as e:
+            self.failed.emit(str(e))
+        finally:
+            # Converted frames are owned copies, so the native buffers can go now
+            if source:
+                source.close()
+            if instance is not None:
+                self.pool.release(instance)
+        self.finished.emit(self.cancelled, time.perf_counter() - start)
+
+
+class SetDecodeWorker(QObject):
+    """Decode every facing of an animation set on a QThread, several at a time."""
+
+    direction_ready = pyqtSignal(str, object)  # direction, frame list
+    failed = pyqtSignal(str)
+    finished = pyqtSignal(bool, float)         # cancelled, seconds
+
+    def __init__(self, engine, pool, items, pal_path, dedupe=True):
+        super().__init__()
+        self.engine = engine
+        self.pool = pool
+        self.items = items
+        self.pal_path = pal_path
+        self.dedupe = dedupe
+        self.cancelled = False
+
+    def cancel(self):
+        """Request cancellation; checked between frames of every facing."""
+        self.cancelled = True
+
+    def is_cancelled(self):
+        return self.cancelled
+
+    @pyqtSlot()
+    def run(self):
+        start = time.perf_counter()
+        try:
+            for direction, frames in decode_set(self.engine, self.items, self.pal_path, self.pool,
+                                                cancelled=self.is_cancelled, dedupe=self.dedupe):
+                if frames is not None:
+                    self.direction_ready.emit(direction, frames)
+        except (OSError, RuntimeError, ValueError) as e:
+            self.failed.emit(str(e))
+        self.finished.emit(self.cancelled, time.perf_counter() - start)
@@ -0,0 +1,85 @@
+# APE.Krita Tools
+# Cross-check and throughput benchmark for the decoder engines.
+#
+# Usage: python benchmarks/bench_decoder.py [GRAPHIC PALETTE] [--size 256] [--frames 8] [--repeat 3]
+#
+# Without a graphic, a synthetic one is written to a temporary directory. The
+# native engine is compared frame by frame against the Python engine when
+# ApeCore is available.
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ape_kritatools import apecore
+from ape_kritatools.apecore import ENGINES, open_frame_source
+from synthetic import write_synthetic
+
+
+def visible(bgra):
+    """Zero the color of fully transparent pixels, which the engines may fill differently."""
+    out = bytearray(bgra)
+    for i in range(3, len(out), 4):
+        if not out[i]:
+            out[i - 3:i] = b"\x00\x00\x00"
+    return out
+
+
+def decode_all(engine, graphic_path, pal_path, instance):
+    with open_frame_source(engine, graphic_path, pal_path, instance) as source:
+        return [source.convert(i) for i in range(len(source.headers))]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare the native and Python ZT1 decoders.")
+    parser.add_argument("graphic", nargs="?", help="ZT1 graphic to decode (default: synthetic)")
+    parser.add_argument("palette", nargs="?", help="palette for the graphic")
+    parser.add_argument("--size", type=int, default=256, help="synthetic frame width and height")
+    parser.add_argument("--frames", type=int, default=8, help="synthetic frame count")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per engine (best is kept)")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        if args.graphic:
+            graphic_path, pal_path = args.graphic, args.palette
+        else:
+            graphic_path, pal_path = write_synthetic(directory, args.size, args.frames)
+
+        engines = [engine for engine in ENGINES if engine != "native" or apecore.ape is not None]
+        instance = apecore.ape.create_ape_instance() if apecore.ape is not None else None
+        if instance is None:
+            print("ApeCore not available; benchmarking the Python engine only")
+
+        results = {}
+        print(f"{'engine':>8} {'seconds':>10} {'frames/s':>10} {'MPix/s':>10}")
+        for engine in engines:
+            best = float("inf")
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                frames = decode_all(engine, graphic_path, pal_path, instance)
+                best = min(best, time.perf_counter() - start)
+            results[engine] = frames
+            pixels = sum(frame[0] * frame[1] for frame in frames)
+            print(f"{engine:>8} {best:>10.4f} {len(frames) / best:>10.1f} {pixels / best / 1e6:>10.2f}")
+
+        with open_frame_source("python", graphic_path, pal_path) as source:
+            indexed = sum(source.frame(i).nbytes for i in range(len(source.headers)))
+        expanded = sum(len(frame[5]) for frame in results["python"])
+        print(f"frame memory: {indexed} bytes indexed, {expanded} bytes BGRA ({expanded / indexed:.1f}x)")
+
+        if len(results) > 1:
+            native, python = results["native"], results["python"]
+            if len(native) != len(python):
+                raise SystemExit(f"frame count differs: native {len(native)}, python {len(python)}")
+            for i, (a, b) in enumerate(zip(native, python)):
+                if a[:4] != b[:4] or visible(a[5]) != visible(b[5]):
+                    raise SystemExit(f"frame {i} differs between engines")
+            print("native and python output match")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+# APE.Krita Tools
+# Round-trip check and throughput benchmark for the ZT1 encoder.
+#
+# Usage: python benchmarks/bench_encoder.py [--size 256] [--frames 16] [--colors 200]
+#
+# Synthetic BGRA frames are written with encoder.write_ape and read back with
+# the Python decoder. With at most 256 colors the round trip must be exact.
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ape_kritatools import decoder, encoder
+
+
+def make_frames(size, frames, colors, seed=1):
+    """Frames of diagonal color bands with transparent stripes, as (w, h, x, y, 4, BGRA)."""
+    rng = random.Random(seed)
+    palette = [bytes(rng.randrange(256) for _ in range(3)) + b"\xff" for _ in range(colors)]
+    clear = b"\x00\x00\x00\x00"
+    result = []
+    for i in range(frames):
+        rows = []
+        for y in range(size):
+            rows.append(b"".join(clear if (x + y + i) % 13 < 4 else palette[(x // 4 + y + i) % colors]
+                                 for x in range(size)))
+        result.append((size, size, size // 2 - i, size // 2 + i, 4, b"".join(rows)))
+    return result
+
+
+def visible(bgra):
+    """Zero the color of fully transparent pixels (the decoder fills them from the palette)."""
+    out = bytearray(bgra)
+    for i in range(3, len(out), 4):
+        if not out[i]:
+            out[i - 3:i] = b"\x00\x00\x00"
+    return bytes(out)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Encode synthetic frames to ZT1 and decode them again.")
+    parser.add_argument("--size", type=int, default=256, help="frame width and height")
+    parser.add_argument("--frames", type=int, default=16, help="frames per graphic")
+    parser.add_argument("--colors", type=int, default=200, help="distinct colors (over 256 forces quantizing)")
+    args = parser.parse_args(argv)
+
+    frames = make_frames(args.size, args.frames, args.colors)
+    with tempfile.TemporaryDirectory() as directory:
+        graphic_path = os.path.join(directory, "N")
+        pal_path = os.path.join(directory, "bench.pal")
+
+        start = time.perf_counter()
+        quantizer = encoder.write_ape(graphic_path, pal_path, frames, 100)
+        seconds = time.perf_counter() - start
+        size = os.path.getsize(graphic_path)
+
+        decoded, _ = decoder.load_frames(graphic_path, pal_path)
+
+    kind = "exact" if quantizer.exact else "quantized"
+    print(f"{args.frames} frames of {args.size}x{args.size}, {len(quantizer.palette)}-color {kind} palette")
+    print(f"encode: {seconds:.3f}s ({seconds / args.frames * 1000:.1f} ms/frame, "
+          f"{args.size * args.size * args.frames / seconds / 1e6:.2f} MPix/s), {size} bytes")
+
+    if len(decoded) != len(frames):
+        raise SystemExit(f"round trip lost frames: {len(decoded)} of {len(frames)}")
+    for i, (original, frame) in enumerate(zip(frames, decoded)):
+        if tuple(frame[:4]) != original[:4]:
+            raise SystemExit(f"frame {i} header differs: {tuple(frame[:4])} != {original[:4]}")
+        if quantizer.exact and visible(frame[5]) != visible(original[5]):
+            raise SystemExit(f"frame {i} pixels differ after the round trip")
+    print("round trip ok" if quantizer.exact else "round trip ok (headers; pixels are quantized)")
+
+
+if __name__ == "__main__":
+    main()
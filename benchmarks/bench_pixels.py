@@ -0,0 +1,60 @@
+# APE.Krita Tools
+# Micro-benchmark for the pixel conversion stage.
+#
+# Usage: python benchmarks/bench_pixels.py [--size 256] [--frames 8] [--repeat 3]
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ape_kritatools import pixels
+
+
+def make_frames(size, frames, channels):
+    """Build deterministic pixel streams for the benchmark."""
+    length = size * size * channels
+    pattern = bytes(range(256)) * (length // 256 + 1)
+    return [bytearray(pattern[i:i + length]) for i in range(frames)]
+
+
+def time_converter(converter, frames, channels, repeat):
+    """Return the best wall time for converting all frames."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for frame in frames:
+            converter(frame, channels)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare pixel converters against the original loop.")
+    parser.add_argument("--size", type=int, default=256, help="frame width and height in pixels")
+    parser.add_argument("--frames", type=int, default=8, help="frames per run")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per converter (best is kept)")
+    args = parser.parse_args(argv)
+
+    names = [name for name in pixels.CONVERTERS if name != "numpy" or pixels.np is not None]
+    print(f"{args.frames} frames of {args.size}x{args.size}, best of {args.repeat}")
+    print(f"{'channels':>8} {'converter':>10} {'seconds':>10} {'MPix/s':>10} {'speedup':>8}")
+
+    for channels in pixels.SUPPORTED_CHANNELS:
+        frames = make_frames(args.size, args.frames, channels)
+        expected = [pixels.swizzle_loop(frame, channels) for frame in frames[:1]]
+        baseline = None
+        for name in names:
+            converter = pixels.CONVERTERS[name]
+            if converter(frames[0], channels) != expected[0]:
+                raise SystemExit(f"{name} output differs from the reference loop ({channels} channels)")
+            seconds = time_converter(converter, frames, channels, args.repeat)
+            baseline = baseline or seconds
+            mpix = args.size * args.size * args.frames / seconds / 1e6
+            print(f"{channels:>8} {name:>10} {seconds:>10.4f} {mpix:>10.2f} {baseline / seconds:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+# APE.Krita Tools
+# Import benchmark suite: times the import stages on synthetic graphics at
+# several scales, outside Krita, and stores the results as JSON.
+#
+# Usage: python benchmarks/run_suite.py [--scales small,medium,large] [--repeat 3]
+#                                       [--output results.json] [--compare previous.json]
+#
+# Krita is replaced by benchmarks/stubs/krita.py (and PyQt5 by the stubs next
+# to it when PyQt5 is not installed). Layer timings therefore measure the
+# plugin's own work plus a pixel copy per layer, not Krita's painting.
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+# Appended so an installed PyQt5 wins over the stub
+sys.path.append(os.path.join(BENCH_DIR, "stubs"))
+
+from krita import Krita
+
+from ape_kritatools import apecore, decoder, instrument, pixels
+from ape_kritatools.ape_kritatools import VERSION, APEKritaTools
+from ape_kritatools.palettes import adjust_pal_directory
+from synthetic import write_palette, write_synthetic
+
+# name: (frame width and height, frame count)
+SCALES = {
+    "small": (64, 8),
+    "medium": (128, 32),
+    "large": (256, 128),
+}
+
+PALETTE_PATHS = [
+    ("animals/lion/lion.pal", "C:/Games/Zoo Tycoon/animals/lion/m/walk/N"),
+    ("objects/fence/fence.pal", "/home/user/zt1/objects/fence/SE"),
+    ("ui/sharedui/pal.pal", "D:/assets/ui/sharedui/buttons/ok/N"),
+    ("lion.pal", "animals/lion/m/walk/N"),
+]
+
+
+def best_of(fn, repeat):
+    """Best wall time of repeat calls, and the last result."""
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def new_extension(engine):
+    extension = APEKritaTools(None)
+    extension.engine = engine
+    extension.krita = Krita.instance()
+    return extension
+
+
+def time_load_python(extension, graphic_path, pal_path, repeat):
+    """load_frames over the Python decoder, expanding every frame to BGRA."""
+    def run():
+        with decoder.ZT1Graphic(graphic_path, pal_path) as graphic:
+            order = list(range(graphic.frame_count))
+            return [tuple(frame) for frame in extension.load_frames(order, graphic.frame)]
+    return best_of(run, repeat)
+
+
+def time_load_native(extension, graphic_path, pal_path, repeat):
+    """load_frames over ApeCore buffers (zero-copy views, copied out so they outlive the buffers)."""
+    instance = apecore.ape.create_ape_instance()
+
+    def run():
+        frame_buffer, frame_count = apecore.load_native(instance, graphic_path, pal_path)
+        try:
+            order = list(range(frame_count))
+            convert = extension.native_frames(frame_buffer, order)
+            return [frame[:5] + (bytes(frame[5]),) for frame in extension.load_frames(order, convert)]
+        finally:
+            apecore.release_frames(frame_buffer, frame_count)
+    return best_of(run, repeat)
+
+
+def build_layers(extension, frames):
+    """Run frames_to_layers on a fresh stub document; returns the document."""
+    extension.measure_frames(frames)
+    doc = Krita.instance().createDocument(extension.bounding_box["w"], extension.bounding_box["h"],
+                                          "Untitled", "RGBA", "U8", "", 300.0)
+    order = extension.layer_order(len(frames))
+    extension.frames_to_layers((frames[i] for i in order), doc, len(order))
+    return doc
+
+
+def time_recolor_import(graphic_path, pal_path):
+    """A second import of a graphic with another palette; fails if it decodes the graphic again."""
+    extension = new_extension("python")
+    other_pal_path = write_palette(pal_path + ".other", 200)
+    extension.load_image_into_krita(graphic_path, pal_path)
+    instrument.recorder.enable(trace_memory=False)
+    instrument.recorder.reset()
+    try:
+        start = time.perf_counter()
+        extension.start_import(graphic_path, other_pal_path)
+        seconds = time.perf_counter() - start
+        stages = instrument.recorder.report()["stages"]
+    finally:
+        instrument.recorder.disable()
+    if "python_load" in stages or "native_load" in stages or extension.import_job:
+        raise RuntimeError("Importing with another palette decoded the graphic again.")
+    return seconds
+
+
+def time_adjust_pal_directory(calls):
+    """Microseconds per adjust_pal_directory call."""
+    start = time.perf_counter()
+    for i in range(calls):
+        pal_path, graphic_path = PALETTE_PATHS[i % len(PALETTE_PATHS)]
+        adjust_pal_directory(pal_path, graphic_path)
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def run_scale(directory, name, size, frame_count, repeat):
+    graphic_path, pal_path = write_synthetic(os.path.join(directory, name), size, frame_count, has_bg_frame=True)
+    extension = new_extension("python")
+    extension.has_bg_frame = True
+    result = {"size": size, "frames": frame_count, "load_frames": {}}
+
+    seconds, frames = time_load_python(extension, graphic_path, pal_path, repeat)
+    result["load_frames"]["python"] = seconds
+    if apecore.ape is not None:
+        result["load_frames"]["native"], _ = time_load_native(extension, graphic_path, pal_path, repeat)
+
+    result["frames_to_layers"], doc = best_of(lambda: build_layers(extension, frames), repeat)
+
+    # Bounds from a walk over layer.bounds() (the per-frame refresh path) and from known rects
+    rects = [(0, 0, frame[0], frame[1]) for frame in frames]
+    result["update_bounds"], _ = best_of(lambda: extension.update_bounds(doc, doc.width(), doc.height()), repeat)
+    result["update_bounds_rects"], _ = best_of(lambda: extension.update_bounds(doc, doc.width(), doc.height(), rects), repeat)
+
+    result["recolor_import"] = time_recolor_import(graphic_path, pal_path)
+    result["adjust_pal_directory_us"] = min(time_adjust_pal_directory(frame_count * 100) for _ in range(repeat))
+    return result
+
+
+def compare(results, previous):
+    """Print the change against an earlier results file for every shared timing."""
+    print(f"\nAgainst {previous.get('version')} ({previous.get('created')}):")
+    for scale, timings in results["results"].items():
+        old = previous.get("results", {}).get(scale)
+        if not old:
+            continue
+        for key, value in timings.items():
+            old_value = old.get(key)
+            if isinstance(value, dict):
+                pairs = [(f"{key}.{k}", v, (old_value or {}).get(k)) for k, v in value.items()]
+            else:
+                pairs = [(key, value, old_value)]
+            for label, new, before in pairs:
+                if key in ("size", "frames") or not before:
+                    continue
+                print(f"  {scale:>6} {label:<24} {before:>10.4f} -> {new:>10.4f} ({(new / before - 1) * 100:+.0f}%)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time the import stages on synthetic ZT1 graphics.")
+    parser.add_argument("--scales", default=",".join(SCALES), help="comma-separated scales to run")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per timing (best is kept)")
+    parser.add_argument("--output", help="results file (default: benchmarks/results/<version>-<time>.json)")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    args = parser.parse_args(argv)
+
+    results = {
+        "version": VERSION,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "numpy": pixels.np is not None,
+        "native": apecore.ape is not None,
+        "repeat": args.repeat,
+        "results": {},
+    }
+
+    print(f"{'scale':>6} {'frames':>6} {'size':>5} {'load (py)':>10} {'layers':>10} {'bounds':>10} {'rects':>10} {'pal us':>8}")
+    with tempfile.TemporaryDirectory() as directory:
+        for name in args.scales.split(","):
+            size, frame_count = SCALES[name]
+            result = run_scale(directory, name, size, frame_count, args.repeat)
+            results["results"][name] = result
+            print(f"{name:>6} {frame_count:>6} {size:>5} {result['load_frames']['python']:>10.4f} "
+                  f"{result['frames_to_layers']:>10.4f} {result['update_bounds']:>10.4f} "
+                  f"{result['update_bounds_rects']:>10.4f} {result['adjust_pal_directory_us']:>8.2f}")
+
+    output = args.output or os.path.join(BENCH_DIR, "results", f"{VERSION}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=1)
+    print(f"Results written to {output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            compare(results, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
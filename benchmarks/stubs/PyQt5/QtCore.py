@@ -0,0 +1,125 @@
+# APE.Krita Tools
+# Minimal QtCore stand-in: enough names for ape_kritatools to import and for
+# the benchmarked code paths to run. Signals and timers do nothing.
+
+
+class _Signal:
+    def connect(self, slot):
+        pass
+
+    def disconnect(self, slot=None):
+        pass
+
+    def emit(self, *args):
+        pass
+
+
+def pyqtSignal(*types):
+    return _Signal()
+
+
+def pyqtSlot(*types, **kwargs):
+    return lambda fn: fn
+
+
+class QObject:
+    def __init__(self, parent=None):
+        self._parent = parent
+
+    def moveToThread(self, thread):
+        pass
+
+
+class QAbstractListModel(QObject):
+    pass
+
+
+class QRunnable:
+    def __init__(self):
+        pass
+
+
+class QThreadPool:
+    @staticmethod
+    def globalInstance():
+        return QThreadPool()
+
+    def start(self, runnable):
+        runnable.run()
+
+
+class QThread(QObject):
+    started = _Signal()
+
+    def start(self):
+        pass
+
+    def quit(self):
+        pass
+
+    def wait(self):
+        pass
+
+
+class QTimer(QObject):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.timeout = _Signal()
+
+    @staticmethod
+    def singleShot(msec, fn):
+        pass
+
+    def setSingleShot(self, single):
+        pass
+
+    def setInterval(self, msec):
+        pass
+
+    def start(self, msec=None):
+        pass
+
+    def stop(self):
+        pass
+
+
+class QFileSystemWatcher(QObject):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.fileChanged = _Signal()
+        self._files = []
+
+    def addPath(self, path):
+        self._files.append(path)
+        return True
+
+    def removePaths(self, paths):
+        self._files = [path for path in self._files if path not in paths]
+        return []
+
+    def files(self):
+        return list(self._files)
+
+
+class QByteArray(bytes):
+    pass
+
+
+class QStandardPaths:
+    CacheLocation = 0
+
+    @staticmethod
+    def writableLocation(location):
+        import tempfile
+        return tempfile.gettempdir()
+
+
+class Qt:
+    Checked = 2
+    Unchecked = 0
+    WindowModal = 1
+    WaitCursor = 3
+    DisplayRole = 0
+    DecorationRole = 1
+    ToolTipRole = 3
+    UserRole = 256
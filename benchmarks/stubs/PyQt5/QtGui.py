@@ -0,0 +1,2 @@
+# APE.Krita Tools
+# Minimal QtGui stand-in for benchmarks.
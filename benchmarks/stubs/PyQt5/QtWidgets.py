@@ -0,0 +1,20 @@
+# APE.Krita Tools
+# Minimal QtWidgets stand-in for benchmarks. Message boxes print instead of showing.
+
+
+class QMessageBox:
+    Information = 0
+    Yes = 1
+    No = 2
+
+    def setWindowTitle(self, title):
+        pass
+
+    def setText(self, text):
+        self.text = text
+
+    def setIcon(self, icon):
+        pass
+
+    def exec_(self):
+        print(f"message: {self.text}")
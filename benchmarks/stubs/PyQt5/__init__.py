@@ -0,0 +1,2 @@
+# APE.Krita Tools
+# Minimal PyQt5 stand-in for benchmarks; only used when PyQt5 is not installed.
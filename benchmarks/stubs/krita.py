@@ -0,0 +1,358 @@
+# APE.Krita Tools
+# Stand-in for Krita's Python API, for timing import code outside Krita.
+#
+# Documents and nodes keep real pixel buffers, so setPixelData, pixelData and
+# bounds cost roughly what copying the data costs; projection refreshes are
+# counted but do no work. Only what ape_kritatools uses is implemented.
+
+from PyQt5.QtCore import *
+from PyQt5.QtGui import *
+from PyQt5.QtWidgets import *
+
+
+class Rect:
+    def __init__(self, x=0, y=0, width=0, height=0):
+        self._rect = (x, y, width, height)
+
+    def x(self):
+        return self._rect[0]
+
+    def y(self):
+        return self._rect[1]
+
+    def width(self):
+        return self._rect[2]
+
+    def height(self):
+        return self._rect[3]
+
+    def isEmpty(self):
+        return self._rect[2] <= 0 or self._rect[3] <= 0
+
+
+class Node:
+    def __init__(self, name, node_type="paintlayer", document=None):
+        self._name = name
+        self._type = node_type
+        self._document = document
+        self._children = []
+        self._pixels = None
+        self._size = (0, 0)
+        self._position = (0, 0)
+        self._keyframes = None  # time -> (pixels, size, position) once animated
+
+    def name(self):
+        return self._name
+
+    def setName(self, name):
+        self._name = name
+
+    def type(self):
+        return self._type
+
+    def animated(self):
+        return self._keyframes is not None
+
+    def enableAnimation(self):
+        if self._keyframes is None:
+            self._keyframes = {0: (self._pixels, self._size, self._position)}
+        return True
+
+    def hasKeyframeAtTime(self, time):
+        return self._keyframes is not None and time in self._keyframes
+
+    def childNodes(self):
+        return list(self._children)
+
+    def addChildNode(self, child, above):
+        # Krita inserts at the bottom of the stack when above is None
+        if above is None:
+            self._children.insert(0, child)
+        else:
+            self._children.insert(self._children.index(above) + 1, child)
+        return True
+
+    def removeChildNode(self, child):
+        self._children.remove(child)
+        return True
+
+    def setPixelData(self, data, x, y, width, height):
+        self._pixels = bytes(data)
+        self._size = (width, height)
+        self._position = (x, y)
+        if self._keyframes is not None:
+            time = max(t for t in self._keyframes if t <= self._document._time)
+            self._keyframes[time] = (self._pixels, self._size, self._position)
+
+    def pixelData(self, x, y, width, height):
+        out = bytearray(width * height * 4)
+        if self._pixels is None:
+            return bytes(out)
+        src_w, src_h = self._size
+        left, top = self._position
+        for row in range(src_h):
+            dst_y = top + row - y
+            if not 0 <= dst_y < height:
+                continue
+            x0 = max(left, x)
+            x1 = min(left + src_w, x + width)
+            if x0 >= x1:
+                continue
+            src = (row * src_w + x0 - left) * 4
+            dst = (dst_y * width + x0 - x) * 4
+            out[dst:dst + (x1 - x0) * 4] = self._pixels[src:src + (x1 - x0) * 4]
+        return bytes(out)
+
+    def projectionPixelData(self, x, y, width, height):
+        return self.pixelData(x, y, width, height)
+
+    def pixelDataAtTime(self, x, y, width, height, time):
+        current = self._pixels, self._size, self._position
+        self._pixels, self._size, self._position = self._keyframes[max(t for t in self._keyframes if t <= time)]
+        try:
+            return self.pixelData(x, y, width, height)
+        finally:
+            self._pixels, self._size, self._position = current
+
+    def move(self, x, y):
+        self._position = (x, y)
+
+    def bounds(self):
+        if self._children:
+            rects = [child.bounds() for child in self._children]
+            rects = [rect for rect in rects if not rect.isEmpty()]
+            if not rects:
+                return Rect()
+            left = min(rect.x() for rect in rects)
+            top = min(rect.y() for rect in rects)
+            right = max(rect.x() + rect.width() for rect in rects)
+            bottom = max(rect.y() + rect.height() for rect in rects)
+            return Rect(left, top, right - left, bottom - top)
+        if self._pixels is None:
+            return Rect()
+        return Rect(self._position[0], self._position[1], self._size[0], self._size[1])
+
+    def _shift(self, dx, dy):
+        if self._pixels is not None:
+            self._position = (self._position[0] + dx, self._position[1] + dy)
+        if self._keyframes:
+            self._keyframes = {time: (pixels, size, (position[0] + dx, position[1] + dy) if pixels is not None else position)
+                               for time, (pixels, size, position) in self._keyframes.items()}
+        for child in self._children:
+            child._shift(dx, dy)
+
+
+class CloneLayer(Node):
+    """Shows its source's pixels (and follows it when the source moves)."""
+
+    def __init__(self, name, source, document=None):
+        super().__init__(name, "clonelayer", document)
+        self._source = source
+
+    def pixelData(self, x, y, width, height):
+        # A clone has no paint device of its own
+        return bytes(width * height * 4)
+
+    def projectionPixelData(self, x, y, width, height):
+        return self._source.pixelData(x, y, width, height)
+
+    def bounds(self):
+        return self._source.bounds()
+
+
+class Document:
+    def __init__(self, width, height, name="Untitled"):
+        self._width = width
+        self._height = height
+        self._name = name
+        self._root = Node("root", "grouplayer")
+        self._annotations = {}
+        self._fps = 24
+        self._clip = (0, 100)
+        self._time = 0
+        self._active = None
+        self.refreshes = 0
+        self.closed = False
+
+    def width(self):
+        return self._width
+
+    def height(self):
+        return self._height
+
+    def rootNode(self):
+        return self._root
+
+    def createNode(self, name, node_type):
+        return Node(name, node_type, self)
+
+    def createGroupLayer(self, name):
+        return Node(name, "grouplayer", self)
+
+    def createCloneLayer(self, name, source):
+        return CloneLayer(name, source, self)
+
+    def nodeByName(self, name):
+        stack = list(self._root._children)
+        while stack:
+            node = stack.pop()
+            if node.name() == name:
+                return node
+            stack.extend(node._children)
+        return None
+
+    def activeNode(self):
+        return self._active
+
+    def setActiveNode(self, node):
+        self._active = node
+
+    def currentTime(self):
+        return self._time
+
+    def setCurrentTime(self, time):
+        self._time = time
+        # Animated layers show the keyframe at or before the current time
+        stack = list(self._root._children)
+        while stack:
+            node = stack.pop()
+            stack.extend(node._children)
+            if node._keyframes:
+                node._pixels, node._size, node._position = node._keyframes[max(t for t in node._keyframes if t <= time)]
+
+    def waitForDone(self):
+        pass
+
+    def refreshProjection(self):
+        self.refreshes += 1
+
+    def resizeImage(self, x, y, width, height):
+        self._root._shift(-x, -y)
+        self._width = width
+        self._height = height
+        return True
+
+    def setAnnotation(self, annotation_type, description, data):
+        self._annotations[annotation_type] = bytes(data)
+
+    def annotation(self, annotation_type):
+        return self._annotations.get(annotation_type)
+
+    def framesPerSecond(self):
+        return self._fps
+
+    def setFramesPerSecond(self, fps):
+        self._fps = fps
+
+    def setFullClipRangeStartTime(self, time):
+        self._clip = (time, self._clip[1])
+
+    def setFullClipRangeEndTime(self, time):
+        self._clip = (self._clip[0], time)
+
+    def fullClipRangeStartTime(self):
+        return self._clip[0]
+
+    def fullClipRangeEndTime(self):
+        return self._clip[1]
+
+    def close(self):
+        self.closed = True
+        if self in Krita.instance()._documents:
+            Krita.instance()._documents.remove(self)
+        return True
+
+
+class Window:
+    def addView(self, document):
+        return None
+
+    def qwindow(self):
+        return None
+
+    def createAction(self, name, text, menu):
+        return Action(name)
+
+
+class Action:
+    def __init__(self, name=""):
+        self.name = name
+        self.triggered = pyqtSignal()
+        self.toggled = pyqtSignal()
+
+    def trigger(self):
+        if self.name == "add_blank_frame":
+            document = Krita.instance().activeDocument()
+            node = document.activeNode()
+            node._keyframes[document._time] = (None, (0, 0), (0, 0))
+            node._pixels, node._size, node._position = node._keyframes[document._time]
+
+    def setCheckable(self, checkable):
+        pass
+
+    def setChecked(self, checked):
+        pass
+
+
+class _Krita:
+    def __init__(self):
+        self.settings = {}
+        self._documents = []
+
+    def readSetting(self, group, key, default):
+        return self.settings.get((group, key), default)
+
+    def writeSetting(self, group, key, value):
+        self.settings[(group, key)] = value
+
+    def createDocument(self, width, height, name, color_model, depth, profile, resolution):
+        document = Document(width, height, name)
+        self._documents.append(document)
+        return document
+
+    def activeDocument(self):
+        return self._documents[-1] if self._documents else None
+
+    def documents(self):
+        return list(self._documents)
+
+    def activeWindow(self):
+        return Window()
+
+    def action(self, name):
+        return Action(name)
+
+    def addExtension(self, extension):
+        pass
+
+    def addDockWidgetFactory(self, factory):
+        pass
+
+
+class Krita:
+    _instance = _Krita()
+
+    @staticmethod
+    def instance():
+        return Krita._instance
+
+
+class Extension(QObject):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+
+
+class DockWidget(QObject):
+    pass
+
+
+class DockWidgetFactoryBase:
+    DockLeft = 1
+    DockRight = 2
+
+
+class DockWidgetFactory(DockWidgetFactoryBase):
+    def __init__(self, name, position, widget_class):
+        self.name = name
+        self.position = position
+        self.widget_class = widget_class
@@ -0,0 +1,64 @@
+# APE.Krita Tools
+# Synthetic ZT1 graphics and palettes for benchmarks.
+#
+# Frames are written with the row RLE described in ape_kritatools/decoder.py;
+# rows alternate transparent gaps and opaque runs of varying length so the
+# decoders see realistic instruction counts.
+
+import os
+import struct
+
+
+def make_row(width, y):
+    """One RLE row: alternating transparent and opaque runs of varying length."""
+    runs = []
+    x = 0
+    while x < width:
+        skip = min((x + y) % 7, width - x)
+        count = min(1 + (x * 3 + y) % 40, width - x - skip)
+        if count <= 0:
+            break
+        runs.append((skip, count, bytes((x + y + i) % 255 + 1 for i in range(count))))
+        x += skip + count
+    row = bytearray((len(runs),))
+    for skip, count, pixels in runs:
+        row += bytes((skip, count)) + pixels
+    return row
+
+
+def write_palette(path, colors=256):
+    """Write a .pal with a deterministic gradient."""
+    with open(path, "wb") as f:
+        f.write(struct.pack("<HH", colors, 0))
+        f.write(bytes(c for i in range(colors) for c in (i, 255 - i, (i * 7) % 256, 255)))
+    return path
+
+
+def write_graphic(path, pal_name, width, height, frames, has_bg_frame=False, speed=100):
+    """Write a ZT1 graphic of frames (plus a background frame) of width x height."""
+    name = pal_name.encode("utf-8") + b"\x00"
+    graphic = bytearray()
+    if has_bg_frame:
+        graphic += b"FATZ" + bytes(4) + b"\x01"
+    graphic += struct.pack("<II", speed, len(name)) + name + struct.pack("<I", frames)
+    for i in range(frames + (1 if has_bg_frame else 0)):
+        # Offsets drift per frame so layers do not all share one rect
+        body = struct.pack("<HHhhH", height, width, height // 2 + i % 9, width // 2 - i % 7, 0)
+        body += b"".join(make_row(width, y + i) for y in range(height))
+        graphic += struct.pack("<I", len(body)) + body
+    with open(path, "wb") as f:
+        f.write(graphic)
+    return path
+
+
+def write_synthetic(directory, size, frames, has_bg_frame=False, name="N"):
+    """Write a graphic and its palette into directory; returns (graphic path, palette path).
+
+    The graphic sits in <directory>/bench/<name> and embeds "bench/bench.pal",
+    so adjust_pal_directory resolves it like a game asset.
+    """
+    folder = os.path.join(directory, "bench")
+    os.makedirs(folder, exist_ok=True)
+    pal_path = write_palette(os.path.join(folder, "bench.pal"))
+    graphic_path = write_graphic(os.path.join(folder, name), "bench/bench.pal", size, size, frames, has_bg_frame)
+    return graphic_path, pal_path